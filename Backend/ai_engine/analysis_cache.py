@@ -0,0 +1,104 @@
+# Backend/ai_engine/analysis_cache.py
+#
+# Content-addressed cache for analyze_report results.
+# Key = SHA-256 of the uploaded PDF bytes (+ ANALYSIS_VERSION), so the
+# same PDF uploaded twice never re-parses, re-embeds or re-calls Groq.
+
+import hashlib
+import os
+import threading
+from datetime import datetime
+
+from user_Db.mongo import analysis_cache
+
+
+# bump when the prompt / model / chunking / rule parser changes so old entries are ignored
+ANALYSIS_VERSION = "3"
+
+CHUNK_SIZE = 1024 * 1024
+
+# per-process counters (the persistent totals live on the cache entries)
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def lookup(sha: str):
+    """Return the cached analysis for this content hash, or None."""
+    entry = analysis_cache.find_one(
+        {"sha256": sha, "version": ANALYSIS_VERSION}, {"_id": 0}
+    )
+
+    # the embeddings file is part of the result – a missing file is a miss
+    if entry and not os.path.exists(entry.get("embedding_path", "")):
+        entry = None
+
+    with _stats_lock:
+        _stats["hits" if entry else "misses"] += 1
+
+    if entry:
+        analysis_cache.update_one(
+            {"sha256": sha, "version": ANALYSIS_VERSION},
+            {"$inc": {"hits": 1}, "$set": {"last_hit_at": datetime.utcnow().isoformat()}},
+        )
+
+    return entry
+
+
+def store(sha: str, ai_summary, test_results, embedding_path: str, analysis_seconds: float):
+    analysis_cache.update_one(
+        {"sha256": sha, "version": ANALYSIS_VERSION},
+        {
+            "$set": {
+                "ai_summary": ai_summary,
+                "testResults": test_results,
+                "embedding_path": embedding_path,
+                "analysis_seconds": round(analysis_seconds, 3),
+                "created_at": datetime.utcnow().isoformat(),
+            },
+            "$setOnInsert": {"hits": 0},
+        },
+        upsert=True,
+    )
+
+
+def cache_stats():
+    """
+    Process-local hit/miss counters plus persistent totals:
+    every hit saved one Groq extraction and ~analysis_seconds of latency.
+    """
+    totals = list(analysis_cache.aggregate([
+        {"$match": {"version": ANALYSIS_VERSION}},
+        {"$group": {
+            "_id": None,
+            "entries": {"$sum": 1},
+            "hits": {"$sum": "$hits"},
+            "seconds_saved": {"$sum": {"$multiply": ["$hits", "$analysis_seconds"]}},
+        }},
+    ]))
+    totals = totals[0] if totals else {"entries": 0, "hits": 0, "seconds_saved": 0}
+
+    with _stats_lock:
+        process = dict(_stats)
+
+    lookups = process["hits"] + process["misses"]
+
+    return {
+        "process": {
+            **process,
+            "hit_rate": round(process["hits"] / lookups, 3) if lookups else 0.0,
+        },
+        "total": {
+            "entries": totals["entries"],
+            "hits": totals["hits"],
+            "llm_calls_saved": totals["hits"],
+            "seconds_saved": round(totals["seconds_saved"] or 0, 1),
+        },
+    }
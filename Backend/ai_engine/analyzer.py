@@ -1,108 +1,62 @@
 # Backend/ai_engine/analyzer.py
 
 import os
-import json
-import pickle
-import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from dotenv import load_dotenv
-from groq import Groq
-from sentence_transformers import SentenceTransformer
-from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from ai_engine.embeddings import encode
+from ai_engine import vector_store
+from ai_engine.pdf_extract import extract_pages, extract_many
+from ai_engine import llm_extract
+from ai_engine import rule_extract
 
-load_dotenv()
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-embedding_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+load_dotenv()
 
 EMBED_DIR = "Embeddings"
 os.makedirs(EMBED_DIR, exist_ok=True)
 
+# chunks per encode() call when a batch of reports is embedded together
+BATCH_ENCODE_SIZE = int(os.getenv("BATCH_ENCODE_SIZE", "256"))
 
-def analyze_report(pdf_path: str):
-    """
-    1. Read PDF
-    2. Create embeddings & save <filename>.pkl in Embeddings/
-    3. Ask Groq to return structured JSON
-    4. Return (ai_summary, test_results, embedding_path)
-    """
+_splitter = RecursiveCharacterTextSplitter(chunk_size=1500, chunk_overlap=200)
 
-    # ------- 1. LOAD PDF TEXT -------
-    loader = PyPDFLoader(pdf_path)
-    documents = loader.load()
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1500, chunk_overlap=200)
-    chunks = splitter.split_documents(documents)
+def _split(documents, timings: dict):
+    t = time.perf_counter()
+    chunks = _splitter.split_documents(documents)
 
     texts = [c.page_content for c in chunks]
-    full_text = "\n\n".join(texts)
+    pages = [c.metadata.get("page", -1) for c in chunks]
+    timings["split"] = round(time.perf_counter() - t, 4)
+    timings["chunks"] = len(texts)
+    timings["text_chars"] = sum(len(text) for text in texts)
+    return texts, pages
 
-    # ------- 2. BUILD & SAVE EMBEDDINGS -------
-    vectors = embedding_model.encode(texts, convert_to_numpy=True)
 
+def _save_vectors(pdf_path: str, texts, vectors, pages, timings: dict) -> str:
+    t = time.perf_counter()
     base_name = os.path.splitext(os.path.basename(pdf_path))[0]
-    embedding_path = os.path.join(EMBED_DIR, f"{base_name}.pkl")
-
-    with open(embedding_path, "wb") as f:
-        pickle.dump({"texts": texts, "vectors": vectors}, f)
-
-    # ------- 3. ASK GROQ FOR STRUCTURED JSON -------
-    prompt = f"""
-You are a medical lab report analysis AI.
-
-From this lab report text, extract a JSON object with this **exact** structure:
-
-{{
-  "summary": "Short overall overview in 2–3 sentences",
-  "key_findings": ["finding 1", "finding 2"],
-  "recommendations": ["recommendation 1", "recommendation 2"],
-  "severity": "low" | "medium" | "high",
-  "tests": [
-    {{
-      "name": "Test name",
-      "value": "numeric or text value",
-      "unit": "unit string",
-      "normalRange": "e.g. 4.0 - 11.0",
-      "status": "low" | "normal" | "high",
-      "interpretation": "1–2 sentence explanation for this test"
-    }}
-  ]
-}}
-
-Rules:
-- Return **ONLY valid JSON**. 
-- No backticks, no Markdown, no extra text before or after the JSON.
-
-Lab Report Text:
-\"\"\"{full_text}\"\"\"
-"""
-
-    response = client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        messages=[{"role": "user", "content": prompt}],
+    path = vector_store.save(
+        os.path.join(EMBED_DIR, base_name), texts, vectors, pages=pages
     )
+    timings["vector_save"] = round(time.perf_counter() - t, 4)
+    timings["embedding_bytes"] = int(getattr(vectors, "nbytes", 0))
+    return path
+
 
-    raw_content = response.choices[0].message.content.strip()
-
-    # Sometimes models wrap JSON in ```...``` – strip that if needed
-    if raw_content.startswith("```"):
-        raw_content = re.sub(r"^```[a-zA-Z]*\n", "", raw_content)
-        if raw_content.endswith("```"):
-            raw_content = raw_content[:-3].strip()
-
-    try:
-        parsed = json.loads(raw_content)
-    except json.JSONDecodeError:
-        # Fallback: don't crash your app – just wrap the text
-        parsed = {
-            "summary": raw_content,
-            "key_findings": [],
-            "recommendations": [],
-            "severity": "low",
-            "tests": [],
-        }
+def _structure(documents, texts, timings: dict):
+    # known layouts are parsed deterministically (page text, not the
+    # overlapping chunks); anything else goes to Groq – one prompt, or
+    # concurrent map-reduce for long reports
+    parsed = rule_extract.extract("\n".join(d.page_content for d in documents), timings)
+    if parsed is None:
+        parsed = llm_extract.extract(texts, timings)
+    else:
+        timings["llm_mode"] = "skipped"
 
     ai_summary = {
         "overall": parsed.get("summary", ""),
@@ -113,5 +67,102 @@ Lab Report Text:
 
     test_results = parsed.get("tests", [])
 
+    return ai_summary, test_results
+
+
+def analyze_report(pdf_path: str, timings: dict = None):
+    """
+    1. Read PDF (page-parallel for long documents)
+    2. Create embeddings & save the <filename>.npy vector store in Embeddings/
+    3. Parse known lab table layouts directly, else ask Groq for structured JSON
+    4. Return (ai_summary, test_results, embedding_path)
+    Per-stage seconds are written into `timings` when a dict is passed.
+    """
+    if timings is None:
+        timings = {}
+
+    # ------- 1. LOAD PDF TEXT -------
+    documents = extract_pages(pdf_path, timings)
+    timings["pdf_bytes"] = os.path.getsize(pdf_path)
+    texts, pages = _split(documents, timings)
+
+    # ------- 2. BUILD & SAVE EMBEDDINGS -------
+    t = time.perf_counter()
+    vectors = encode(texts, convert_to_numpy=True)
+    timings["encode"] = round(time.perf_counter() - t, 4)
+
+    embedding_path = _save_vectors(pdf_path, texts, vectors, pages, timings)
+
+    # ------- 3. STRUCTURED JSON -------
+    ai_summary, test_results = _structure(documents, texts, timings)
+
     return ai_summary, test_results, embedding_path
 
+
+def analyze_reports(pdf_paths, timings: dict = None):
+    """
+    Batch version of analyze_report for multi-file uploads:
+      1. all PDFs are read in parallel (one process-pool task per file)
+      2. the chunks of every file are embedded together in
+         BATCH_ENCODE_SIZE-sized encode() calls instead of one call per file
+      3. the per-file JSON extraction (rules / Groq) runs concurrently
+    Returns one entry per path, in order: (ai_summary, test_results,
+    embedding_path) or the exception that file raised, so one bad PDF
+    doesn't fail the batch. Batch-level seconds go into `timings`.
+    """
+    if timings is None:
+        timings = {}
+    per_file = [{} for _ in pdf_paths]
+    results = [None] * len(pdf_paths)
+
+    # ------- 1. LOAD + SPLIT -------
+    t = time.perf_counter()
+    loaded = extract_many(pdf_paths)
+    split = {}
+    for i, documents in enumerate(loaded):
+        if isinstance(documents, Exception):
+            results[i] = documents
+            continue
+        try:
+            split[i] = (documents, *_split(documents, per_file[i]))
+        except Exception as e:
+            results[i] = e
+    timings["pdf_load"] = round(time.perf_counter() - t, 4)
+
+    # ------- 2. ONE EMBEDDING PASS OVER ALL CHUNKS -------
+    t = time.perf_counter()
+    all_texts = [text for _, texts, _ in split.values() for text in texts]
+    all_vectors = (
+        encode(all_texts, batch_size=BATCH_ENCODE_SIZE, convert_to_numpy=True)
+        if all_texts else []
+    )
+    timings["encode"] = round(time.perf_counter() - t, 4)
+    timings["chunks"] = len(all_texts)
+
+    embedding_paths, start = {}, 0
+    for i, (_, texts, pages) in split.items():
+        vectors = all_vectors[start:start + len(texts)]
+        start += len(texts)
+        try:
+            embedding_paths[i] = _save_vectors(pdf_paths[i], texts, vectors, pages, per_file[i])
+        except Exception as e:
+            results[i] = e
+
+    # ------- 3. STRUCTURED JSON, CONCURRENTLY -------
+    def structure(i):
+        documents, texts, _ = split[i]
+        try:
+            return i, (*_structure(documents, texts, per_file[i]), embedding_paths[i])
+        except Exception as e:
+            return i, e
+
+    t = time.perf_counter()
+    todo = [i for i in split if i in embedding_paths]
+    if todo:
+        with ThreadPoolExecutor(max_workers=min(llm_extract.MAX_PARALLEL, len(todo))) as pool:
+            for i, result in pool.map(structure, todo):
+                results[i] = result
+    timings["extract"] = round(time.perf_counter() - t, 4)
+    timings["files"] = per_file
+
+    return results
@@ -0,0 +1,122 @@
+# Backend/ai_engine/answer_cache.py
+#
+# Cache of /chat/ask answers about a single report.
+# Key = (report id, normalized question, PROMPT_VERSION); entries expire
+# through a Mongo TTL index on expires_at and are dropped when the report
+# is deleted. Optionally the suggested questions are answered in the
+# background right after a report is ingested, so those clicks are instant.
+
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from user_Db.mongo import answer_cache
+from ai_engine import rag
+
+
+# bump when the chat prompt / model / retrieval changes so old answers are ignored
+PROMPT_VERSION = "1"
+
+TTL_HOURS = float(os.getenv("CHAT_ANSWER_TTL_HOURS", "168"))
+PRECOMPUTE = os.getenv("CHAT_PRECOMPUTE_SUGGESTED", "false").lower() == "true"
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "precomputed": 0}
+
+
+def normalize_question(question: str) -> str:
+    """'  Explain my  Hemoglobin result?? ' → 'explain my hemoglobin result'"""
+    question = re.sub(r"\s+", " ", question.strip().lower())
+    return question.rstrip("?!. ")
+
+
+def _key(report_id, question):
+    return {
+        "report_id": report_id,
+        "question": normalize_question(question),
+        "version": PROMPT_VERSION,
+    }
+
+
+def lookup(report_id, question):
+    """Cached answer for this report + question, or None."""
+    entry = answer_cache.find_one(
+        {**_key(report_id, question), "expires_at": {"$gt": datetime.utcnow()}},
+        {"_id": 0, "answer": 1},
+    )
+    with _stats_lock:
+        _stats["hits" if entry else "misses"] += 1
+    return entry["answer"] if entry else None
+
+
+def store(report_id, question, answer):
+    now = datetime.utcnow()
+    answer_cache.update_one(
+        _key(report_id, question),
+        {"$set": {
+            "answer": answer,
+            "created_at": now,
+            # BSON date – the TTL index deletes the entry once this passes
+            "expires_at": now + timedelta(hours=TTL_HOURS),
+        }},
+        upsert=True,
+    )
+
+
+def invalidate(*report_ids):
+    """Drop every cached answer about these reports (call when they are deleted)."""
+    ids = [r for r in report_ids if r]
+    if ids:
+        answer_cache.delete_many({"report_id": {"$in": ids}})
+
+
+# ---------- PRECOMPUTE SUGGESTED QUESTIONS ----------
+def precompute(report_id, embedding_path):
+    """Answer rag.SUGGESTED_QUESTIONS for one report and cache the answers."""
+    for question in rag.SUGGESTED_QUESTIONS:
+        if answer_cache.count_documents(_key(report_id, question), limit=1):
+            continue
+        prompt, answer = rag.report_prompt(question, report_id, embedding_path)
+        if prompt is None:
+            # missing embeddings etc. – nothing worth caching for this report
+            return
+        store(report_id, question, rag.complete(prompt))
+        with _stats_lock:
+            _stats["precomputed"] += 1
+
+
+def _precompute_safely(report_id, embedding_path):
+    try:
+        precompute(report_id, embedding_path)
+    except Exception:
+        logger.exception("precomputing answers for report %s failed", report_id)
+
+
+def schedule_precompute(report_id, embedding_path):
+    """Queue precompute() on a background thread when CHAT_PRECOMPUTE_SUGGESTED is on."""
+    global _executor
+    if not PRECOMPUTE:
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="answer-precompute")
+    _executor.submit(_precompute_safely, report_id, embedding_path)
+
+
+def cache_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    return {
+        **stats,
+        "hit_rate": round(stats["hits"] / lookups, 3) if lookups else 0.0,
+        "entries": answer_cache.count_documents({"version": PROMPT_VERSION}),
+    }
@@ -0,0 +1,236 @@
+# Backend/ai_engine/embedding_server.py
+#
+# Optional embedding sidecar: one process per host loads MiniLM once and
+# serves encode() to every gunicorn worker over a Unix socket
+# (`flask embedding-server`, workers set EMBEDDING_SOCKET to the same path).
+#
+# Concurrent requests are merged into micro-batches: the batcher takes the
+# first waiting request, then keeps collecting for up to MAX_WAIT_MS or
+# until MAX_BATCH texts are queued, and runs a single model.encode() over
+# all of them. Twenty one-question chat requests cost one forward pass.
+#
+# Wire format (both directions): 4-byte big-endian length + payload.
+#   request   {"texts": [...], "normalize": false}               (JSON)
+#   response  {"shape": [n, dim]} then n*dim float32 bytes, or {"error": "..."}
+
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+DEFAULT_SOCKET = "/tmp/labinsight-embeddings.sock"
+MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "64"))
+MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+_LENGTH = struct.Struct(">I")
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingServerError(Exception):
+    """The sidecar answered, but could not encode the texts."""
+
+
+# ---------- FRAMING ----------
+def _recv_exact(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        k = sock.recv_into(view[got:])
+        if not k:
+            raise ConnectionError("embedding server connection closed")
+        got += k
+    return buf
+
+
+def send_frame(sock, payload: bytes):
+    sock.sendall(_LENGTH.pack(len(payload)))
+    sock.sendall(payload)
+
+
+def recv_frame(sock):
+    (n,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    if n > MAX_FRAME_BYTES:
+        raise ConnectionError(f"frame of {n} bytes exceeds {MAX_FRAME_BYTES}")
+    return _recv_exact(sock, n)
+
+
+def _send_json(sock, obj):
+    send_frame(sock, json.dumps(obj).encode("utf-8"))
+
+
+# ---------- MICRO-BATCHING ----------
+class MicroBatcher:
+    def __init__(self, model, max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._carry = None  # request that didn't fit into the previous batch
+        threading.Thread(target=self._run, name="embedding-batcher", daemon=True).start()
+
+    def submit(self, texts, normalize: bool = False) -> Future:
+        """
+        Future of a (len(texts), dim) float32 array. normalize=True
+        L2-normalizes this request's rows (normalize_embeddings=True).
+        """
+        future = Future()
+        self._queue.put((texts, future, normalize))
+        return future
+
+    def _collect(self):
+        first, self._carry = self._carry or self._queue.get(), None
+        batch, n = [first], len(first[0])
+        deadline = time.monotonic() + self.max_wait
+
+        while n < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if n + len(item[0]) > self.max_batch:
+                self._carry = item
+                break
+            batch.append(item)
+            n += len(item[0])
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [t for item_texts, _, _ in batch for t in item_texts]
+            try:
+                vectors = np.asarray(
+                    self.model.encode(texts, batch_size=self.max_batch, convert_to_numpy=True),
+                    dtype=np.float32,
+                )
+            except Exception as e:
+                logger.exception("encoding a batch of %d texts failed", len(texts))
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            start = 0
+            for item_texts, future, normalize in batch:
+                rows = vectors[start:start + len(item_texts)]
+                if normalize:
+                    rows = rows / np.clip(np.linalg.norm(rows, axis=1, keepdims=True), 1e-12, None)
+                future.set_result(rows)
+                start += len(item_texts)
+
+
+# ---------- SERVER ----------
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # one connection per worker thread, kept open across requests
+        while True:
+            try:
+                request = json.loads(recv_frame(self.request))
+            except (ConnectionError, OSError):
+                return
+            except ValueError as e:
+                _send_json(self.request, {"error": f"bad request: {e}"})
+                continue
+
+            texts = request.get("texts")
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                _send_json(self.request, {"error": "texts must be a list of strings"})
+                continue
+
+            try:
+                vectors = self.server.batcher.submit(texts, bool(request.get("normalize"))).result()
+            except Exception as e:
+                _send_json(self.request, {"error": str(e)})
+                continue
+
+            _send_json(self.request, {"shape": list(vectors.shape)})
+            send_frame(self.request, np.ascontiguousarray(vectors).tobytes())
+
+
+class EmbeddingServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, batcher):
+        self.batcher = batcher
+        super().__init__(path, _Handler)
+
+
+def serve(model, path: str = DEFAULT_SOCKET, max_batch: int = MAX_BATCH,
+          max_wait_ms: float = MAX_WAIT_MS):
+    """Block serving `model` on the Unix socket at `path`."""
+    model.encode(["warm up"], convert_to_numpy=True)
+
+    if os.path.exists(path):
+        os.remove(path)  # left over from a previous run
+    server = EmbeddingServer(path, MicroBatcher(model, max_batch, max_wait_ms))
+    os.chmod(path, 0o660)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# ---------- CLIENT ----------
+class Client:
+    """Per-thread persistent connections to the sidecar; same call shape as model.encode."""
+
+    def __init__(self, path: str, timeout: float):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _socket(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def encode(self, texts, normalize_embeddings: bool = False):
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+
+        sock = self._socket()
+        try:
+            _send_json(sock, {"texts": batch, "normalize": normalize_embeddings})
+            header = json.loads(recv_frame(sock))
+            if "error" in header:
+                raise EmbeddingServerError(header["error"])
+            vectors = np.frombuffer(recv_frame(sock), dtype=np.float32).reshape(header["shape"])
+        except EmbeddingServerError:
+            raise  # the reply was complete, the connection is still usable
+        except BaseException:
+            # timeout / malformed reply: the stream is out of step
+            self.close()
+            raise
+
+        return vectors[0] if single else vectors
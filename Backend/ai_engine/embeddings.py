@@ -0,0 +1,148 @@
+# Backend/ai_engine/embeddings.py
+#
+# The one MiniLM instance shared by the analyzer and the chat route.
+# Nothing is imported or loaded until the first encode() / warm_up(),
+# so workers that only serve auth/admin routes never pay for torch.
+#
+# EMBEDDING_BACKEND selects the implementation:
+#   torch (default)  SentenceTransformer, full precision
+#   onnx             ONNX Runtime model exported by `flask export-onnx`
+#                    into ONNX_MODEL_DIR (int8 unless ONNX_QUANTIZED=false)
+#
+# With EMBEDDING_SOCKET set, encode() goes to the `flask embedding-server`
+# sidecar on that Unix socket (one model per host, micro-batched across
+# workers) and falls back to the in-process model while it is down.
+
+import logging
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+MODEL_NAME = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "onnx_model")
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "true").lower() == "true"
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # 0 = onnxruntime default
+
+EMBEDDING_SOCKET = os.getenv("EMBEDDING_SOCKET", "")
+EMBEDDING_SOCKET_TIMEOUT = float(os.getenv("EMBEDDING_SOCKET_TIMEOUT", "60"))
+# after a failed sidecar call, encode in-process this long before retrying it
+EMBEDDING_SOCKET_RETRY_S = float(os.getenv("EMBEDDING_SOCKET_RETRY_S", "30"))
+
+logger = logging.getLogger(__name__)
+
+_model = None
+_load_lock = threading.Lock()
+
+_sidecar = None
+_sidecar_down_until = 0.0
+
+# encode() kwargs the sidecar honours; batch_size / show_progress_bar only
+# change how the work is split, not the vectors. Calls with anything else
+# (or convert_to_numpy=False) are encoded in-process.
+REMOTE_KWARGS = {"batch_size", "show_progress_bar", "convert_to_numpy", "normalize_embeddings"}
+
+
+def _reset_after_fork():
+    # the parent's sidecar connections must not be shared with the child
+    global _sidecar
+    _sidecar = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def load_backend(backend: str, quantized: bool = ONNX_QUANTIZED):
+    """A fresh encoder for `backend` (also used by the parity check)."""
+    if backend == "onnx":
+        from ai_engine.onnx_encoder import OnnxEncoder
+        return OnnxEncoder(ONNX_MODEL_DIR, quantized=quantized, threads=ONNX_THREADS)
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(MODEL_NAME)
+    raise ValueError(f"unknown EMBEDDING_BACKEND {backend!r} (torch / onnx)")
+
+
+def get_model():
+    global _model
+    if _model is None:
+        with _load_lock:
+            if _model is None:
+                model = load_backend(BACKEND)
+                if hasattr(model, "tokenize"):
+                    # the first call configures the fast tokenizer's padding /
+                    # truncation in place; do it here, not in concurrent encodes
+                    model.tokenize(["warm up"])
+                _model = model
+    return _model
+
+
+def _sidecar_client():
+    global _sidecar
+    if not EMBEDDING_SOCKET or time.monotonic() < _sidecar_down_until:
+        return None
+    if _sidecar is None:
+        from ai_engine.embedding_server import Client
+        _sidecar = Client(EMBEDDING_SOCKET, EMBEDDING_SOCKET_TIMEOUT)
+    return _sidecar
+
+
+def _encode_remote(texts, kwargs):
+    """Vectors from the sidecar, or None when it can't serve this call."""
+    global _sidecar_down_until
+    client = _sidecar_client()
+    if client is None or not len(texts):
+        return None
+    if set(kwargs) - REMOTE_KWARGS or not kwargs.get("convert_to_numpy", True):
+        return None
+
+    from ai_engine.embedding_server import EmbeddingServerError
+    try:
+        return client.encode(texts, bool(kwargs.get("normalize_embeddings", False)))
+    except (OSError, ValueError) as e:
+        _sidecar_down_until = time.monotonic() + EMBEDDING_SOCKET_RETRY_S
+        logger.warning("embedding sidecar unavailable (%s); encoding in-process", e)
+    except EmbeddingServerError as e:
+        logger.warning("embedding sidecar failed (%s); encoding in-process", e)
+    return None
+
+
+def encode(texts, **kwargs):
+    """
+    SentenceTransformer.encode on the shared model (sidecar first, if
+    configured). Not serialized: inference on both backends is safe to
+    run from several threads, so a batch upload's encode never holds up
+    a chat question's.
+    """
+    vectors = _encode_remote(texts, kwargs)
+    if vectors is not None:
+        return vectors
+
+    return get_model().encode(texts, **kwargs)
+
+
+def warm_up(probe: bool = True):
+    """
+    Load the model now instead of on the first request.
+    Use probe=False when preloading in a gunicorn master (--preload):
+    running an encode there starts torch's thread pool, which does not
+    survive fork(); loading the weights alone is safe and lets the
+    workers share those pages copy-on-write.
+    With a sidecar configured the workers don't need their own copy;
+    it is only loaded if the sidecar goes down.
+    """
+    if EMBEDDING_SOCKET:
+        return None
+    if BACKEND == "onnx" and not probe:
+        # an InferenceSession starts its thread pool on creation, which
+        # would not survive fork() either – let each worker create its own
+        return None
+    model = get_model()
+    if probe:
+        encode(["warm up"], convert_to_numpy=True)
+    return model
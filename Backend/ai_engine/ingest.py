@@ -0,0 +1,195 @@
+# Backend/ai_engine/ingest.py
+
+import logging
+import time
+import uuid
+from datetime import datetime
+
+from user_Db.mongo import reports, record_report_added
+from user_Db.stats import record_report
+from user_Db.lab_results import record_report_tests
+from user_Db.storage import ensure_local_copy
+from ai_engine.analyzer import analyze_report, analyze_reports
+from ai_engine import analysis_cache
+from ai_engine.report_cache import invalidate_report
+from ai_engine import user_index
+from ai_engine import answer_cache
+from metrics import timed
+
+
+logger = logging.getLogger(__name__)
+
+
+def _report_doc(file_id, user_email, original_name, saved_path, content_hash,
+                embedding_path, ai_summary, test_results):
+    return {
+        "file_id": file_id,
+        "user_email": user_email,
+        "file_name": original_name,
+        "file_path": saved_path,
+        "content_hash": content_hash,
+        "embedding_path": embedding_path,
+        "ai_summary": ai_summary,
+        "testResults": test_results,
+        "uploaded_at": datetime.utcnow().isoformat(),
+    }
+
+
+def _after_insert(report_doc):
+    """
+    Derived state of a freshly inserted report. The report row is already
+    stored, so a failing step is logged and returned as a warning instead
+    of failing the upload (a retry would insert the report twice).
+    """
+    hooks = (
+        ("user_counters", lambda: record_report_added(report_doc["user_email"], report_doc["uploaded_at"])),
+        ("stats", lambda: record_report(report_doc["uploaded_at"], report_doc["ai_summary"].get("severity"))),
+        ("test_results", lambda: record_report_tests(report_doc)),
+        ("user_index", lambda: user_index.add_report(report_doc["user_email"], report_doc)),
+    )
+    warnings = []
+    for name, hook in hooks:
+        try:
+            hook()
+        except Exception as e:
+            logger.exception("%s update failed for report %s", name, report_doc["file_id"])
+            warnings.append(f"{name}: {e}")
+    return warnings
+
+
+def ingest_report(saved_path: str, user_email: str, original_name: str, file_id: str,
+                  content_hash: str = None, timings: dict = None):
+    """
+    Run the AI analysis on an already saved PDF and store the report
+    document in Mongo. Shared by the synchronous /upload-report path
+    and the background job workers.
+    A PDF whose content hash was analyzed before reuses the cached result.
+    Per-stage seconds are written into `timings` when a dict is passed,
+    plus "warnings" when a post-insert update failed.
+    Returns the inserted report document (without _id).
+    """
+
+    if timings is None:
+        timings = {}
+
+    if content_hash is None:
+        content_hash = analysis_cache.hash_file(saved_path)
+
+    # 1. Reuse a previous analysis of the same bytes, or run a fresh one
+    with timed(timings, "cache_lookup"):
+        cached = analysis_cache.lookup(content_hash)
+
+    if cached:
+        ai_summary = cached["ai_summary"]
+        test_results = cached["testResults"]
+        embedding_path = cached["embedding_path"]
+    else:
+        started = time.perf_counter()
+        # the PDF may only be in GridFS on this node (e.g. a resumed job)
+        ensure_local_copy(saved_path, content_hash)
+        ai_summary, test_results, embedding_path = analyze_report(saved_path, timings)
+
+        # an empty tests list usually means the LLM JSON fell back – don't pin that
+        if test_results:
+            analysis_cache.store(
+                content_hash, ai_summary, test_results, embedding_path,
+                time.perf_counter() - started,
+            )
+
+    # 2. Save in Mongo – THIS IS WHERE USER OWNERSHIP IS STORED
+    report_doc = _report_doc(file_id, user_email, original_name, saved_path,
+                             content_hash, embedding_path, ai_summary, test_results)
+
+    with timed(timings, "mongo_write"):
+        reports.insert_one(report_doc)
+    report_doc.pop("_id", None)
+
+    # the user's "latest report" just changed
+    invalidate_report(email=user_email)
+    warnings = _after_insert(report_doc)
+    if warnings:
+        timings["warnings"] = warnings
+    answer_cache.schedule_precompute(file_id, embedding_path)
+
+    timings["cache_hit"] = bool(cached)
+    logger.info("ingested report %s: %s", file_id, timings)
+
+    return report_doc
+
+
+def ingest_reports(uploads, user_email: str, timings: dict = None):
+    """
+    Batch ingestion for multi-file uploads. `uploads` is a list of
+    (saved_path, original_name, content_hash). Cache misses go through
+    analyze_reports (one embedding pass for all files), and every
+    successful report is written with a single insert_many.
+    Returns one entry per upload, in order: {"report": doc} or {"error": msg}.
+    """
+    if timings is None:
+        timings = {}
+
+    results = [None] * len(uploads)
+    analyses = {}
+
+    # 1. Cache lookups; identical bytes within the batch are analyzed once
+    misses = {}
+    for i, (saved_path, _, content_hash) in enumerate(uploads):
+        cached = analysis_cache.lookup(content_hash)
+        if cached:
+            analyses[i] = (cached["ai_summary"], cached["testResults"], cached["embedding_path"])
+        else:
+            misses.setdefault(content_hash, []).append(i)
+
+    if misses:
+        started = time.perf_counter()
+        hashes = list(misses)
+        paths = []
+        for sha in hashes:
+            path = uploads[misses[sha][0]][0]
+            ensure_local_copy(path, sha)
+            paths.append(path)
+
+        analyzed = analyze_reports(paths, timings)
+        seconds = (time.perf_counter() - started) / len(hashes)
+
+        for sha, path, result in zip(hashes, paths, analyzed):
+            if not isinstance(result, Exception):
+                ai_summary, test_results, embedding_path = result
+                if test_results:
+                    analysis_cache.store(sha, ai_summary, test_results, embedding_path, seconds)
+            for i in misses[sha]:
+                analyses[i] = result
+
+    # 2. One insert for every report that analyzed cleanly
+    docs = []
+    for i, (saved_path, original_name, content_hash) in enumerate(uploads):
+        analysis = analyses[i]
+        if isinstance(analysis, Exception):
+            logger.warning("batch upload %s failed: %s", original_name, analysis)
+            results[i] = {"error": f"Analysis failed: {analysis}"}
+            continue
+        ai_summary, test_results, embedding_path = analysis
+        doc = _report_doc(str(uuid.uuid4()), user_email, original_name, saved_path,
+                          content_hash, embedding_path, ai_summary, test_results)
+        docs.append(doc)
+        results[i] = {"report": doc}
+
+    if docs:
+        with timed(timings, "mongo_write"):
+            reports.insert_many(docs)
+        warnings = []
+        for doc in docs:
+            doc.pop("_id", None)
+            warnings += _after_insert(doc)
+        if warnings:
+            timings["warnings"] = warnings
+        invalidate_report(email=user_email)
+        # only the newest report backs /chat/ask, so only its answers are worth precomputing
+        answer_cache.schedule_precompute(docs[-1]["file_id"], docs[-1]["embedding_path"])
+
+    timings["cache_hits"] = len(uploads) - sum(len(v) for v in misses.values())
+    logger.info("ingested %d/%d reports for %s: %s",
+                len(docs), len(uploads), user_email,
+                {k: v for k, v in timings.items() if k != "files"})
+
+    return results
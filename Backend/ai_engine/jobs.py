@@ -0,0 +1,166 @@
+# Backend/ai_engine/jobs.py
+#
+# Background ingestion queue for /upload-report.
+# Jobs are persisted in the "jobs" collection so they survive restarts;
+# a bounded thread pool runs the analysis.
+
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+
+from user_Db.mongo import jobs, reports
+from ai_engine.ingest import ingest_report
+from metrics import observe_timings
+
+
+MAX_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+MAX_QUEUED = int(os.getenv("UPLOAD_MAX_QUEUED", "50"))
+# a "running" job older than this is assumed to belong to a dead process
+STALE_AFTER_SECONDS = int(os.getenv("UPLOAD_JOB_STALE_SECONDS", "900"))
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+_executor = None
+_lock = threading.Lock()
+_inflight = 0
+_resumed = threading.Event()
+
+
+class QueueFullError(Exception):
+    pass
+
+
+def _now():
+    return datetime.utcnow().isoformat()
+
+
+def _get_executor():
+    # created lazily so every forked worker gets its own pool
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=MAX_WORKERS, thread_name_prefix="upload-job"
+            )
+        return _executor
+
+
+def _dispatch(job_id):
+    global _inflight
+    with _lock:
+        _inflight += 1
+    _get_executor().submit(_run_job, job_id)
+
+
+def submit_upload_job(saved_path: str, user_email: str, original_name: str,
+                      content_hash: str = None):
+    """
+    Persist a queued job and hand it to the worker pool.
+    Returns (job_id, report_id).
+    """
+    with _lock:
+        if _inflight >= MAX_QUEUED:
+            raise QueueFullError("Upload queue is full, try again later")
+
+    job_id = str(uuid.uuid4())
+    file_id = str(uuid.uuid4())
+
+    jobs.insert_one({
+        "job_id": job_id,
+        "report_id": file_id,
+        "user_email": user_email,
+        "file_name": original_name,
+        "file_path": saved_path,
+        "content_hash": content_hash,
+        "status": "queued",
+        "error": None,
+        "stages": {"queued": _now()},
+    })
+
+    _dispatch(job_id)
+    return job_id, file_id
+
+
+def _run_job(job_id):
+    global _inflight
+    try:
+        # atomic claim → only one process ever runs a given job
+        job = jobs.find_one_and_update(
+            {"job_id": job_id, "status": "queued"},
+            {"$set": {"status": "running", "worker": WORKER_ID, "stages.running": _now()}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not job:
+            return
+
+        timings = {}
+        try:
+            # a previous run may have crashed after inserting the report
+            if not reports.find_one({"file_id": job["report_id"]}, {"_id": 1}):
+                ingest_report(
+                    job["file_path"], job["user_email"], job["file_name"],
+                    job["report_id"], job.get("content_hash"), timings,
+                )
+        except Exception as e:
+            # once the report row exists the upload succeeded; failing the job
+            # would make a retry insert it a second time
+            if not reports.find_one({"file_id": job["report_id"]}, {"_id": 1}):
+                jobs.update_one(
+                    {"job_id": job_id},
+                    {"$set": {"status": "failed", "error": str(e), "stages.failed": _now(),
+                              "timings": timings}},
+                )
+                return
+            timings.setdefault("warnings", []).append(str(e))
+
+        warnings = timings.pop("warnings", [])
+        jobs.update_one(
+            {"job_id": job_id},
+            {"$set": {"status": "done", "stages.done": _now(), "timings": timings,
+                      "warnings": warnings}},
+        )
+        observe_timings("upload_job", timings)
+    finally:
+        with _lock:
+            _inflight -= 1
+
+
+def get_job(job_id):
+    return jobs.find_one({"job_id": job_id}, {"_id": 0, "file_path": 0, "worker": 0})
+
+
+def resume_pending_jobs():
+    """
+    Re-queue jobs left behind by a restart: everything still "queued",
+    plus "running" jobs whose worker has been silent for too long.
+    Returns the number of jobs dispatched.
+    """
+    cutoff = (datetime.utcnow() - timedelta(seconds=STALE_AFTER_SECONDS)).isoformat()
+
+    jobs.update_many(
+        {"status": "running", "stages.running": {"$lt": cutoff}},
+        {"$set": {"status": "queued", "stages.requeued": _now()}},
+    )
+
+    count = 0
+    for job in jobs.find({"status": "queued"}, {"job_id": 1}):
+        _dispatch(job["job_id"])
+        count += 1
+
+    return count
+
+
+def resume_pending_jobs_once():
+    # called from a before_request hook so CLI commands never start workers
+    if _resumed.is_set():
+        return
+    with _lock:
+        if _resumed.is_set():
+            return
+        _resumed.set()
+    resume_pending_jobs()
@@ -0,0 +1,251 @@
+# Backend/ai_engine/llm_extract.py
+#
+# Groq extraction of the structured report JSON.
+#   - short reports: one prompt over the full text (the original behaviour)
+#   - long reports (map-reduce): the chunks are grouped into token-budgeted
+#     sections, each section's "tests" array is extracted by a concurrent
+#     Groq call, the tests are merged / de-duplicated, and one short call
+#     writes the summary from the merged tests.
+
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from groq import Groq
+
+
+load_dotenv()
+
+client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+
+MODEL = "llama-3.3-70b-versatile"
+
+# ~4 characters per token is close enough for budgeting English lab text
+CHARS_PER_TOKEN = 4
+MAP_REDUCE_MIN_TOKENS = int(os.getenv("LLM_MAP_REDUCE_MIN_TOKENS", "6000"))
+SECTION_TOKENS = int(os.getenv("LLM_SECTION_TOKENS", "3000"))
+MAX_PARALLEL = int(os.getenv("LLM_MAX_PARALLEL", "4"))
+
+logger = logging.getLogger(__name__)
+
+
+FULL_PROMPT = """
+You are a medical lab report analysis AI.
+
+From this lab report text, extract a JSON object with this **exact** structure:
+
+{{
+  "summary": "Short overall overview in 2–3 sentences",
+  "key_findings": ["finding 1", "finding 2"],
+  "recommendations": ["recommendation 1", "recommendation 2"],
+  "severity": "low" | "medium" | "high",
+  "tests": [
+    {{
+      "name": "Test name",
+      "value": "numeric or text value",
+      "unit": "unit string",
+      "normalRange": "e.g. 4.0 - 11.0",
+      "status": "low" | "normal" | "high",
+      "interpretation": "1–2 sentence explanation for this test"
+    }}
+  ]
+}}
+
+Rules:
+- Return **ONLY valid JSON**.
+- No backticks, no Markdown, no extra text before or after the JSON.
+
+Lab Report Text:
+\"\"\"{text}\"\"\"
+"""
+
+TESTS_PROMPT = """
+You are a medical lab report analysis AI.
+
+Below is ONE SECTION of a longer lab report. Extract every lab test result
+in it as a JSON object with this **exact** structure:
+
+{{
+  "tests": [
+    {{
+      "name": "Test name",
+      "value": "numeric or text value",
+      "unit": "unit string",
+      "normalRange": "e.g. 4.0 - 11.0",
+      "status": "low" | "normal" | "high",
+      "interpretation": "1–2 sentence explanation for this test"
+    }}
+  ]
+}}
+
+Rules:
+- Return **ONLY valid JSON**. Use "tests": [] if the section has no results.
+- No backticks, no Markdown, no extra text before or after the JSON.
+
+Lab Report Section:
+\"\"\"{text}\"\"\"
+"""
+
+SUMMARY_PROMPT = """
+You are a medical lab report analysis AI.
+
+These are all the test results extracted from one lab report:
+
+{tests}
+
+Return a JSON object with this **exact** structure:
+
+{{
+  "summary": "Short overall overview in 2–3 sentences",
+  "key_findings": ["finding 1", "finding 2"],
+  "recommendations": ["recommendation 1", "recommendation 2"],
+  "severity": "low" | "medium" | "high"
+}}
+
+Rules:
+- Return **ONLY valid JSON**.
+- No backticks, no Markdown, no extra text before or after the JSON.
+"""
+
+
+def complete(prompt: str) -> str:
+    response = client.chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    return response.choices[0].message.content.strip()
+
+
+def parse_json(raw_content: str):
+    """Parse model output as JSON; returns None if it isn't valid JSON."""
+    # Sometimes models wrap JSON in ```...``` – strip that if needed
+    if raw_content.startswith("```"):
+        raw_content = re.sub(r"^```[a-zA-Z]*\n", "", raw_content)
+        if raw_content.endswith("```"):
+            raw_content = raw_content[:-3].strip()
+
+    try:
+        return json.loads(raw_content)
+    except json.JSONDecodeError:
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _sections(texts, budget_tokens):
+    """Group consecutive chunks into sections of at most ~budget_tokens."""
+    sections, current, used = [], [], 0
+    for text in texts:
+        cost = estimate_tokens(text)
+        if current and used + cost > budget_tokens:
+            sections.append("\n\n".join(current))
+            current, used = [], 0
+        current.append(text)
+        used += cost
+    if current:
+        sections.append("\n\n".join(current))
+    return sections
+
+
+def _test_key(test):
+    name = re.sub(r"[^a-z0-9]", "", str(test.get("name", "")).lower())
+    value = str(test.get("value", "")).strip().lower()
+    return name, value
+
+
+def merge_tests(test_lists):
+    """Concatenate per-section tests, dropping repeats (chunk overlap, repeated headers)."""
+    merged, seen = [], set()
+    for tests in test_lists:
+        for test in tests:
+            if not isinstance(test, dict) or not test.get("name"):
+                continue
+            key = _test_key(test)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(test)
+    return merged
+
+
+# ---------- SINGLE PROMPT ----------
+def extract_single(full_text: str, timings: dict):
+    t = time.perf_counter()
+    raw_content = complete(FULL_PROMPT.format(text=full_text))
+    timings["llm_call"] = round(time.perf_counter() - t, 4)
+
+    t = time.perf_counter()
+    parsed = parse_json(raw_content)
+    timings["json_parse"] = round(time.perf_counter() - t, 4)
+
+    if not isinstance(parsed, dict):
+        # Fallback (invalid JSON, or a list/scalar instead of an object):
+        # don't crash your app – just wrap the text
+        parsed = {
+            "summary": raw_content,
+            "key_findings": [],
+            "recommendations": [],
+            "severity": "low",
+            "tests": [],
+        }
+    return parsed
+
+
+# ---------- MAP-REDUCE ----------
+def _extract_section_tests(section: str):
+    parsed = parse_json(complete(TESTS_PROMPT.format(text=section)))
+    if not isinstance(parsed, dict):
+        # one retry – a bad section shouldn't silently drop its tests
+        parsed = parse_json(complete(TESTS_PROMPT.format(text=section)))
+    if not isinstance(parsed, dict):
+        logger.warning("section extraction returned no JSON object twice (%d chars)", len(section))
+        return []
+    return parsed.get("tests", [])
+
+
+def extract_map_reduce(texts, timings: dict):
+    sections = _sections(texts, SECTION_TOKENS)
+
+    t = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL, len(sections))) as pool:
+        test_lists = list(pool.map(_extract_section_tests, sections))
+    tests = merge_tests(test_lists)
+    timings["llm_map"] = round(time.perf_counter() - t, 4)
+
+    t = time.perf_counter()
+    summary = parse_json(complete(SUMMARY_PROMPT.format(tests=json.dumps(tests))))
+    if not isinstance(summary, dict):
+        # invalid JSON or a non-object answer – keep the tests, empty summary
+        summary = {}
+    timings["llm_reduce"] = round(time.perf_counter() - t, 4)
+
+    timings["llm_call"] = round(timings["llm_map"] + timings["llm_reduce"], 4)
+    timings["llm_sections"] = len(sections)
+
+    return {
+        "summary": summary.get("summary", ""),
+        "key_findings": summary.get("key_findings", []),
+        "recommendations": summary.get("recommendations", []),
+        "severity": summary.get("severity", "low"),
+        "tests": tests,
+    }
+
+
+def extract(texts, timings: dict = None):
+    """Structured JSON for a report's chunk texts, choosing single vs map-reduce."""
+    if timings is None:
+        timings = {}
+
+    full_text = "\n\n".join(texts)
+    if estimate_tokens(full_text) < MAP_REDUCE_MIN_TOKENS:
+        timings["llm_mode"] = "single"
+        return extract_single(full_text, timings)
+
+    timings["llm_mode"] = "map_reduce"
+    return extract_map_reduce(texts, timings)
@@ -0,0 +1,186 @@
+# Backend/ai_engine/onnx_encoder.py
+#
+# ONNX Runtime backend for the MiniLM sentence embeddings (CPU only).
+# `flask export-onnx` writes a model directory once:
+#   model.onnx        transformer exported from the PyTorch weights
+#   model_int8.onnx   same graph with dynamic int8-quantized weights
+#   tokenizer.json    fast tokenizer
+#   encoder.json      {"model_name", "max_seq_length", "dim"}
+# OnnxEncoder reproduces SentenceTransformer.encode for this model
+# (mean pooling over the attention mask + L2 normalization), so either
+# backend can be selected with EMBEDDING_BACKEND without touching callers.
+# onnxruntime / tokenizers are only imported when this backend is used.
+
+import json
+import os
+import time
+
+import numpy as np
+
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+CONFIG_FILE = "encoder.json"
+
+
+class OnnxEncoder:
+    def __init__(self, model_dir: str, quantized: bool = True, threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, CONFIG_FILE)) as f:
+            self.config = json.load(f)
+        self.max_seq_length = self.config.get("max_seq_length", 256)
+
+        model_path = os.path.join(model_dir, QUANTIZED_FILE if quantized else MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"{model_path} missing – run `flask export-onnx` first")
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.model_path = model_path
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding()
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # mean pooling over real tokens, then L2 normalize (the MiniLM ST head)
+        mask = attention_mask[..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True, **kwargs):
+        """Same call shape as SentenceTransformer.encode (str → 1-D, list → 2-D)."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.config.get("dim", 384)), dtype=np.float32)
+
+        # length-sorted batches pad less; results are put back in input order
+        order = np.argsort([len(t) for t in texts])
+        out = np.empty((len(texts), self.config.get("dim", 384)), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            out[idx] = self._encode_batch([texts[i] for i in idx])
+
+        return out[0] if single else out
+
+
+# ---------- EXPORT ----------
+def export(model_name: str, out_dir: str, quantize: bool = True):
+    """Export the SentenceTransformer's transformer to ONNX (+ int8 copy). Returns written paths."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(out_dir, exist_ok=True)
+    st = SentenceTransformer(model_name, device="cpu")
+    transformer = st[0].auto_model.eval()
+    tokenizer = st.tokenizer
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dynamic_axes = {n: {0: "batch", 1: "sequence"} for n in input_names}
+    dynamic_axes["token_embeddings"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(out_dir, MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[n] for n in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["token_embeddings"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+    written = [model_path]
+
+    if quantize:
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError as e:
+            # onnxruntime.quantization needs the separate `onnx` package
+            raise RuntimeError(
+                f"int8 quantization needs the onnx package ({e}); "
+                "pip install onnx, or re-run with --no-quantize"
+            ) from e
+
+        quantized_path = os.path.join(out_dir, QUANTIZED_FILE)
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        written.append(quantized_path)
+
+    tokenizer.backend_tokenizer.save(os.path.join(out_dir, TOKENIZER_FILE))
+    with open(os.path.join(out_dir, CONFIG_FILE), "w") as f:
+        json.dump({
+            "model_name": model_name,
+            "max_seq_length": st.max_seq_length,
+            "dim": st.get_sentence_embedding_dimension(),
+        }, f, indent=2)
+
+    return written
+
+
+# ---------- PARITY / THROUGHPUT ----------
+def _throughput(encoder, texts, batch_size):
+    encoder.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+    t = time.perf_counter()
+    vectors = encoder.encode(texts, batch_size=batch_size)
+    seconds = time.perf_counter() - t
+    return np.asarray(vectors, dtype=np.float32), seconds
+
+
+def _normalized(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def compare(reference, candidate, texts, queries, batch_size: int = 32, k: int = 3):
+    """
+    Encode the same corpus and queries with both encoders.
+    Returns cosine agreement of the corpus vectors, top-k retrieval
+    overlap for the queries, and texts/second for each encoder.
+    """
+    ref_vecs, ref_seconds = _throughput(reference, texts, batch_size)
+    cand_vecs, cand_seconds = _throughput(candidate, texts, batch_size)
+    ref_vecs, cand_vecs = _normalized(ref_vecs), _normalized(cand_vecs)
+
+    cosines = (ref_vecs * cand_vecs).sum(axis=1)
+
+    top = min(k, len(texts))
+    ref_q = _normalized(np.asarray(reference.encode(queries), dtype=np.float32))
+    cand_q = _normalized(np.asarray(candidate.encode(queries), dtype=np.float32))
+    overlaps = []
+    for rq, cq in zip(ref_q, cand_q):
+        ref_top = set(np.argsort(-(ref_vecs @ rq))[:top])
+        cand_top = set(np.argsort(-(cand_vecs @ cq))[:top])
+        overlaps.append(len(ref_top & cand_top) / top)
+
+    return {
+        "texts": len(texts),
+        "queries": len(queries),
+        "cosine_mean": round(float(cosines.mean()), 5),
+        "cosine_min": round(float(cosines.min()), 5),
+        f"top{k}_overlap": round(float(np.mean(overlaps)), 4),
+        "reference_texts_per_s": round(len(texts) / ref_seconds, 1),
+        "candidate_texts_per_s": round(len(texts) / cand_seconds, 1),
+        "speedup": round(ref_seconds / cand_seconds, 2),
+    }
@@ -0,0 +1,113 @@
+# Backend/ai_engine/pdf_extract.py
+#
+# Page-level PDF text extraction. Small PDFs are read inline; documents
+# with at least POOL_MIN_PAGES pages are split into contiguous page
+# ranges and extracted in a process pool. Either way the result is one
+# Document per page, in page order, with metadata {"source", "page"}
+# (0-based, same as PyPDFLoader) so the splitter carries it to chunks.
+# extract_many() reads a batch of PDFs with one pool task per file.
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_core.documents import Document
+from pypdf import PdfReader
+
+
+POOL_MIN_PAGES = int(os.getenv("PDF_POOL_MIN_PAGES", "8"))
+POOL_WORKERS = int(os.getenv("PDF_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    # "spawn": the app process has torch / Mongo threads that must not be forked.
+    # Workers re-import the main script as __mp_main__; app.py only builds
+    # the app under "__main__" / a normal import, so they stay bare.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _extract_range(pdf_path: str, start: int, end: int):
+    reader = PdfReader(pdf_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def _extract_file(pdf_path: str):
+    return [page.extract_text() or "" for page in PdfReader(pdf_path).pages]
+
+
+def _page_ranges(n_pages: int, parts: int):
+    step = -(-n_pages // parts)  # ceil
+    return [(s, min(s + step, n_pages)) for s in range(0, n_pages, step)]
+
+
+def _documents(pdf_path: str, texts):
+    return [
+        Document(page_content=text, metadata={"source": pdf_path, "page": i})
+        for i, text in enumerate(texts)
+    ]
+
+
+def extract_pages(pdf_path: str, timings: dict = None):
+    """
+    Return one Document per page, in order.
+    Fills timings (if given) with pdf_load seconds, page count and mode.
+    """
+    started = time.perf_counter()
+
+    reader = PdfReader(pdf_path)
+    n_pages = len(reader.pages)
+
+    if n_pages < POOL_MIN_PAGES or POOL_WORKERS < 2:
+        mode = "inline"
+        texts = [page.extract_text() or "" for page in reader.pages]
+    else:
+        mode = "pool"
+        pool = _get_pool()
+        futures = [
+            pool.submit(_extract_range, pdf_path, start, end)
+            for start, end in _page_ranges(n_pages, POOL_WORKERS)
+        ]
+        # futures are in page-range order → concatenating keeps page order
+        texts = [text for f in futures for text in f.result()]
+
+    documents = _documents(pdf_path, texts)
+
+    if timings is not None:
+        timings["pdf_load"] = round(time.perf_counter() - started, 4)
+        timings["pages"] = n_pages
+        timings["extract_mode"] = mode
+
+    return documents
+
+
+def extract_many(pdf_paths):
+    """
+    Read several PDFs at once, one pool task per file. Returns, in input
+    order, each file's Documents or the exception raised while reading it.
+    """
+    if len(pdf_paths) < 2 or POOL_WORKERS < 2:
+        futures = None
+    else:
+        pool = _get_pool()
+        futures = [pool.submit(_extract_file, path) for path in pdf_paths]
+
+    results = []
+    for i, path in enumerate(pdf_paths):
+        try:
+            texts = futures[i].result() if futures else _extract_file(path)
+            results.append(_documents(path, texts))
+        except Exception as e:
+            results.append(e)
+    return results
@@ -0,0 +1,134 @@
+# Backend/ai_engine/rag.py
+#
+# Retrieval + prompt building for report chat, shared by routes/chat.py
+# and the answer-cache precompute (which runs outside a request).
+
+import os
+import time
+
+from dotenv import load_dotenv
+from groq import Groq
+
+from ai_engine.embeddings import encode
+from ai_engine.report_cache import get_store
+from ai_engine.user_index import get_user_index
+
+
+load_dotenv()
+
+ALL_REPORTS_TOP_K = 6
+CHAT_MODEL = "llama-3.3-70b-versatile"
+
+groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+
+SUGGESTED_QUESTIONS = [
+    "Summarize my latest lab report in simple words.",
+    "Is there anything urgent in my latest lab report?",
+    "Explain my latest hemoglobin result.",
+    "Are my cholesterol and glucose values okay?",
+    "What should I focus on improving based on my latest report?",
+]
+
+
+def complete(prompt: str) -> str:
+    response = groq_client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    return response.choices[0].message.content
+
+
+def report_prompt(question, report_id, embedding_path, timings: dict = None):
+    """
+    Returns (prompt, None) when the LLM should be called, or
+    (None, answer) when we can answer directly (missing file...).
+    embedding_load / encode / retrieval seconds go into `timings`.
+    """
+    if timings is None:
+        timings = {}
+
+    if not embedding_path:
+        return None, "No embeddings found for this report."
+
+    # LOAD VECTOR STORE (.npy written by analyzer.py, kept in the LRU cache)
+    t = time.perf_counter()
+    try:
+        store = get_store(report_id, embedding_path)
+    except FileNotFoundError:
+        return None, "Embedding file missing on server."
+    except Exception as e:
+        return None, f"Failed loading embeddings: {str(e)}"
+    timings["embedding_load"] = round(time.perf_counter() - t, 4)
+
+    # ENCODE QUESTION
+    t = time.perf_counter()
+    q_embed = encode(question)
+    timings["encode"] = round(time.perf_counter() - t, 4)
+
+    # RANK CHUNKS → only the top 3 texts are read from disk
+    t = time.perf_counter()
+    top_idx = [i for i, _ in store.search(q_embed, k=3)]
+
+    context = "\n\n".join(store.texts(top_idx))
+    timings["retrieval"] = round(time.perf_counter() - t, 4)
+    timings["context_chars"] = len(context)
+
+    prompt = f"""
+Use ONLY the medical report info below to answer:
+
+{context}
+
+Question: {question}
+
+Give a clear, simple explanation suitable for a patient.
+"""
+
+    return prompt, None
+
+
+def all_reports_prompt(question, email, timings: dict = None):
+    """Same contract as report_prompt, plus the cited sources: (prompt, answer, extra)."""
+    if timings is None:
+        timings = {}
+
+    t = time.perf_counter()
+    index = get_user_index(email)
+    timings["embedding_load"] = round(time.perf_counter() - t, 4)
+
+    t = time.perf_counter()
+    q_embed = encode(question)
+    timings["encode"] = round(time.perf_counter() - t, 4)
+
+    t = time.perf_counter()
+    hits = index.search(q_embed, k=ALL_REPORTS_TOP_K)
+    timings["retrieval"] = round(time.perf_counter() - t, 4)
+    if not hits:
+        return None, "No reports uploaded yet.", {}
+
+    # oldest first, each chunk labelled with the report it came from
+    hits.sort(key=lambda h: h["uploaded_at"] or "")
+    context = "\n\n".join(
+        f"[Report: {h['file_name']}, uploaded {(h['uploaded_at'] or '')[:10]}]\n{h['text']}"
+        for h in hits
+    )
+    timings["context_chars"] = len(context)
+
+    prompt = f"""
+Use ONLY the medical report excerpts below to answer. They come from
+different reports of the same patient; each excerpt starts with the
+report name and upload date. Cite the report when you use a value and
+compare values across dates when the question asks about changes.
+
+{context}
+
+Question: {question}
+
+Give a clear, simple explanation suitable for a patient.
+"""
+
+    sources = [
+        {"report_id": h["report_id"], "file_name": h["file_name"],
+         "uploaded_at": h["uploaded_at"], "score": round(h["score"], 4)}
+        for h in hits
+    ]
+    return prompt, None, {"sources": sources}
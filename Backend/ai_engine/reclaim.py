@@ -0,0 +1,275 @@
+# Backend/ai_engine/reclaim.py
+#
+# Everything a report leaves behind, removed together:
+#   Mongo   reports row, test_results rows, answer_cache entries,
+#           per-user / dashboard counters
+#   memory  report_cache store, user_index rows
+#   files   UploadedPdfs/<sha>.pdf (+ GridFS copy), Embeddings/<sha>.*,
+#           analysis_cache entry – only once no other report shares them
+# delete_reports() is the single delete path used by the user and admin
+# routes. collect_orphans() (`flask gc-orphans`) sweeps what older code
+# or crashed requests left behind, at a throttled rate.
+
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from user_Db.mongo import reports, jobs, analysis_cache, record_reports_removed
+from user_Db.mongo import answer_cache as answer_cache_col
+from user_Db.stats import record_report
+from user_Db.storage import UPLOAD_FOLDER, PENDING_JOB_STATUSES, content_in_use, delete_pdf
+from user_Db.storage import gridfs_orphans, delete_gridfs_file
+from user_Db.lab_results import test_results_col, remove_report_tests, remove_user_tests
+from ai_engine import vector_store
+from ai_engine.analyzer import EMBED_DIR
+from ai_engine.report_cache import invalidate_report
+from ai_engine import user_index
+from ai_engine import answer_cache
+
+
+logger = logging.getLogger(__name__)
+
+# fields of a report needed to undo everything it created
+DELETE_FIELDS = {
+    "_id": 1, "file_id": 1, "user_email": 1, "uploaded_at": 1, "ai_summary.severity": 1,
+    "content_hash": 1, "file_path": 1, "embedding_path": 1,
+}
+
+GC_BATCH_SIZE = int(os.getenv("GC_BATCH_SIZE", "100"))
+GC_FILES_PER_SECOND = float(os.getenv("GC_FILES_PER_SECOND", "50"))
+# younger files may belong to an upload that is still being analyzed
+GC_MIN_AGE_SECONDS = int(os.getenv("GC_MIN_AGE_SECONDS", "3600"))
+
+# every file a vector store is made of, legacy pickles included
+EMBEDDING_SUFFIXES = (".offsets.npy", ".pages.npy", ".npy", ".texts", ".pkl")
+
+
+# ---------- CASCADING DELETE ----------
+def _release_embeddings(path, sha=None):
+    if not path or reports.count_documents({"embedding_path": path}, limit=1):
+        return False
+    # a pending upload of the same bytes may already have picked up the cached analysis
+    if sha and content_in_use(sha):
+        return False
+    if path.endswith(".pkl"):
+        if os.path.exists(path):
+            os.remove(path)
+    else:
+        vector_store.remove(path)
+    return True
+
+
+def _release_files(report):
+    """Drop the report's PDF / vectors / cached analysis unless another report or upload still uses them."""
+    released = delete_pdf(report)
+    if released and report.get("content_hash"):
+        analysis_cache.delete_many({"sha256": report["content_hash"]})
+    _release_embeddings(report.get("embedding_path"), report.get("content_hash"))
+
+
+def delete_reports(query):
+    """Delete the matching reports and every artifact they own. Returns the deleted docs."""
+    # one delete per row, so a concurrent delete of the same report
+    # never undoes its counters / files twice
+    docs = [
+        d for d in reports.find(query, DELETE_FIELDS)
+        if reports.delete_one({"_id": d["_id"]}).deleted_count
+    ]
+    if not docs:
+        return []
+
+    report_ids = [d["file_id"] for d in docs if d.get("file_id")]
+
+    per_user = {}
+    for doc in docs:
+        email = doc.get("user_email")
+        per_user[email] = per_user.get(email, 0) + 1
+        record_report(doc.get("uploaded_at"), doc.get("ai_summary", {}).get("severity"), -1)
+        invalidate_report(doc.get("file_id"), email)
+        user_index.remove_report(email, doc.get("file_id"))
+
+    for email, count in per_user.items():
+        record_reports_removed(email, count)
+
+    answer_cache.invalidate(*report_ids)
+    remove_report_tests(*report_ids)
+
+    # files last: a failure here leaves an orphan for gc-orphans, never a dangling report
+    for doc in docs:
+        try:
+            _release_files(doc)
+        except OSError as e:
+            logger.warning("could not remove files of report %s: %s", doc.get("file_id"), e)
+
+    return docs
+
+
+def delete_user_reports(email):
+    docs = delete_reports({"user_email": email})
+    # rows that outlived their report under older code
+    remove_user_tests(email)
+    invalidate_report(email=email)
+    user_index.drop_user(email)
+    return docs
+
+
+# ---------- ORPHAN GC ----------
+class _Throttle:
+    """Sleep so that at most `per_second` deletions happen per second."""
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second > 0 else 0
+        self.next_at = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_at > now:
+            time.sleep(self.next_at - now)
+        self.next_at = max(now, self.next_at) + self.interval
+
+
+def _referenced(batch_size):
+    """Content hashes, PDF paths and vector-store bases still in use."""
+    hashes, paths, bases = set(), set(), set()
+    for doc in reports.find(
+        {}, {"_id": 0, "content_hash": 1, "file_path": 1, "embedding_path": 1}
+    ).batch_size(batch_size * 10):
+        if doc.get("content_hash"):
+            hashes.add(doc["content_hash"])
+        if doc.get("file_path"):
+            paths.add(os.path.normpath(doc["file_path"]))
+        if doc.get("embedding_path"):
+            bases.add(_embedding_base(os.path.basename(doc["embedding_path"])))
+
+    # queued / running uploads have no report row yet
+    for job in jobs.find({"status": {"$in": PENDING_JOB_STATUSES}}, {"_id": 0, "content_hash": 1}):
+        if job.get("content_hash"):
+            hashes.add(job["content_hash"])
+
+    return hashes, paths, bases
+
+
+def _embedding_base(name):
+    for suffix in EMBEDDING_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def _old_files(folder, min_age):
+    cutoff = time.time() - min_age
+    if not os.path.isdir(folder):
+        return
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                yield entry
+
+
+def _orphan_files(hashes, paths, bases, min_age):
+    for entry in _old_files(UPLOAD_FOLDER, min_age):
+        # .tmp = abandoned streaming upload
+        if entry.name.endswith(".tmp"):
+            yield entry.path
+        elif entry.name.endswith(".pdf"):
+            sha = entry.name[:-len(".pdf")]
+            if sha not in hashes and os.path.normpath(entry.path) not in paths:
+                yield entry.path
+
+    for entry in _old_files(EMBED_DIR, min_age):
+        if entry.name.endswith(".tmp") or _embedding_base(entry.name) not in bases:
+            yield entry.path
+
+
+def _still_orphan(path):
+    """Re-check one candidate: a report or upload may have reused its content since the scan."""
+    if path.endswith(".tmp"):
+        return True
+    base = _embedding_base(os.path.basename(path))
+    if base.endswith(".pdf"):
+        base = base[:-len(".pdf")]
+    return not content_in_use(base)
+
+
+def _orphan_report_ids(collection, batch_size):
+    """report_ids in `collection` whose report no longer exists."""
+    grouped = collection.aggregate([{"$group": {"_id": "$report_id"}}], allowDiskUse=True)
+    for batch in _batches((row["_id"] for row in grouped), batch_size):
+        alive = {d["file_id"] for d in reports.find(
+            {"file_id": {"$in": batch}}, {"_id": 0, "file_id": 1}
+        )}
+        yield from (report_id for report_id in batch if report_id not in alive)
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def collect_orphans(batch_size=GC_BATCH_SIZE, per_second=GC_FILES_PER_SECOND,
+                    min_age=GC_MIN_AGE_SECONDS, dry_run=False, echo=None):
+    """
+    Delete files and rows no report references anymore, `batch_size` at
+    a time and at most `per_second` files per second. Returns counts per kind.
+    """
+    echo = echo or (lambda message: None)
+    throttle = _Throttle(per_second)
+    counts = {"files": 0, "bytes": 0, "gridfs": 0, "analysis_cache": 0,
+              "test_results": 0, "answer_cache": 0}
+
+    hashes, paths, bases = _referenced(batch_size)
+
+    # 1. local PDFs and vector stores
+    for batch in _batches(_orphan_files(hashes, paths, bases, min_age), batch_size):
+        for path in batch:
+            try:
+                size = os.path.getsize(path)
+                if not dry_run:
+                    throttle.wait()
+                    if not _still_orphan(path):
+                        continue
+                    os.remove(path)
+            except FileNotFoundError:
+                continue
+            counts["files"] += 1
+            counts["bytes"] += size
+        echo(f"{'would remove' if dry_run else 'removed'} {counts['files']} files so far")
+
+    # 2. GridFS copies of content no report uses
+    cutoff = datetime.utcnow() - timedelta(seconds=min_age)
+    for batch in _batches(gridfs_orphans(hashes, cutoff), batch_size):
+        for grid_id, sha in batch:
+            if not dry_run:
+                throttle.wait()
+                if not delete_gridfs_file(grid_id, sha):
+                    continue
+            counts["gridfs"] += 1
+
+    # 3. cached analyses of content no report uses
+    stale = analysis_cache.find(
+        {"created_at": {"$lt": cutoff.isoformat()}}, {"_id": 1, "sha256": 1}
+    ).batch_size(batch_size)
+    orphan_entries = (e["_id"] for e in stale if e.get("sha256") not in hashes)
+    for batch in _batches(orphan_entries, batch_size):
+        if not dry_run:
+            analysis_cache.delete_many({"_id": {"$in": batch}})
+        counts["analysis_cache"] += len(batch)
+
+    # 4. derived rows whose report is gone
+    for name, collection in (("test_results", test_results_col), ("answer_cache", answer_cache_col)):
+        for batch in _batches(_orphan_report_ids(collection, batch_size), batch_size):
+            if not dry_run:
+                counts[name] += collection.delete_many({"report_id": {"$in": batch}}).deleted_count
+            else:
+                counts[name] += collection.count_documents({"report_id": {"$in": batch}})
+
+    return counts
@@ -0,0 +1,124 @@
+# Backend/ai_engine/report_cache.py
+#
+# In-process caches for /chat/ask:
+#   - loaded report vectors + texts, LRU bounded by bytes, keyed by report id
+#   - the latest-report lookup per email, with a short TTL, bounded by
+#     entry count; expired entries are dropped on every write
+# Both are per worker; deletes invalidate the local copy and the TTL bounds
+# how long other workers can keep serving a deleted latest report.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from user_Db.mongo import reports
+from ai_engine.vector_store import open_store
+
+
+MAX_BYTES = int(os.getenv("CHAT_EMBED_CACHE_MB", "256")) * 1024 * 1024
+LATEST_TTL_SECONDS = float(os.getenv("CHAT_LATEST_TTL_SECONDS", "30"))
+LATEST_MAX_ENTRIES = int(os.getenv("CHAT_LATEST_MAX_ENTRIES", "10000"))
+
+_lock = threading.Lock()
+
+_stores = OrderedDict()   # report_id → LoadedStore
+_stores_bytes = 0
+_latest = OrderedDict()   # email → (expires_at, report projection or None), oldest write first
+
+_stats = {
+    "store_hits": 0, "store_misses": 0, "store_evictions": 0,
+    "latest_hits": 0, "latest_misses": 0, "latest_evictions": 0,
+}
+
+
+def get_latest_report(email):
+    """Latest report of a user (file_id, embedding_path, uploaded_at), briefly cached."""
+    now = time.monotonic()
+    with _lock:
+        cached = _latest.get(email)
+        if cached and cached[0] > now:
+            _stats["latest_hits"] += 1
+            return cached[1]
+        _stats["latest_misses"] += 1
+
+    latest = reports.find_one(
+        {"user_email": email},
+        {"_id": 0, "file_id": 1, "embedding_path": 1, "uploaded_at": 1},
+        sort=[("uploaded_at", -1)],
+    )
+
+    with _lock:
+        _latest[email] = (now + LATEST_TTL_SECONDS, latest)
+        _latest.move_to_end(email)
+        # one TTL for every entry → write order is expiry order
+        while _latest and (
+            len(_latest) > LATEST_MAX_ENTRIES or next(iter(_latest.values()))[0] <= now
+        ):
+            _latest.popitem(last=False)
+            _stats["latest_evictions"] += 1
+    return latest
+
+
+def get_store(report_id, embedding_path):
+    """Vectors + texts of one report, loaded once and kept in the LRU."""
+    global _stores_bytes
+
+    with _lock:
+        store = _stores.get(report_id)
+        if store is not None:
+            _stores.move_to_end(report_id)
+            _stats["store_hits"] += 1
+            return store
+        _stats["store_misses"] += 1
+
+    store = open_store(embedding_path).load()
+
+    # larger than the whole budget → serve it, don't cache it
+    if store.nbytes > MAX_BYTES:
+        return store
+
+    with _lock:
+        if report_id not in _stores:
+            _stores[report_id] = store
+            _stores_bytes += store.nbytes
+        while _stores_bytes > MAX_BYTES:
+            _, evicted = _stores.popitem(last=False)
+            _stores_bytes -= evicted.nbytes
+            _stats["store_evictions"] += 1
+
+    return store
+
+
+def invalidate_report(report_id=None, email=None):
+    """Drop a report's vectors and/or a user's cached latest-report lookup."""
+    global _stores_bytes
+    with _lock:
+        if report_id is not None:
+            store = _stores.pop(report_id, None)
+            if store is not None:
+                _stores_bytes -= store.nbytes
+        if email is not None:
+            _latest.pop(email, None)
+
+
+def cache_stats():
+    with _lock:
+        stats = dict(_stats)
+        entries = len(_stores)
+        used = _stores_bytes
+        latest_entries = len(_latest)
+
+    def rate(hits, misses):
+        return round(hits / (hits + misses), 3) if hits + misses else 0.0
+
+    return {
+        **stats,
+        "store_hit_rate": rate(stats["store_hits"], stats["store_misses"]),
+        "latest_hit_rate": rate(stats["latest_hits"], stats["latest_misses"]),
+        "store_entries": entries,
+        "store_bytes": used,
+        "store_max_bytes": MAX_BYTES,
+        "latest_entries": latest_entries,
+        "latest_max_entries": LATEST_MAX_ENTRIES,
+    }
@@ -0,0 +1,386 @@
+# Backend/ai_engine/rule_extract.py
+#
+# Deterministic fast path for known lab table layouts. Runs before the
+# Groq step in analyze_report: when a registered format parses the report
+# with high enough confidence, the tests (and a templated summary) are
+# returned and the LLM is skipped entirely.
+#
+# Add a layout by writing a function text → (candidate_rows, [cells])
+# and decorating it with @register_format("name"). Cells are
+# (name, result, reference_range, interpretation) strings; columns are
+# mapped by header name through COLUMN_ROLES, and parsing values/ranges
+# and computing status is shared.
+
+import os
+import re
+import time
+
+
+MIN_CONFIDENCE = float(os.getenv("RULE_MIN_CONFIDENCE", "0.9"))
+MIN_TESTS = int(os.getenv("RULE_MIN_TESTS", "5"))
+# a value this many times past its reference bound makes the report "high"
+SEVERE_DEVIATION = float(os.getenv("RULE_SEVERE_DEVIATION", "1.5"))
+
+FORMATS = {}
+
+
+def register_format(name):
+    def wrap(fn):
+        FORMATS[name] = fn
+        return fn
+    return wrap
+
+
+# ---------- CELL CLEANUP / PARSING ----------
+def clean(cell: str) -> str:
+    # Word → PDF exports sometimes keep LaTeX-ish math: "$12.8 \text{ g/dL}$"
+    cell = cell.replace("$", "")
+    cell = re.sub(r"\\text\{\s*([^}]*)\}", r" \1", cell)
+    cell = cell.replace("\\%", "%").replace("&lt;", "<").replace("&gt;", ">")
+    return re.sub(r"\s+", " ", cell).strip()
+
+
+NUMBER = r"-?\d[\d,]*(?:\.\d+)?|-?\.\d+"
+VALUE_RE = re.compile(rf"^(?P<num>{NUMBER})\s*(?P<unit>.*)$")
+RANGE_BETWEEN_RE = re.compile(rf"^(?P<low>{NUMBER})\s*[–—-]\s*(?P<high>{NUMBER})\s*(?P<unit>.*)$")
+RANGE_BELOW_RE = re.compile(rf"^(?:<=?|≤)\s*(?P<high>{NUMBER})\s*(?P<unit>.*)$")
+RANGE_ABOVE_RE = re.compile(rf"^(?:>=?|≥)\s*(?P<low>{NUMBER})\s*(?P<unit>.*)$")
+
+
+def _num(text):
+    return float(text.replace(",", ""))
+
+
+def parse_value(result: str):
+    """
+    '7,900 /µL' → (7900.0, '/µL'); non-numeric results → (None, '').
+    A ranged result such as '1–2 /hpf' is compared by its upper bound.
+    """
+    m = RANGE_BETWEEN_RE.match(result)
+    if m:
+        return _num(m.group("high")), m.group("unit").strip()
+    m = VALUE_RE.match(result)
+    if not m:
+        return None, ""
+    return _num(m.group("num")), m.group("unit").strip()
+
+
+def parse_range(reference: str):
+    """'13.5 – 17.5 g/dL' → (13.5, 17.5, 'g/dL'); '< 200' → (None, 200.0, ''); unparsable → None."""
+    m = RANGE_BETWEEN_RE.match(reference)
+    if m:
+        return _num(m.group("low")), _num(m.group("high")), m.group("unit").strip()
+    m = RANGE_BELOW_RE.match(reference)
+    if m:
+        return None, _num(m.group("high")), m.group("unit").strip()
+    m = RANGE_ABOVE_RE.match(reference)
+    if m:
+        return _num(m.group("low")), None, m.group("unit").strip()
+    return None
+
+
+def status_from_range(value, low, high):
+    if low is not None and value < low:
+        return "low"
+    if high is not None and value > high:
+        return "high"
+    return "normal"
+
+
+# whole words only: "Pale yellow" is not "low", "abnormal" is not "normal"
+NORMAL_WORDS_RE = re.compile(
+    r"\b(?:normal|within (?:the )?(?:normal |reference )?(?:range|limits)|in range"
+    r"|negative|non-?reactive|optimal|near optimal|ideal|good)\b"
+)
+LOW_WORDS_RE = re.compile(r"\b(?:low|deficien\w*|decreased|below)\b")
+HIGH_WORDS_RE = re.compile(r"\b(?:high|elevated|raised|above|positive|abnormal|reactive|prediabet\w*)\b")
+
+
+def status_from_text(interpretation: str):
+    """
+    The lab's own wording → (status, unambiguous). An explicit "normal"
+    wins; "normal" next to low/high words, both low and high words, or
+    no keyword at all is ambiguous.
+    """
+    text = interpretation.lower()
+    normal = bool(NORMAL_WORDS_RE.search(text))
+    rest = NORMAL_WORDS_RE.sub(" ", text)
+    low = bool(LOW_WORDS_RE.search(rest))
+    high = bool(HIGH_WORDS_RE.search(rest))
+
+    if normal:
+        return "normal", not (low or high)
+    if low != high:
+        return ("low" if low else "high"), True
+    return ("high" if high else "normal"), False
+
+
+def parse_cells(name, result, reference, interpretation=""):
+    """
+    One table row → (test dict, confident). A row is confident when the
+    numeric value and the reference range both parse, when a non-numeric
+    result comes with the lab's own interpretation, or when it is
+    compared against a non-numeric reference ("Negative").
+    """
+    name, result = clean(name), clean(result)
+    reference, interpretation = clean(reference), clean(interpretation)
+
+    value, unit = parse_value(result)
+    ref = parse_range(reference)
+
+    if value is not None and ref is not None:
+        low, high, ref_unit = ref
+        status = status_from_range(value, low, high)
+        unit = unit or ref_unit
+        confident = True
+    elif value is None and not interpretation and ref is None:
+        # qualitative result against a qualitative reference ("Negative"),
+        # or a descriptive row with no reference at all ("Color", "—")
+        expected = reference.strip("—–- ").lower()
+        # the schema has no "abnormal" – a mismatch ("Positive") is flagged high
+        status = "normal" if expected in ("", result.lower()) else "high"
+        confident = True
+    else:
+        status, unambiguous = status_from_text(interpretation)
+        confident = value is None and bool(interpretation) and unambiguous
+
+    display_value = result[: len(result) - len(unit)].strip() if unit and result.endswith(unit) else result
+
+    return {
+        "name": name,
+        "value": display_value,
+        "unit": unit,
+        "normalRange": reference,
+        "status": status,
+        "interpretation": interpretation or f"{result} is {status} (reference {reference}).",
+    }, confident
+
+
+# ---------- COLUMN TEMPLATES ----------
+# header cell → role; columns with other known headers are read and ignored
+COLUMN_ROLES = {
+    "test": "name",
+    "test name": "name",
+    "result": "result",
+    "latest result": "result",
+    "value": "result",
+    "unit": "unit",
+    "units": "unit",
+    "reference range": "reference",
+    "normal range": "reference",
+    "interpretation": "interpretation",
+    "previous": None,
+    "previous result": None,
+    "trend vs previous": None,
+    "trend": None,
+}
+
+
+def _template(header_cells):
+    """Header cells → list of roles, or None if this isn't a results table header."""
+    roles = [COLUMN_ROLES.get(c.strip().lower(), "?") for c in header_cells]
+    if "?" in roles or not {"name", "result", "reference"} <= set(roles):
+        return None
+    return roles
+
+
+def _row(roles, cells):
+    row = {"name": "", "result": "", "unit": "", "reference": "", "interpretation": ""}
+    for role, cell in zip(roles, cells):
+        if role:
+            row[role] = cell
+    if row["unit"]:
+        row["result"] = f"{row['result']} {row['unit']}"
+    return row["name"], row["result"], row["reference"], row["interpretation"]
+
+
+# ---------- REGISTERED LAYOUTS ----------
+@register_format("ascii_pipe_table")
+def _ascii_pipe_table(text):
+    """
+    +------+--------+-----------------+----------------+
+    | Test | Result | Reference Range | Interpretation |
+    | Hemoglobin | 14.6 g/dL | 13.5 – 17.5 g/dL | Normal |
+    """
+    rows, candidates, roles = [], 0, None
+    for line in text.splitlines():
+        line = line.strip()
+        if not (line.startswith("|") and line.count("|") >= 3):
+            continue
+        cells = [c.strip() for c in line.strip("|").split("|")]
+
+        header = _template(cells)
+        if header:
+            roles = header
+            continue
+        if roles is None:
+            continue
+
+        candidates += 1
+        if len(cells) == len(roles):
+            rows.append(_row(roles, cells))
+    return candidates, rows
+
+
+@register_format("cell_per_line_table")
+def _cell_per_line_table(text):
+    """
+    Word tables exported to PDF: one cell per line, header first
+    (Test / [Previous] / Result / Reference Range / [Interpretation]).
+    """
+    lines = [l.strip() for l in text.splitlines() if l.strip()]
+    rows, candidates, i = [], 0, 0
+
+    while i < len(lines):
+        if lines[i].lower() not in COLUMN_ROLES:
+            i += 1
+            continue
+
+        # longest run of known column names starting here
+        j = i
+        while j < len(lines) and lines[j].lower() in COLUMN_ROLES:
+            j += 1
+        roles = _template(lines[i:j])
+        if roles is None:
+            i = j
+            continue
+
+        i, width = j, len(roles)
+        while i + width <= len(lines):
+            cells = lines[i:i + width]
+            # next table header or section title → this table is over
+            if any(c.lower() in COLUMN_ROLES for c in cells):
+                break
+            result = cells[roles.index("result")]
+            if not re.match(r"^\$?\s*(?:\d|\.\d|[A-Za-z]{1,12}$)", result):
+                break
+            candidates += 1
+            rows.append(_row(roles, cells))
+            i += width
+
+    return candidates, rows
+
+
+INLINE_ROW_RE = re.compile(
+    rf"^(?P<name>[A-Za-z][^|]*?)\s+"
+    rf"(?P<result>(?:{NUMBER})(?:\s*[–—-]\s*(?:{NUMBER}))?\s*(?P<unit>[^\s\d<>][^\s]*)?)\s+"
+    rf"(?P<reference>(?:(?:<=?|>=?|≤|≥)\s*(?:{NUMBER})|(?:{NUMBER})\s*[–—-]\s*(?:{NUMBER}))(?:\s*(?P=unit))?)"
+    rf"(?:\s+(?P<interpretation>[A-Za-z][A-Za-z ]*))?$"
+)
+
+
+@register_format("inline_rows")
+def _inline_rows(text):
+    """'Hemoglobin 12.8 g/dL 12.0 – 15.5 g/dL Normal' – whole row on one line."""
+    lines = [clean(l) for l in text.splitlines()]
+    if not any(l.lower().startswith("test result reference range") for l in lines):
+        return 0, []
+
+    rows, candidates = [], 0
+    for line in lines:
+        if not re.search(r"\d", line) or ":" in line:
+            continue
+        candidates += 1
+        m = INLINE_ROW_RE.match(line)
+        if m:
+            rows.append((m.group("name"), m.group("result"), m.group("reference"),
+                         m.group("interpretation") or ""))
+    return candidates, rows
+
+
+# ---------- SUMMARY WITHOUT THE LLM ----------
+def deviation(test):
+    """How far a numeric result is past its reference bound (1.2 = 20% past); None if unknown."""
+    value, _ = parse_value(f"{test['value']} {test['unit']}".strip())
+    ref = parse_range(test["normalRange"])
+    if value is None or ref is None:
+        return None
+    low, high, _ = ref
+    if high is not None and value > high:
+        return value / high if high > 0 else float("inf")
+    if low is not None and value < low:
+        return low / value if value > 0 else float("inf")
+    return 1.0
+
+
+def severity_of(tests):
+    """
+    low: nothing flagged; high: some value at least SEVERE_DEVIATION past
+    its bound; medium otherwise – many mildly raised values stay medium.
+    """
+    abnormal = [t for t in tests if t["status"] != "normal"]
+    if not abnormal:
+        return "low"
+    if any((deviation(t) or 0) >= SEVERE_DEVIATION for t in abnormal):
+        return "high"
+    return "medium"
+
+
+def _summary(tests):
+    abnormal = [t for t in tests if t["status"] != "normal"]
+    severity = severity_of(tests)
+
+    if not abnormal:
+        overall = f"All {len(tests)} tests are within their reference ranges."
+    else:
+        overall = (
+            f"{len(abnormal)} of {len(tests)} tests are outside their reference ranges: "
+            + ", ".join(t["name"] for t in abnormal) + "."
+        )
+
+    key_findings = [
+        f"{t['name']} is {t['status']} ({t['value']} {t['unit']}, reference {t['normalRange']})".replace("  ", " ")
+        for t in abnormal
+    ] or ["No out-of-range results."]
+
+    recommendations = (
+        ["Discuss the out-of-range results with your doctor.",
+         "Repeat the abnormal tests as advised to confirm the trend."]
+        if abnormal else
+        ["Keep up your current routine and repeat tests as your doctor advises."]
+    )
+
+    return {
+        "summary": overall,
+        "key_findings": key_findings,
+        "recommendations": recommendations,
+        "severity": severity,
+    }
+
+
+def extract(full_text: str, timings: dict = None):
+    """
+    Try every registered layout. Returns the same dict shape as
+    llm_extract.extract() when one parses confidently, else None.
+    """
+    if timings is None:
+        timings = {}
+    t = time.perf_counter()
+
+    best = None
+    for name, fn in FORMATS.items():
+        candidates, rows = fn(full_text)
+        if not rows:
+            continue
+
+        parsed = [parse_cells(*row) for row in rows]
+        tests = [test for test, _ in parsed]
+        confident = sum(1 for _, ok in parsed if ok)
+        confidence = confident / max(candidates, len(rows))
+
+        if best is None or (confidence, len(tests)) > (best[1], len(best[2])):
+            best = (name, confidence, tests)
+
+    timings["rule_parse"] = round(time.perf_counter() - t, 4)
+
+    if best is None:
+        return None
+
+    name, confidence, tests = best
+    timings["rule_format"] = name
+    timings["rule_confidence"] = round(confidence, 3)
+
+    if confidence < MIN_CONFIDENCE or len(tests) < MIN_TESTS:
+        return None
+
+    return {**_summary(tests), "tests": tests}
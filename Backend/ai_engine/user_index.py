@@ -0,0 +1,247 @@
+# Backend/ai_engine/user_index.py
+#
+# Per-user retrieval index over the chunks of ALL of a user's reports,
+# so /chat/ask can answer "how has X changed since January".
+#
+# Vectors of every report are packed into one contiguous float32 matrix;
+# top-k is an argpartition over it (or a faiss HNSW index once the user
+# has a large history). Reports are added / removed incrementally – new
+# rows are appended to the HNSW graph, removed rows are tombstoned and
+# filtered out at query time until ANN_MAX_DEAD_FRACTION of the graph is
+# dead, then it is rebuilt – and each search first syncs against the user's report list in Mongo so workers
+# that didn't see an upload or delete still converge.
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from user_Db.mongo import reports
+from ai_engine.vector_store import open_store, normalize
+
+try:
+    import faiss
+except ImportError:  # optional – exact search works without it
+    faiss = None
+
+
+MAX_USERS = int(os.getenv("USER_INDEX_MAX_USERS", "64"))
+ANN_MIN_ROWS = int(os.getenv("USER_INDEX_ANN_MIN_ROWS", "20000"))
+ANN_MAX_DEAD_FRACTION = float(os.getenv("USER_INDEX_ANN_MAX_DEAD_FRACTION", "0.25"))
+
+
+class UserIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._vectors = None            # (capacity, dim) float32
+        self._owner = np.zeros(0, dtype=np.int64)   # slot per row, -1 = removed
+        self._chunk = np.zeros(0, dtype=np.int64)   # chunk index inside its report
+        self._n = 0
+        self._dead = 0
+        self._slots = {}                # slot → {"meta", "store"}
+        self._by_report = {}            # report_id → slot
+        self._next_slot = 0
+        self._ann = None
+        self._ann_rows = None           # HNSW id → matrix row
+        self._ann_dead = 0              # tombstoned rows still in the graph
+
+    # ---------- maintenance ----------
+    def report_ids(self):
+        return set(self._by_report)
+
+    def add_report(self, meta, store):
+        """meta = {"file_id", "file_name", "uploaded_at"}; store = VectorStore."""
+        if meta["file_id"] in self._by_report:
+            return
+
+        vectors = np.asarray(store.vectors, dtype=np.float32)
+        rows = vectors.shape[0]
+
+        slot = self._next_slot
+        self._next_slot += 1
+        self._slots[slot] = {"meta": meta, "store": store}
+        self._by_report[meta["file_id"]] = slot
+
+        if rows == 0:
+            return
+
+        self._reserve(self._n + rows, vectors.shape[1])
+        self._vectors[self._n:self._n + rows] = vectors
+        self._owner[self._n:self._n + rows] = slot
+        self._chunk[self._n:self._n + rows] = np.arange(rows)
+        if self._ann is not None:
+            self._ann.add(np.ascontiguousarray(vectors))
+            self._ann_rows = np.concatenate([self._ann_rows, np.arange(self._n, self._n + rows)])
+        self._n += rows
+
+    def remove_report(self, report_id):
+        slot = self._by_report.pop(report_id, None)
+        if slot is None:
+            return
+        self._slots.pop(slot, None)
+
+        live = self._owner[:self._n]
+        mask = live == slot
+        self._dead += int(mask.sum())
+        live[mask] = -1
+        if self._ann is not None:
+            self._ann_dead += int(mask.sum())
+
+        # compact once half of the matrix is tombstones (rows move → new graph)
+        if self._dead and self._dead * 2 >= self._n:
+            self._ann = None
+            keep = np.nonzero(live >= 0)[0]
+            n = len(keep)
+            self._vectors[:n] = self._vectors[keep]
+            self._owner[:n] = self._owner[keep]
+            self._chunk[:n] = self._chunk[keep]
+            self._n, self._dead = n, 0
+
+    def _reserve(self, rows, dim):
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2, 256)
+        vectors = np.zeros((new_capacity, dim), dtype=np.float32)
+        owner = np.full(new_capacity, -1, dtype=np.int64)
+        chunk = np.zeros(new_capacity, dtype=np.int64)
+        if self._n:
+            vectors[:self._n] = self._vectors[:self._n]
+            owner[:self._n] = self._owner[:self._n]
+            chunk[:self._n] = self._chunk[:self._n]
+        self._vectors, self._owner, self._chunk = vectors, owner, chunk
+
+    # ---------- search ----------
+    def _candidates(self, q, k):
+        live_rows = self._n - self._dead
+
+        if faiss is not None and live_rows >= ANN_MIN_ROWS:
+            if self._ann is None or self._ann_dead > ANN_MAX_DEAD_FRACTION * len(self._ann_rows):
+                self._build_ann()
+            return self._ann_candidates(q, k)
+
+        sims = self._vectors[:self._n] @ q
+        sims[self._owner[:self._n] < 0] = -np.inf
+        k = min(k, live_rows)
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(int(i), float(sims[i])) for i in top]
+
+    def _build_ann(self):
+        rows = np.nonzero(self._owner[:self._n] >= 0)[0]
+        index = faiss.IndexHNSWFlat(self._vectors.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+        index.add(np.ascontiguousarray(self._vectors[rows]))
+        self._ann, self._ann_rows, self._ann_dead = index, rows, 0
+
+    def _ann_candidates(self, q, k):
+        # skip tombstones, widening until k live rows
+        wanted, total = k, len(self._ann_rows)
+        while True:
+            scores, idx = self._ann.search(q.reshape(1, -1), min(wanted, total))
+            hits = [(int(self._ann_rows[i]), float(s))
+                    for i, s in zip(idx[0], scores[0]) if i >= 0]
+            hits = [(row, s) for row, s in hits if self._owner[row] >= 0]
+            if len(hits) >= k or wanted >= total:
+                return hits[:k]
+            wanted *= 2
+
+    def search(self, query_vector, k: int = 5):
+        """
+        Return the k best chunks across all reports, best first:
+        [{"report_id", "file_name", "uploaded_at", "score", "text"}]
+        """
+        q = normalize(query_vector)
+        results = []
+
+        with self.lock:
+            if self._n - self._dead <= 0:
+                return []
+
+            for row, score in self._candidates(q, k):
+                entry = self._slots[int(self._owner[row])]
+                meta = entry["meta"]
+                results.append({
+                    "report_id": meta["file_id"],
+                    "file_name": meta.get("file_name"),
+                    "uploaded_at": meta.get("uploaded_at"),
+                    "score": score,
+                    "text": entry["store"].texts([int(self._chunk[row])])[0],
+                })
+
+        return results
+
+
+# ------------------------------------------------
+# per-worker registry of user indexes
+# ------------------------------------------------
+_lock = threading.Lock()
+_indexes = OrderedDict()   # email → UserIndex
+
+
+def _get(email, create=False):
+    with _lock:
+        index = _indexes.get(email)
+        if index is not None:
+            _indexes.move_to_end(email)
+        elif create:
+            index = _indexes[email] = UserIndex()
+            while len(_indexes) > MAX_USERS:
+                _indexes.popitem(last=False)
+        return index
+
+
+def _open_meta(doc):
+    meta = {k: doc.get(k) for k in ("file_id", "file_name", "uploaded_at")}
+    return meta, open_store(doc["embedding_path"])
+
+
+def get_user_index(email):
+    """The user's index, brought in sync with their reports in Mongo."""
+    index = _get(email, create=True)
+
+    docs = {
+        d["file_id"]: d
+        for d in reports.find(
+            {"user_email": email},
+            {"_id": 0, "file_id": 1, "file_name": 1, "uploaded_at": 1, "embedding_path": 1},
+        )
+        if d.get("embedding_path")
+    }
+
+    with index.lock:
+        present = index.report_ids()
+        for report_id in present - docs.keys():
+            index.remove_report(report_id)
+        for report_id in docs.keys() - present:
+            try:
+                index.add_report(*_open_meta(docs[report_id]))
+            except FileNotFoundError:
+                continue
+
+    return index
+
+
+def add_report(email, report_doc):
+    """Incremental insert after an upload (only if this worker has the index loaded)."""
+    index = _get(email)
+    if index is None or not report_doc.get("embedding_path"):
+        return
+    with index.lock:
+        try:
+            index.add_report(*_open_meta(report_doc))
+        except FileNotFoundError:
+            pass
+
+
+def remove_report(email, report_id):
+    index = _get(email)
+    if index is None:
+        return
+    with index.lock:
+        index.remove_report(report_id)
+
+
+def drop_user(email):
+    with _lock:
+        _indexes.pop(email, None)
@@ -0,0 +1,156 @@
+# Backend/ai_engine/vector_store.py
+#
+# On-disk vector store for one report, replacing Embeddings/<name>.pkl:
+#   <name>.npy          L2-normalized vectors, opened with mmap_mode="r"
+#   <name>.offsets.npy  int64 byte offsets into the texts file (N + 1 entries)
+#   <name>.texts        UTF-8 chunk texts, concatenated
+#   <name>.pages.npy    optional int32 source page (0-based) of each chunk
+# A query only touches the vector pages and the top-k texts it returns.
+
+import os
+import pickle
+import uuid
+
+import numpy as np
+
+
+# float16 halves disk / page-cache use at a small precision cost
+VECTOR_DTYPE = np.dtype(os.getenv("VECTOR_DTYPE", "float32"))
+
+
+def _paths(vectors_path: str):
+    base = vectors_path[:-len(".npy")] if vectors_path.endswith(".npy") else vectors_path
+    return base + ".npy", base + ".offsets.npy", base + ".texts"
+
+
+def _pages_path(vectors_path: str):
+    return _paths(vectors_path)[0][:-len(".npy")] + ".pages.npy"
+
+
+def _tmp_path(path: str) -> str:
+    # unique per writer: the same PDF uploaded twice at once writes the same store
+    return f"{path}.{uuid.uuid4().hex}.tmp"
+
+
+def _atomic_save_npy(path: str, array):
+    tmp = _tmp_path(path)
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def save(base_path: str, texts, vectors, pages=None) -> str:
+    """Write texts + vectors (+ chunk page numbers) for one report. Returns the .npy path to store in Mongo."""
+    vectors_path, offsets_path, texts_path = _paths(base_path)
+
+    encoded = [t.encode("utf-8") for t in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+
+    tmp = _tmp_path(texts_path)
+    with open(tmp, "wb") as f:
+        for b in encoded:
+            f.write(b)
+    os.replace(tmp, texts_path)
+
+    _atomic_save_npy(offsets_path, offsets)
+    if pages is not None:
+        _atomic_save_npy(_pages_path(base_path), np.asarray(pages, dtype=np.int32))
+    # vectors last – their presence marks the store as complete
+    _atomic_save_npy(vectors_path, normalize(vectors).astype(VECTOR_DTYPE))
+
+    return vectors_path
+
+
+def exists(vectors_path: str) -> bool:
+    return all(os.path.exists(p) for p in _paths(vectors_path))
+
+
+def remove(vectors_path: str):
+    for p in (*_paths(vectors_path), _pages_path(vectors_path)):
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def top_k(vectors, query_vector, k: int = 3):
+    """Return [(row_index, score)] for the k rows most similar to the query, best first."""
+    n = vectors.shape[0]
+    if n == 0:
+        return []
+
+    q = normalize(query_vector).astype(vectors.dtype, copy=False)
+    sims = vectors @ q
+
+    k = min(k, n)
+    top = np.argpartition(-sims, k - 1)[:k]
+    top = top[np.argsort(-sims[top])]
+    return [(int(i), float(sims[i])) for i in top]
+
+
+class VectorStore:
+    def __init__(self, vectors_path: str):
+        vectors_path, offsets_path, texts_path = _paths(vectors_path)
+        self.vectors = np.load(vectors_path, mmap_mode="r")
+        self.offsets = np.load(offsets_path, mmap_mode="r")
+        self.texts_path = texts_path
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def search(self, query_vector, k: int = 3):
+        """Return [(chunk_index, score)] for the k best chunks, best first."""
+        return top_k(self.vectors, query_vector, k)
+
+    def load(self):
+        """Read the whole store into RAM (used by the chat LRU cache)."""
+        return LoadedStore(np.array(self.vectors), self.texts(range(len(self))))
+
+    def texts(self, indices):
+        out = []
+        with open(self.texts_path, "rb") as f:
+            for i in indices:
+                start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+                f.seek(start)
+                out.append(f.read(end - start).decode("utf-8"))
+        return out
+
+
+class LoadedStore:
+    """Same search / texts interface as VectorStore, fully in memory."""
+
+    def __init__(self, vectors, texts):
+        self.vectors = vectors
+        self._texts = texts
+        self.nbytes = vectors.nbytes + sum(len(t.encode("utf-8")) for t in texts)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def search(self, query_vector, k: int = 3):
+        return top_k(self.vectors, query_vector, k)
+
+    def texts(self, indices):
+        return [self._texts[i] for i in indices]
+
+
+def open_store(path: str) -> VectorStore:
+    # reports still pointing at a legacy .pkl resolve to its migrated .npy
+    if path.endswith(".pkl"):
+        path = path[:-len(".pkl")] + ".npy"
+    if not exists(path):
+        raise FileNotFoundError(path)
+    return VectorStore(path)
+
+
+def migrate_pickle(pkl_path: str) -> str:
+    """Convert a legacy {"texts", "vectors"} pickle into the mmap format."""
+    with open(pkl_path, "rb") as f:
+        data = pickle.load(f)
+    return save(pkl_path[:-len(".pkl")], data["texts"], data["vectors"])
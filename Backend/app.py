@@ -1,32 +1,83 @@
+import os
+
 from flask import Flask
 from flask_cors import CORS
 
-from routes.upload import upload_bp
-from routes.auth import auth
-from routes.profile import profile_bp
-from routes.chat import chat_bp
-from routes.admin import admin_bp
-from routes.admin_dashboard import admin_dashboard_bp
 
+def create_app():
+    # imports live here so that a spawned pool worker, which re-imports
+    # this script as __mp_main__ (see ai_engine/pdf_extract.py), loads
+    # neither the routes nor the models
+    from routes.upload import upload_bp
+    from routes.auth import auth
+    from routes.profile import profile_bp
+    from routes.chat import chat_bp
+    from routes.admin import admin_bp
+    from routes.admin_dashboard import admin_dashboard_bp
+
+
+
+    from routes.admin_reports import admin_reports_bp
+    from routes.metrics import metrics_bp
+    from routes.trends import trends_bp
+    from ai_engine.jobs import resume_pending_jobs_once
+    from ai_engine.embeddings import warm_up
+    from cli import register_commands
+    import metrics
+    import http_cache
+    from user_Db.indexes import ensure_indexes
+    from user_Db.storage import MAX_REQUEST_BYTES
+    from dotenv import load_dotenv
+    load_dotenv()   # <-- LOAD THE .env FILE
+
+
+    app = Flask(__name__)
+    # reject oversized bodies before they are read; /upload-reports raises
+    # the limit for its own requests only
+    app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BYTES
+    CORS(app, supports_credentials=True, resources={r"/*": {"origins": "*"}},methods=["GET", "POST", "PUT", "DELETE"])
+
+
+    app.register_blueprint(auth, url_prefix="/auth")
+    app.register_blueprint(profile_bp)
+    app.register_blueprint(upload_bp)
+    app.register_blueprint(trends_bp)
+    app.register_blueprint(chat_bp, url_prefix="/chat")
+    app.register_blueprint(admin_bp, url_prefix="/admin")
+
+    app.register_blueprint(admin_reports_bp,url_prefix="/admin")
+    app.register_blueprint(admin_dashboard_bp,url_prefix="/admin")
+    app.register_blueprint(metrics_bp)
+
+    # per-route latency histograms (+ REQUEST_LOG=true JSON lines) for /metrics
+    metrics.init_app(app)
 
+    # gzip / brotli for JSON bodies ≥ COMPRESS_MIN_BYTES
+    http_cache.init_compression(app)
 
-from routes.admin_reports import admin_reports_bp
-from dotenv import load_dotenv
-load_dotenv()   # <-- LOAD THE .env FILE
+    register_commands(app)
 
+    # create missing Mongo indexes (idempotent); `flask ensure-indexes` does the same
+    if os.getenv("ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true":
+        try:
+            for error in ensure_indexes()["errors"]:
+                app.logger.warning("index not created: %s", error)
+        except Exception as e:
+            app.logger.warning("index bootstrap skipped: %s", e)
 
-app = Flask(__name__)
-CORS(app, supports_credentials=True, resources={r"/*": {"origins": "*"}},methods=["GET", "POST", "PUT", "DELETE"])
+    # optional: load MiniLM now (e.g. in the gunicorn master with --preload)
+    # instead of lazily on the first upload / chat request
+    if os.getenv("PRELOAD_EMBEDDING_MODEL", "false").lower() == "true":
+        warm_up(probe=False)
 
+    # pick up upload jobs that were queued/running when the process stopped
+    app.before_request(resume_pending_jobs_once)
 
-app.register_blueprint(auth, url_prefix="/auth")
-app.register_blueprint(profile_bp)
-app.register_blueprint(upload_bp)
-app.register_blueprint(chat_bp, url_prefix="/chat")
-app.register_blueprint(admin_bp, url_prefix="/admin")
+    return app
 
-app.register_blueprint(admin_reports_bp,url_prefix="/admin")
-app.register_blueprint(admin_dashboard_bp,url_prefix="/admin")
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
+elif __name__ != "__mp_main__":
+    # `gunicorn app:app`, `flask run`, `from app import app`
+    app = create_app()
@@ -0,0 +1,436 @@
+# Backend/benchmark.py
+#
+# Offline load benchmark: runs the Flask app in-process against stand-ins
+# for the two external services, so numbers are comparable between runs
+# and never touch live Groq or production Mongo.
+#   - Groq   → FakeGroq: canned JSON / answers after --groq-latency seconds
+#   - Mongo  → mongomock (default) or a throwaway database on --mongo-uri
+# The database is seeded with --users users and --reports reports, then
+# each endpoint is driven at every --concurrency level and p50/p95/p99
+# latency + throughput are printed (and optionally written as JSON).
+#
+#   python benchmark.py --users 200 --reports 2000 --concurrency 1,8,32
+#   python benchmark.py --json bench.json --baseline last_deploy.json
+#
+# With --baseline the run exits 1 when any endpoint's p95 got more than
+# --max-regression slower, so it can gate a deploy. Any 5xx response also
+# fails the run – latencies of failing requests mean nothing.
+# The admin listings use $lookup with let/pipeline, which mongomock does
+# not implement, so they only run with --mongo-uri; without it they are
+# listed as SKIPPED under the results. Dashboard counters are seeded
+# through the same record_* helpers uploads and signups use.
+# Runs in a temporary working directory (UploadedPdfs/, Embeddings/).
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+DEFAULT_PDF = os.path.join(BACKEND_DIR, "Files", "Ryan_19March2025.pdf")
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2
+
+# scenarios whose queries mongomock can't execute
+NEEDS_REAL_MONGO = {"admin_reports", "admin_reports_user", "admin_users"}
+
+CANNED_TESTS = [
+    {"name": "Hemoglobin", "value": "14.1", "unit": "g/dL", "normalRange": "13.5 - 17.5",
+     "status": "normal", "interpretation": "Within the normal range."},
+    {"name": "LDL", "value": "142", "unit": "mg/dL", "normalRange": "< 130",
+     "status": "high", "interpretation": "Slightly above the recommended level."},
+    {"name": "Fasting Glucose", "value": "92", "unit": "mg/dL", "normalRange": "70 - 99",
+     "status": "normal", "interpretation": "Within the normal range."},
+]
+CANNED_SUMMARY = {
+    "summary": "Most results are normal; LDL cholesterol is mildly elevated.",
+    "key_findings": ["LDL above target"],
+    "recommendations": ["Review diet and repeat lipid panel in 3 months"],
+    "severity": "medium",
+}
+CANNED_ANSWER = (
+    "Your results are mostly within normal ranges. LDL cholesterol is a little "
+    "high, which is common and usually improves with diet and exercise."
+)
+
+
+# ---------- STAND-INS ----------
+class FakeGroq:
+    """Duck-types groq.Groq().chat.completions.create for the prompts this app sends."""
+
+    def __init__(self, latency: float, ttft: float):
+        self.latency = latency
+        self.ttft = min(ttft, latency)
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=self)
+
+    def _content(self, prompt: str) -> str:
+        if "Lab Report Text" in prompt:
+            return json.dumps({**CANNED_SUMMARY, "tests": CANNED_TESTS})
+        if "Lab Report Section" in prompt:
+            return json.dumps({"tests": CANNED_TESTS})
+        if "These are all the test results" in prompt:
+            return json.dumps(CANNED_SUMMARY)
+        return CANNED_ANSWER
+
+    def create(self, model, messages, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+        content = self._content(messages[-1]["content"])
+
+        if not stream:
+            time.sleep(self.latency)
+            message = SimpleNamespace(content=content)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+        return self._stream(content)
+
+    def _stream(self, content):
+        words = content.split(" ")
+        time.sleep(self.ttft)
+        per_token = (self.latency - self.ttft) / max(len(words), 1)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(per_token)
+            delta = SimpleNamespace(content=word if i == 0 else " " + word)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def fake_encode(texts, **kwargs):
+    """Deterministic pseudo-embeddings (hash-seeded) for runs without the model."""
+    single = isinstance(texts, str)
+    rows = []
+    for text in [texts] if single else texts:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+        rows.append(np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).astype(np.float32))
+    vectors = np.vstack(rows) if rows else np.zeros((0, EMBEDDING_DIM), np.float32)
+    return vectors[0] if single else vectors
+
+
+def use_mongo(uri: str):
+    """Point user_Db.mongo at mongomock, or at a fresh database on a local server."""
+    from user_Db import mongo
+
+    if uri:
+        from pymongo import MongoClient
+        mongo.MONGO_DB = f"LabInsightBench_{os.getpid()}"
+        mongo._client = MongoClient(uri)
+        return lambda: mongo._client.drop_database(mongo.MONGO_DB)
+
+    try:
+        import mongomock
+    except ImportError:
+        sys.exit("mongomock is not installed: pip install mongomock, or pass --mongo-uri")
+    try:
+        import mongomock.gridfs
+        mongomock.gridfs.enable_gridfs_integration()
+    except ImportError:
+        pass
+    mongo._client = mongomock.MongoClient()
+    return lambda: None
+
+
+def install_fakes(groq: FakeGroq, encoder):
+    from ai_engine import llm_extract, rag, analyzer, embeddings
+
+    llm_extract.client = groq
+    rag.groq_client = groq
+
+    if encoder is not None:
+        # every module imported encode by name, so patch each binding
+        embeddings.encode = encoder
+        rag.encode = encoder
+        analyzer.encode = encoder
+
+
+# ---------- SEED ----------
+def seed(n_users: int, n_reports: int, rng: random.Random):
+    from user_Db.mongo import users_col, profiles_col, reports, rebuild_report_counters
+    from user_Db.stats import record_signup, record_report
+    from ai_engine import vector_store
+
+    now = datetime.utcnow()
+    emails = [f"user{i}@bench.local" for i in range(n_users)]
+
+    users = [
+        {"name": f"Bench User {i}", "email": email, "password": "bench",
+         "created_at": (now - timedelta(days=rng.randint(0, 365))).isoformat()}
+        for i, email in enumerate(emails)
+    ]
+    users_col.insert_many(users)
+    profiles_col.insert_many([{"name": f"Bench User {i}", "email": email}
+                              for i, email in enumerate(emails)])
+
+    # one shared vector store keeps seeding fast; chat cost doesn't depend on which report
+    os.makedirs("Embeddings", exist_ok=True)
+    texts = [f"Hemoglobin {13 + i % 4}.{i % 10} g/dL, LDL {120 + i} mg/dL, glucose {85 + i % 15} mg/dL"
+             for i in range(40)]
+    vectors = np.random.default_rng(0).standard_normal((len(texts), EMBEDDING_DIM)).astype(np.float32)
+    embedding_path = vector_store.save(os.path.join("Embeddings", "bench_seed"), texts, vectors)
+
+    docs = []
+    for i in range(n_reports):
+        severity = rng.choice(["low", "medium", "high"])
+        docs.append({
+            "file_id": f"bench-{i}",
+            "user_email": emails[i % n_users],
+            "file_name": f"report_{i}.pdf",
+            "file_path": os.path.join("UploadedPdfs", f"bench_{i}.pdf"),
+            "content_hash": f"bench{i}",
+            "embedding_path": embedding_path,
+            "ai_summary": {
+                "overall": CANNED_SUMMARY["summary"],
+                "keyFindings": CANNED_SUMMARY["key_findings"],
+                "recommendations": CANNED_SUMMARY["recommendations"],
+                "severity": severity,
+            },
+            "testResults": CANNED_TESTS,
+            "uploaded_at": (now - timedelta(minutes=rng.randint(0, 60 * 24 * 180))).isoformat(),
+        })
+    for start in range(0, len(docs), 1000):
+        reports.insert_many(docs[start:start + 1000])
+
+    rebuild_report_counters()
+    # the incremental path, not rebuild_stats(): mongomock has no $substrCP
+    for user in users:
+        record_signup(user["created_at"])
+    for doc in docs:
+        record_report(doc["uploaded_at"], doc["ai_summary"]["severity"])
+    return emails
+
+
+# ---------- LOAD ----------
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def run_endpoint(app, make_request, n_requests: int, concurrency: int):
+    """Fire n_requests through `concurrency` threads; each thread has its own test client."""
+    latencies, errors, server_errors = [], 0, 0
+    lock = threading.Lock()
+    local = threading.local()
+    counter = iter(range(n_requests))
+
+    def worker():
+        nonlocal errors, server_errors
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            started = time.perf_counter()
+            response = make_request(local.client, i)
+            _ = response.get_data()  # drain streamed bodies
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code >= 400:
+                    errors += 1
+                if response.status_code >= 500:
+                    server_errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for f in [pool.submit(worker) for _ in range(concurrency)]:
+            f.result()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "server_errors": server_errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+    }
+
+
+def scenarios(emails, pdf_bytes, rng: random.Random, unique_questions: bool):
+    from ai_engine.rag import SUGGESTED_QUESTIONS
+
+    def upload(client, i):
+        # a distinct trailing comment per request → new content hash → real analysis
+        body = pdf_bytes + f"\n%bench-{time.time_ns()}-{i}\n".encode()
+        return client.post("/upload-report", data={
+            "email": rng.choice(emails),
+            "file": (io.BytesIO(body), f"bench_{i}.pdf"),
+        }, content_type="multipart/form-data")
+
+    def chat(client, i):
+        question = rng.choice(SUGGESTED_QUESTIONS)
+        if unique_questions:
+            question = f"{question} ({i})"
+        return client.post("/chat/ask", json={"question": question, "email": rng.choice(emails)})
+
+    def chat_stream(client, i):
+        return client.post("/chat/ask/stream", json={
+            "question": f"{rng.choice(SUGGESTED_QUESTIONS)} ({i})", "email": rng.choice(emails),
+        })
+
+    return {
+        "upload_report": upload,
+        "chat_ask": chat,
+        "chat_ask_stream": chat_stream,
+        "admin_reports": lambda c, i: c.get("/admin/reports?limit=50"),
+        "admin_reports_user": lambda c, i: c.get(
+            f"/admin/reports?limit=50&user=user{i % len(emails)}@bench.local"
+        ),
+        "admin_users": lambda c, i: c.get("/admin/users?limit=50"),
+        "dashboard_user_growth": lambda c, i: c.get("/admin/dashboard/user-growth"),
+        "dashboard_report_status": lambda c, i: c.get("/admin/dashboard/report-status"),
+        "dashboard_uploads_per_day": lambda c, i: c.get("/admin/dashboard/uploads-per-day"),
+        "dashboard_recent_activity": lambda c, i: c.get("/admin/dashboard/recent-activity"),
+    }
+
+
+# ---------- REPORT ----------
+def print_table(results):
+    header = f"{'endpoint':28} {'conc':>4} {'reqs':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        print(f"{row['endpoint']:28} {row['concurrency']:>4} {row['requests']:>5} {row['errors']:>4} "
+              f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9} {row['throughput_rps']:>8}")
+
+
+def compare(results, baseline_path: str, max_regression: float):
+    """Rows whose p95 is more than max_regression slower than the baseline run."""
+    with open(baseline_path) as f:
+        baseline = {(r["endpoint"], r["concurrency"]): r for r in json.load(f)["results"]}
+
+    regressions = []
+    for row in results:
+        old = baseline.get((row["endpoint"], row["concurrency"]))
+        if old and old["p95_ms"] and row["p95_ms"] > old["p95_ms"] * (1 + max_regression):
+            regressions.append((row["endpoint"], row["concurrency"], old["p95_ms"], row["p95_ms"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline LabInsight backend benchmark")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--reports", type=int, default=1000)
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint per level")
+    parser.add_argument("--upload-requests", type=int, default=20, help="uploads per level (they are slow)")
+    parser.add_argument("--endpoints", help="comma-separated subset of scenario names")
+    parser.add_argument("--groq-latency", type=float, default=0.8, help="seconds per fake Groq call")
+    parser.add_argument("--groq-ttft", type=float, default=0.2, help="seconds to first streamed token")
+    parser.add_argument("--mongo-uri", help="use a temporary database on this server instead of mongomock")
+    parser.add_argument("--fake-encoder", action="store_true", help="skip the MiniLM model (hash vectors)")
+    parser.add_argument("--unique-questions", action="store_true", help="defeat the chat answer cache")
+    parser.add_argument("--force-llm", action="store_true", help="disable the rule-based table parser")
+    parser.add_argument("--pdf", default=DEFAULT_PDF, help="sample PDF used for upload requests")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results JSON of a previous run to compare p95 against")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    with open(args.pdf, "rb") as f:
+        pdf_bytes = f.read()
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    workdir = tempfile.mkdtemp(prefix="labinsight-bench-")
+    os.chdir(workdir)
+    os.environ.setdefault("ENSURE_INDEXES_ON_STARTUP", "true")
+    os.environ["ASYNC_UPLOADS"] = "false"
+    # llm_extract / rag build their Groq clients at import; FakeGroq replaces both
+    os.environ["GROQ_API_KEY"] = "offline-benchmark"
+
+    drop_database = use_mongo(args.mongo_uri)
+    groq = FakeGroq(args.groq_latency, args.groq_ttft)
+
+    try:
+        from app import app
+        install_fakes(groq, fake_encode if args.fake_encoder else None)
+        if args.force_llm:
+            from ai_engine import rule_extract
+            rule_extract.MIN_CONFIDENCE = float("inf")
+
+        rng = random.Random(args.seed)
+        t = time.perf_counter()
+        emails = seed(args.users, args.reports, rng)
+        print(f"seeded {args.users} users / {args.reports} reports in {time.perf_counter() - t:.1f}s "
+              f"(workdir {workdir})")
+
+        all_scenarios = scenarios(emails, pdf_bytes, rng, args.unique_questions)
+        selected = args.endpoints.split(",") if args.endpoints else list(all_scenarios)
+        unknown = set(selected) - set(all_scenarios)
+        if unknown:
+            sys.exit(f"unknown endpoints: {', '.join(sorted(unknown))} (have {', '.join(all_scenarios)})")
+        skipped = []
+        if not args.mongo_uri:
+            skipped = [name for name in selected if name in NEEDS_REAL_MONGO]
+            if args.endpoints and skipped:
+                sys.exit(f"{', '.join(skipped)} need --mongo-uri (mongomock lacks $lookup pipelines)")
+            selected = [name for name in selected if name not in NEEDS_REAL_MONGO]
+
+        results = []
+        for concurrency in [int(c) for c in args.concurrency.split(",")]:
+            for name in selected:
+                n = args.upload_requests if name == "upload_report" else args.requests
+                row = run_endpoint(app, all_scenarios[name], n, concurrency)
+                results.append({"endpoint": name, "concurrency": concurrency, **row})
+                print(f"  {name} @ {concurrency}: p95 {row['p95_ms']} ms", file=sys.stderr)
+
+        print()
+        print_table(results)
+        print(f"\nfake Groq calls: {groq.calls}")
+        if skipped:
+            print(f"SKIPPED {', '.join(skipped)}: mongomock can't run them, pass --mongo-uri")
+
+        if json_path:
+            with open(json_path, "w") as f:
+                json.dump({
+                    "created_at": datetime.utcnow().isoformat(),
+                    "config": vars(args),
+                    "results": results,
+                    "skipped": skipped,
+                }, f, indent=2)
+
+        failed = [row for row in results if row["server_errors"]]
+        for row in failed:
+            print(f"FAILED {row['endpoint']} @ {row['concurrency']}: "
+                  f"{row['server_errors']} of {row['requests']} requests returned 5xx")
+
+        if baseline_path:
+            regressions = compare(results, baseline_path, args.max_regression)
+            for endpoint, concurrency, old, new in regressions:
+                print(f"REGRESSION {endpoint} @ {concurrency}: p95 {old} → {new} ms")
+            if regressions:
+                return 1
+        return 1 if failed else 0
+
+    finally:
+        drop_database()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
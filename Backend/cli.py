@@ -0,0 +1,239 @@
+# Backend/cli.py
+#
+# Maintenance commands, registered on the Flask app:
+#   flask --app app <command>
+
+import glob
+import os
+import sys
+
+import click
+
+from user_Db.mongo import reports, analysis_cache, rebuild_report_counters, touch_reports
+from user_Db.stats import rebuild_stats
+from user_Db.lab_results import backfill_test_results
+from user_Db.indexes import ensure_indexes, explain_hot_queries
+from ai_engine.analyzer import EMBED_DIR
+from ai_engine import vector_store
+from ai_engine import embeddings, embedding_server, onnx_encoder, reclaim
+
+
+# ------------------------------------------------
+# migrate-embeddings: Embeddings/*.pkl → mmap .npy store
+# ------------------------------------------------
+@click.command("migrate-embeddings")
+@click.option("--dir", "embed_dir", default=EMBED_DIR, show_default=True,
+              help="Directory holding the legacy .pkl files.")
+@click.option("--delete", is_flag=True, help="Remove each .pkl after converting it.")
+def migrate_embeddings(embed_dir, delete):
+    """Convert pickle embeddings and repoint reports / cache entries at them."""
+    converted = failed = 0
+
+    for pkl_path in sorted(glob.glob(os.path.join(embed_dir, "*.pkl"))):
+        try:
+            npy_path = vector_store.migrate_pickle(pkl_path)
+        except Exception as e:
+            click.echo(f"FAILED {pkl_path}: {e}")
+            failed += 1
+            continue
+
+        # documents may store the path with either directory spelling
+        old_paths = [pkl_path, os.path.join(EMBED_DIR, os.path.basename(pkl_path))]
+        query = {"embedding_path": {"$in": old_paths}}
+        update = {"$set": {"embedding_path": npy_path}}
+        n_reports = reports.update_many(query, update).modified_count
+        analysis_cache.update_many(query, update)
+        if n_reports:
+            touch_reports()
+
+        if delete:
+            os.remove(pkl_path)
+
+        click.echo(f"{pkl_path} → {npy_path} ({n_reports} reports)")
+        converted += 1
+
+    click.echo(f"Done: {converted} converted, {failed} failed")
+
+
+# ------------------------------------------------
+# rebuild-user-counters: recompute users.reports_count / last_upload_at
+# ------------------------------------------------
+@click.command("rebuild-user-counters")
+def rebuild_user_counters():
+    """Recompute the denormalized per-user report counters from reports."""
+    updated = rebuild_report_counters()
+    click.echo(f"Done: counters set for {updated} users")
+
+
+# ------------------------------------------------
+# rebuild-dashboard-stats: recompute the dashboard_stats counters
+# ------------------------------------------------
+@click.command("rebuild-dashboard-stats")
+def rebuild_dashboard_stats():
+    """Recompute users-per-month, reports-per-severity and uploads-per-day (run while writes are quiet)."""
+    buckets = rebuild_stats()
+    click.echo(f"Done: {buckets} buckets written")
+
+
+# ------------------------------------------------
+# backfill-test-results: flatten reports.testResults into test_results
+# ------------------------------------------------
+@click.command("backfill-test-results")
+@click.option("--batch-size", default=200, show_default=True)
+def backfill_test_results_command(batch_size):
+    """Rewrite the test_results rows of every existing report (safe to re-run)."""
+    n_reports, n_rows = backfill_test_results(batch_size)
+    click.echo(f"Done: {n_rows} test rows from {n_reports} reports")
+
+
+# ------------------------------------------------
+# gc-orphans: remove files / rows no report references anymore
+# ------------------------------------------------
+@click.command("gc-orphans")
+@click.option("--batch-size", default=reclaim.GC_BATCH_SIZE, show_default=True)
+@click.option("--rate", "per_second", default=reclaim.GC_FILES_PER_SECOND, show_default=True,
+              help="Max files deleted per second (0 = unthrottled).")
+@click.option("--min-age", default=reclaim.GC_MIN_AGE_SECONDS, show_default=True,
+              help="Skip files / cache entries younger than this many seconds.")
+@click.option("--dry-run", is_flag=True, help="Only count what would be removed.")
+def gc_orphans(batch_size, per_second, min_age, dry_run):
+    """Delete orphaned PDFs, vector stores, GridFS files and derived rows."""
+    counts = reclaim.collect_orphans(batch_size, per_second, min_age, dry_run, echo=click.echo)
+    freed = counts.pop("bytes") / 1e6
+    summary = ", ".join(f"{n} {kind}" for kind, n in counts.items())
+    click.echo(f"{'Would remove' if dry_run else 'Removed'}: {summary} ({freed:.1f} MB of files)")
+
+
+# ------------------------------------------------
+# ensure-indexes / explain-queries
+# ------------------------------------------------
+@click.command("ensure-indexes")
+def ensure_indexes_command():
+    """Create any missing Mongo indexes (safe to run repeatedly)."""
+    result = ensure_indexes()
+    errors = result.pop("errors")
+    dropped = result.pop("dropped")
+
+    for name, indexes in result.items():
+        click.echo(f"{name}: {', '.join(indexes)}")
+    for index in dropped:
+        click.echo(f"dropped {index}")
+    for error in errors:
+        click.echo(f"FAILED {error}")
+
+    if errors:
+        sys.exit(1)
+
+
+@click.command("explain-queries")
+def explain_queries():
+    """Print the winning plan of each hot query; exit 1 on any COLLSCAN or in-memory SORT."""
+    report = explain_hot_queries()
+
+    for row in report:
+        flag = "COLLSCAN!" if row["collscan"] else "SORT!" if row["sort"] else "ok"
+        click.echo(f"{flag:10} {row['collection']}.{row['query']}: {' → '.join(row['stages'])}")
+
+    if any(row["collscan"] or row["sort"] for row in report):
+        sys.exit(1)
+
+
+# ------------------------------------------------
+# export-onnx / embedding-parity: ONNX Runtime embedding backend
+# ------------------------------------------------
+@click.command("export-onnx")
+@click.option("--out", "out_dir", default=embeddings.ONNX_MODEL_DIR, show_default=True)
+@click.option("--no-quantize", is_flag=True, help="Skip the int8 copy.")
+def export_onnx(out_dir, no_quantize):
+    """Export the embedding model for EMBEDDING_BACKEND=onnx."""
+    try:
+        written = onnx_encoder.export(embeddings.MODEL_NAME, out_dir, quantize=not no_quantize)
+    except RuntimeError as e:
+        click.echo(f"FAILED {e}")
+        sys.exit(1)
+    for path in written:
+        click.echo(f"wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+
+@click.command("embedding-parity")
+@click.option("--dir", "embed_dir", default=EMBED_DIR, show_default=True,
+              help="Vector stores whose chunk texts form the test corpus.")
+@click.option("--max-texts", default=2000, show_default=True)
+@click.option("--batch-size", default=32, show_default=True)
+@click.option("--min-cosine", default=0.98, show_default=True,
+              help="Fail when the mean cosine to the PyTorch vectors is lower.")
+@click.option("--min-overlap", default=0.9, show_default=True,
+              help="Fail when the mean top-3 overlap with PyTorch retrieval is lower.")
+def embedding_parity(embed_dir, max_texts, batch_size, min_cosine, min_overlap):
+    """Compare ONNX fp32 / int8 against PyTorch: cosine, top-3 overlap, texts/s."""
+    from ai_engine.rag import SUGGESTED_QUESTIONS
+
+    texts = []
+    for path in sorted(glob.glob(os.path.join(embed_dir, "*.npy"))):
+        if path.endswith((".offsets.npy", ".pages.npy")) or not vector_store.exists(path):
+            continue
+        store = vector_store.open_store(path)
+        texts += store.texts(range(len(store)))
+        if len(texts) >= max_texts:
+            break
+    texts = texts[:max_texts]
+    if not texts:
+        click.echo(f"No vector stores in {embed_dir} to build a corpus from")
+        sys.exit(1)
+
+    reference = embeddings.load_backend("torch")
+    failed = False
+
+    for quantized in (False, True):
+        label = "onnx-int8" if quantized else "onnx-fp32"
+        try:
+            candidate = embeddings.load_backend("onnx", quantized=quantized)
+        except FileNotFoundError as e:
+            click.echo(f"{label}: skipped ({e})")
+            continue
+
+        result = onnx_encoder.compare(reference, candidate, texts, SUGGESTED_QUESTIONS, batch_size)
+        ok = result["cosine_mean"] >= min_cosine and result["top3_overlap"] >= min_overlap
+        failed |= not ok
+
+        click.echo(
+            f"{label:10} {'ok' if ok else 'FAIL':4} "
+            f"cosine mean {result['cosine_mean']} / min {result['cosine_min']}, "
+            f"top-3 overlap {result['top3_overlap']}, "
+            f"torch {result['reference_texts_per_s']} vs {result['candidate_texts_per_s']} texts/s "
+            f"(x{result['speedup']}) on {result['texts']} texts"
+        )
+
+    if failed:
+        sys.exit(1)
+
+
+# ------------------------------------------------
+# embedding-server: one shared, micro-batched model per host
+# ------------------------------------------------
+@click.command("embedding-server")
+@click.option("--socket", "socket_path",
+              default=embeddings.EMBEDDING_SOCKET or embedding_server.DEFAULT_SOCKET, show_default=True)
+@click.option("--max-batch", default=embedding_server.MAX_BATCH, show_default=True,
+              help="Most texts encoded in one forward pass.")
+@click.option("--max-wait-ms", default=embedding_server.MAX_WAIT_MS, show_default=True,
+              help="How long the first request waits for others to join its batch.")
+def embedding_server_command(socket_path, max_batch, max_wait_ms):
+    """Serve encode() to the workers over a Unix socket (set EMBEDDING_SOCKET there)."""
+    model = embeddings.get_model()
+    click.echo(f"{embeddings.BACKEND} embeddings on {socket_path} "
+               f"(max batch {max_batch}, max wait {max_wait_ms} ms)")
+    embedding_server.serve(model, socket_path, max_batch, max_wait_ms)
+
+
+def register_commands(app):
+    app.cli.add_command(migrate_embeddings)
+    app.cli.add_command(rebuild_user_counters)
+    app.cli.add_command(rebuild_dashboard_stats)
+    app.cli.add_command(backfill_test_results_command)
+    app.cli.add_command(gc_orphans)
+    app.cli.add_command(ensure_indexes_command)
+    app.cli.add_command(explain_queries)
+    app.cli.add_command(export_onnx)
+    app.cli.add_command(embedding_parity)
+    app.cli.add_command(embedding_server_command)
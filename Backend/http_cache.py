@@ -0,0 +1,115 @@
+# Backend/http_cache.py
+#
+# Conditional GETs and response compression for the JSON endpoints.
+#   - etag_for(...) builds a strong ETag from whatever identifies a
+#     version of the resource (e.g. the user's reports_version counter),
+#     so a matching If-None-Match can be answered with 304 before the
+#     body is queried or serialized.
+#   - init_compression(app) gzips (or brotli-compresses, when the brotli
+#     package is installed and the client accepts it) JSON/text bodies of
+#     at least COMPRESS_MIN_BYTES. Compressed bodies get a weak ETag,
+#     since their bytes differ per encoding.
+
+import gzip
+import hashlib
+import os
+from datetime import datetime
+
+from flask import Response, jsonify, request
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE = ("application/json", "text/")
+
+
+# ---------- CONDITIONAL GET ----------
+def etag_for(*parts) -> str:
+    return hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+def not_modified(etag: str):
+    """True when the client's If-None-Match already has this version."""
+    return bool(etag) and request.if_none_match.contains_weak(etag)
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _revalidate(response, etag, last_modified):
+    if etag:
+        response.set_etag(etag)
+    modified = _parse_date(last_modified)
+    if modified:
+        response.last_modified = modified.replace(microsecond=0)
+    # the browser may keep the body but must revalidate every time
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def conditional_json(payload, etag: str = None, last_modified=None):
+    """
+    jsonify() + ETag / Last-Modified + 304 handling. Without an explicit
+    etag the body hash is used (saves the bandwidth, not the query).
+    """
+    response = _revalidate(jsonify(payload), etag, last_modified)
+    if not etag:
+        response.add_etag()
+    return response.make_conditional(request)
+
+
+def not_modified_response(etag: str, last_modified=None):
+    """The 304 for a not_modified() hit – nothing was queried or serialized."""
+    return _revalidate(Response(status=304), etag, last_modified)
+
+
+# ---------- COMPRESSION ----------
+def _compress(response):
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or not (response.mimetype or "").startswith(COMPRESSIBLE)
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        encoding, body = "br", brotli.compress(data, quality=BROTLI_QUALITY)
+    elif accepted["gzip"]:
+        encoding, body = "gzip", gzip.compress(data, compresslevel=GZIP_LEVEL)
+    else:
+        return response
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    app.after_request(_compress)
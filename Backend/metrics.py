@@ -0,0 +1,166 @@
+# Backend/metrics.py
+#
+# Per-process metrics in Prometheus text format (GET /metrics):
+#   labinsight_http_request_seconds{method,route,status}   histogram
+#   labinsight_stage_seconds{pipeline,stage}               histogram
+#   labinsight_stage_size{pipeline,measure}                histogram (bytes / chunks / pages)
+# Stages are fed from the same `timings` dicts the pipeline already
+# fills (pdf_load, split, encode, llm_call, json_parse, mongo_write,
+# embedding_load, retrieval...). Each gunicorn worker keeps its own
+# numbers; scrape every worker or sum them in the query.
+# With REQUEST_LOG=true every request also logs one JSON line with its
+# route, status, latency and stage timings.
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+
+
+REQUEST_LOG = os.getenv("REQUEST_LOG", "false").lower() == "true"
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120)
+SIZE_BUCKETS = (1, 4, 16, 64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# timings keys that are sizes, not seconds
+SIZE_KEYS = {"pages", "chunks", "pdf_bytes", "text_chars", "embedding_bytes",
+             "context_chars", "prompt_chars", "answer_chars", "llm_sections", "cache_hits"}
+# numeric timings entries that are neither
+IGNORED_KEYS = {"rule_confidence"}
+
+logger = logging.getLogger("labinsight.requests")
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # label values → [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+        for label_values, series in items:
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, label_values))
+            sep = "," if labels else ""
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {round(series[-2], 6)}")
+            lines.append(f"{self.name}_count{{{labels}}} {series[-1]}")
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+http_seconds = Histogram(
+    "labinsight_http_request_seconds", "Request latency by route.",
+    ("method", "route", "status"), SECONDS_BUCKETS,
+)
+stage_seconds = Histogram(
+    "labinsight_stage_seconds", "Seconds spent in one pipeline stage.",
+    ("pipeline", "stage"), SECONDS_BUCKETS,
+)
+stage_size = Histogram(
+    "labinsight_stage_size", "Bytes / chunks / pages handled by a pipeline.",
+    ("pipeline", "measure"), SIZE_BUCKETS,
+)
+
+HISTOGRAMS = (http_seconds, stage_seconds, stage_size)
+
+
+# ---------- STAGES ----------
+@contextmanager
+def timed(timings: dict, stage: str):
+    """with timed(timings, "mongo_write"): ... → timings["mongo_write"] = seconds"""
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round(timings.get(stage, 0) + time.perf_counter() - t, 4)
+
+
+def observe_timings(pipeline: str, timings: dict):
+    """Feed a finished timings dict into the stage histograms."""
+    for key, value in timings.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or key in IGNORED_KEYS:
+            continue
+        if key in SIZE_KEYS:
+            stage_size.observe(value, pipeline, key)
+        else:
+            stage_seconds.observe(value, pipeline, key)
+
+    # the current request's log line carries the stages too
+    try:
+        g.setdefault("timings", {}).update(
+            {k: v for k, v in timings.items() if isinstance(v, (int, float, str, bool))}
+        )
+    except RuntimeError:
+        pass  # outside a request (background job)
+
+
+# ---------- REQUESTS ----------
+def _before_request():
+    g.request_started = time.perf_counter()
+
+
+def _after_request(response):
+    started = g.pop("request_started", None)
+    if started is None:
+        return response
+
+    # the rule ("/report/<report_id>") keeps label cardinality bounded
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    if route == "/metrics":
+        return response
+    seconds = time.perf_counter() - started
+    http_seconds.observe(seconds, request.method, route, str(response.status_code))
+
+    if REQUEST_LOG:
+        logger.info(json.dumps({
+            "method": request.method,
+            "route": route,
+            "status": response.status_code,
+            "ms": round(seconds * 1000, 1),
+            # streamed responses are timed up to their headers
+            "streamed": response.is_streamed,
+            "bytes": response.calculate_content_length(),
+            "stages": g.get("timings", {}),
+        }))
+    return response
+
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    if REQUEST_LOG and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+def render():
+    return "\n".join(h.render() for h in HISTOGRAMS) + "\n"
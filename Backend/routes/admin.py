@@ -1,60 +1,132 @@
 from flask import Blueprint, jsonify, request
-from pymongo import MongoClient
 from datetime import datetime
-from dateutil.parser import parse
+import os
+import re
 
-
-mongo = MongoClient("mongodb://localhost:27017/")
-db = mongo["LabInsight"]
-
-users_col = db["users"]
-reports_col = db["reports"]
+from user_Db.mongo import users_col, reports as reports_col
+from user_Db.stats import record_signup
+from ai_engine.reclaim import delete_user_reports
 
 admin_bp = Blueprint("admin", __name__)
 
 # ------------------------------
 # 1️⃣ GET ALL USERS WITH REPORT COUNT
+#   ?limit=50&cursor=<next_cursor>&search=<name or email>&status=active|suspended|pending
+# One round trip: page of users + $lookup/$group of their reports.
+# The first page also carries "total" (users matching the filters) and
+# "status_counts" (all users); later pages skip both.
+# With ADMIN_USER_COUNTERS=true the denormalized users.reports_count /
+# users.last_upload_at are read instead, so reports is never touched.
 # ------------------------------
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+USE_COUNTERS = os.getenv("ADMIN_USER_COUNTERS", "false").lower() == "true"
+
+USER_STATUSES = ("active", "suspended", "pending")
+# users without a status field are active
+STATUS_FILTERS = {
+    "active": {"status": {"$in": ["active", None]}},
+    "suspended": {"status": "suspended"},
+    "pending": {"status": "pending"},
+}
+
+
+def _format_last_active(uploaded_at):
+    if not uploaded_at:
+        return "Never"
+    if isinstance(uploaded_at, datetime):
+        return uploaded_at.strftime("%Y-%m-%d %H:%M")
+    # ISO string "2025-03-19T10:22:31.123" → "2025-03-19 10:22"
+    return uploaded_at[:16].replace("T", " ")
+
+
 @admin_bp.route("/users", methods=["GET"])
 def get_all_users():
-    from dateutil.parser import parse   # <-- FIX
-
-    users = list(users_col.find({}, {"_id": 0, "password": 0}))
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+
+    query = {}
+    search = request.args.get("search")
+    if search:
+        pattern = {"$regex": re.escape(search), "$options": "i"}
+        query["$or"] = [{"name": pattern}, {"email": pattern}]
+
+    status = request.args.get("status")
+    if status and status != "all":
+        if status not in STATUS_FILTERS:
+            return jsonify({"error": "Invalid status"}), 400
+        query.update(STATUS_FILTERS[status])
+
+    # later pages keep the first page's total / counts
+    total = status_counts = None
+    cursor = request.args.get("cursor")
+    if cursor:
+        query = {"$and": [query, {"email": {"$gt": cursor}}]}
+    else:
+        total = users_col.count_documents(query) if query else users_col.estimated_document_count()
+        status_counts = _status_counts()
+
+    pipeline = [
+        {"$match": query},
+        {"$sort": {"email": 1}},
+        {"$limit": limit + 1},
+        {"$project": {"_id": 0, "password": 0}},
+    ]
+
+    if not USE_COUNTERS:
+        pipeline += [
+            {"$lookup": {
+                "from": reports_col.name,
+                "let": {"email": "$email"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$user_email", "$$email"]}}},
+                    {"$group": {
+                        "_id": "$user_email",
+                        "count": {"$sum": 1},
+                        "last": {"$max": "$uploaded_at"},
+                    }},
+                ],
+                "as": "activity",
+            }},
+            {"$addFields": {
+                "reports_count": {"$ifNull": [{"$arrayElemAt": ["$activity.count", 0]}, 0]},
+                "last_upload_at": {"$arrayElemAt": ["$activity.last", 0]},
+            }},
+        ]
+
+    users = list(users_col.aggregate(pipeline))
+
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = users[-1]["email"]
 
     result = []
     for user in users:
-        email = user["email"]
-
-        # Count reports for this user
-        reports_count = reports_col.count_documents({"user_email": email})
-
-        # Get last activity
-        last_report = reports_col.find_one(
-            {"user_email": email},
-            sort=[("uploaded_at", -1)]
-        )
-
-        if last_report:
-            uploaded_at = last_report["uploaded_at"]
-            # uploaded_at may be string or datetime → fix BOTH cases
-            try:
-                uploaded_dt = parse(uploaded_at) if isinstance(uploaded_at, str) else uploaded_at
-                last_active = uploaded_dt.strftime("%Y-%m-%d %H:%M")
-            except:
-                last_active = "Unknown"
-        else:
-            last_active = "Never"
-
         result.append({
             "name": user.get("name", ""),
-            "email": email,
+            "email": user["email"],
             "joinDate": user.get("created_at", "2024-01-01"),
             "status": user.get("status", "active"),
-            "reportsCount": reports_count,
-            "lastActive": last_active
+            "reportsCount": user.get("reports_count") or 0,
+            "lastActive": _format_last_active(user.get("last_upload_at")),
         })
 
-    return jsonify({"users": result})
+    return jsonify({
+        "users": result, "next_cursor": next_cursor,
+        "total": total, "status_counts": status_counts,
+    })
+
+
+def _status_counts():
+    # suspended / pending are rare → index-only counts; everyone else is active
+    counts = {s: users_col.count_documents({"status": s}) for s in ("suspended", "pending")}
+    counts["active"] = max(users_col.estimated_document_count() - sum(counts.values()), 0)
+    return {s: counts[s] for s in USER_STATUSES}
 
 
 # ------------------------------
@@ -79,8 +151,12 @@ def update_status(email):
 def delete_user(email):
     email = email.replace("%40", "@")  # just in case
 
-    users_col.delete_one({"email": email})
-    reports_col.delete_many({"user_email": email})
+    user = users_col.find_one_and_delete({"email": email}, {"created_at": 1})
+    if user:
+        record_signup(user.get("created_at") or user["_id"].generation_time, -1)
+
+    # every report with its PDF, vectors, cached answers and test rows
+    delete_user_reports(email)
 
     return jsonify({"message": "User deleted successfully"})
 
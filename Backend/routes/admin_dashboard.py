@@ -1,31 +1,24 @@
-from flask import Blueprint, jsonify
-from pymongo import MongoClient
+from flask import Blueprint, jsonify, request
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta
 from collections import Counter
 
-mongo = MongoClient("mongodb://localhost:27017/")
-db = mongo["LabInsight"]
-
-users_col = db["users"]
-reports_col = db["reports"]
+from user_Db.mongo import users_col, reports as reports_col
+from user_Db import stats
+from ai_engine.analysis_cache import cache_stats
+from ai_engine import report_cache
+from ai_engine import answer_cache
 
 admin_dashboard_bp = Blueprint("admin_dashboard", __name__)
 
 
 # ------------------------------------------------
 # 1️⃣ USER GROWTH (COUNT USERS PER MONTH)
+# read from the materialized dashboard_stats counters
 # ------------------------------------------------
 @admin_dashboard_bp.route("/dashboard/user-growth", methods=["GET"])
 def user_growth():
-    users = list(users_col.find({}))
-
-    monthly = {}
-
-    for u in users:
-        created = u.get("created_at", datetime.now())
-        month = created.strftime("%Y-%m")
-        monthly[month] = monthly.get(month, 0) + 1
+    monthly = stats.get_counts(stats.USERS_PER_MONTH)
 
     # Convert to list format for frontend
     data = [{"month": m, "count": monthly[m]} for m in sorted(monthly.keys())]
@@ -56,18 +49,47 @@ def recent_activity():
 # ------------------------------------------------
 @admin_dashboard_bp.route("/dashboard/report-status", methods=["GET"])
 def report_status():
-    reports = list(reports_col.find({}))
+    per_severity = stats.get_counts(stats.REPORTS_PER_SEVERITY)
 
     status_count = {"normal": 0, "abnormal": 0, "critical": 0}
 
-    for r in reports:
-        sev = r.get("ai_summary", {}).get("severity", "low")
-
+    for sev, count in per_severity.items():
         if sev == "low":
-            status_count["normal"] += 1
+            status_count["normal"] += count
         elif sev == "medium":
-            status_count["abnormal"] += 1
+            status_count["abnormal"] += count
         else:
-            status_count["critical"] += 1
+            status_count["critical"] += count
 
     return jsonify(status_count)
+
+
+# ------------------------------------------------
+# 3️⃣b UPLOADS PER DAY (?days=30)
+# ------------------------------------------------
+@admin_dashboard_bp.route("/dashboard/uploads-per-day", methods=["GET"])
+def uploads_per_day():
+    days = request.args.get("days", 30, type=int)
+    since = (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+
+    daily = stats.get_counts(stats.UPLOADS_PER_DAY)
+    data = [{"day": d, "count": daily[d]} for d in sorted(daily.keys()) if d >= since]
+
+    return jsonify({"uploads": data})
+
+
+# ------------------------------------------------
+# 4️⃣ ANALYSIS CACHE HIT / MISS COUNTERS
+# ------------------------------------------------
+@admin_dashboard_bp.route("/dashboard/analysis-cache", methods=["GET"])
+def analysis_cache_stats():
+    return jsonify(cache_stats())
+
+
+# ------------------------------------------------
+# 5️⃣ CHAT CACHES (this worker's embedding hit rates + memory,
+#    and the shared answer cache)
+# ------------------------------------------------
+@admin_dashboard_bp.route("/dashboard/chat-cache", methods=["GET"])
+def chat_cache_stats():
+    return jsonify({**report_cache.cache_stats(), "answers": answer_cache.cache_stats()})
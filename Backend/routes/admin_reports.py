@@ -1,50 +1,174 @@
-from flask import Blueprint, jsonify, send_file
-from pymongo import MongoClient
+from flask import Blueprint, jsonify, request
 from bson import ObjectId
-import os
+from bson.errors import InvalidId
+import base64
+import binascii
+import json
+import re
 
-mongo = MongoClient("mongodb://localhost:27017/")
-db = mongo["LabInsight"]
-
-users_col = db["users"]
-reports_col = db["reports"]
+from user_Db.mongo import users_col, reports as reports_col
+from user_Db.storage import serve_pdf
+from ai_engine.reclaim import delete_reports
 
 admin_reports_bp = Blueprint("admin_reports", __name__)
 
 # ------------------------------------------------
 # 1️⃣ GET ALL REPORTS FOR ADMIN PANEL
+#   ?limit=50&cursor=<next_cursor>
+#   &sort=uploadDate|reportName|userEmail&order=desc|asc
+#   &status=normal|abnormal|critical&user=<email>&from=YYYY-MM-DD&to=YYYY-MM-DD
+#   &search=<user name, email or report name>
+# One aggregation: filter → sort → page → $lookup user name → project.
+# "total" (reports matching the filters) is only counted for the first page.
 # ------------------------------------------------
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# users whose name matches ?search= (their reports match too)
+SEARCH_MAX_USERS = 1000
+
+SORT_FIELDS = {
+    "uploadDate": "uploaded_at",
+    "reportName": "file_name",
+    "userEmail": "user_email",
+}
+
+# AI severity → UI status ("low" is also the default when severity is missing)
+STATUS_FILTERS = {
+    "normal": {"ai_summary.severity": {"$in": ["low", None]}},
+    "abnormal": {"ai_summary.severity": "medium"},
+    "critical": {"ai_summary.severity": {"$nin": ["low", "medium", None]}},
+}
+
+
+def _encode_cursor(value, oid):
+    raw = json.dumps([value, str(oid)]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor):
+    value, oid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return value, ObjectId(oid)
+
+
+def _report_filters(args):
+    query = {}
+
+    status = args.get("status")
+    if status and status != "all":
+        if status not in STATUS_FILTERS:
+            raise ValueError("Invalid status")
+        query.update(STATUS_FILTERS[status])
+
+    user = args.get("user")
+    if user:
+        query["user_email"] = user
+
+    search = args.get("search")
+    if search:
+        pattern = {"$regex": re.escape(search), "$options": "i"}
+        named = [u["email"] for u in users_col.find(
+            {"name": pattern}, {"_id": 0, "email": 1}
+        ).limit(SEARCH_MAX_USERS)]
+        query["$or"] = [
+            {"file_name": pattern},
+            {"user_email": pattern},
+            {"user_email": {"$in": named}},
+        ]
+
+    date_from, date_to = args.get("from"), args.get("to")
+    if date_from or date_to:
+        query["uploaded_at"] = {}
+        if date_from:
+            query["uploaded_at"]["$gte"] = date_from
+        if date_to:
+            # uploaded_at is an ISO string → a bare date means "through end of day"
+            query["uploaded_at"]["$lte"] = date_to + "T23:59:59.999999" if len(date_to) == 10 else date_to
+
+    return query
+
+
 @admin_reports_bp.route("/reports", methods=["GET"])
 def get_all_reports():
-    reports = list(reports_col.find({}))
-
-    result = []
-    for r in reports:
-        user = users_col.find_one({"email": r["user_email"]})
-
-        # Map AI severity → UI status
-        severity = r.get("ai_summary", {}).get("severity", "low")
-        if severity == "low":
-            ui_status = "normal"
-        elif severity == "medium":
-            ui_status = "abnormal"
-        else:
-            ui_status = "critical"
-
-        result.append({
-            "_id": str(r["_id"]),
-            "userName": user["name"] if user else "Unknown",
-            "userEmail": r["user_email"],
-            "reportName": r["file_name"],
-            "uploadDate": r["uploaded_at"],
+    args = request.args
+
+    try:
+        query = _report_filters(args)
+        limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        cursor = _decode_cursor(args["cursor"]) if args.get("cursor") else None
+    except (ValueError, TypeError, InvalidId, binascii.Error):
+        return jsonify({"error": "Invalid query parameters"}), 400
+
+    sort_field = SORT_FIELDS.get(args.get("sort"), "uploaded_at")
+    direction = 1 if args.get("order") == "asc" else -1
+
+    # later pages keep the first page's total
+    total = None
+    if not cursor:
+        total = reports_col.count_documents(query) if query else reports_col.estimated_document_count()
+
+    # keyset pagination on (sort_field, _id)
+    page_query = dict(query)
+    if cursor:
+        value, oid = cursor
+        op = "$gt" if direction == 1 else "$lt"
+        page_query = {"$and": [query, {"$or": [
+            {sort_field: {op: value}},
+            {sort_field: value, "_id": {op: oid}},
+        ]}]}
+
+    pipeline = [
+        {"$match": page_query},
+        {"$sort": {sort_field: direction, "_id": direction}},
+        {"$limit": limit + 1},
+        {"$lookup": {
+            "from": users_col.name,
+            "let": {"email": "$user_email"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$email", "$$email"]}}},
+                {"$project": {"_id": 0, "name": 1}},
+                {"$limit": 1},
+            ],
+            "as": "user",
+        }},
+        {"$project": {
+            "_id": {"$toString": "$_id"},
+            "sortValue": f"${sort_field}",
+            "userName": {"$ifNull": [{"$arrayElemAt": ["$user.name", 0]}, "Unknown"]},
+            "userEmail": "$user_email",
+            "reportName": "$file_name",
+            "uploadDate": "$uploaded_at",
             "type": "Lab Report",
-            "totalTests": len(r.get("testResults", [])),
-            "abnormalCount": len([t for t in r.get("testResults", []) if t["status"] != "normal"]),
-            "status": ui_status,
-            "file_path": r["file_path"]
-        })
-
-    return jsonify({"reports": result})
+            "totalTests": {"$size": {"$ifNull": ["$testResults", []]}},
+            "abnormalCount": {"$size": {"$filter": {
+                "input": {"$ifNull": ["$testResults", []]},
+                "as": "t",
+                "cond": {"$ne": ["$$t.status", "normal"]},
+            }}},
+            "status": {"$switch": {
+                "branches": [
+                    {"case": {"$eq": [{"$ifNull": ["$ai_summary.severity", "low"]}, "low"]}, "then": "normal"},
+                    {"case": {"$eq": ["$ai_summary.severity", "medium"]}, "then": "abnormal"},
+                ],
+                "default": "critical",
+            }},
+            "file_path": "$file_path",
+        }},
+    ]
+
+    result = list(reports_col.aggregate(pipeline))
+
+    next_cursor = None
+    if len(result) > limit:
+        result = result[:limit]
+        last = result[-1]
+        next_cursor = _encode_cursor(last["sortValue"], last["_id"])
+
+    for r in result:
+        r.pop("sortValue", None)
+
+    return jsonify({"reports": result, "next_cursor": next_cursor, "total": total})
 
 
 # ------------------------------------------------
@@ -52,24 +176,21 @@ def get_all_reports():
 # ------------------------------------------------
 @admin_reports_bp.route("/reports/<report_id>", methods=["DELETE"])
 def delete_report(report_id):
-    report = reports_col.find_one({"_id": ObjectId(report_id)})
-
-    if not report:
+    try:
+        oid = ObjectId(report_id)
+    except InvalidId:
         return jsonify({"error": "Report not found"}), 404
 
-    # delete PDF file
-    file_path = report.get("file_path")
-    if file_path and os.path.exists(file_path):
-        os.remove(file_path)
-
-    # delete record
-    reports_col.delete_one({"_id": ObjectId(report_id)})
+    # record, PDF (unless its content is shared), vectors, cached answers, test rows
+    if not delete_reports({"_id": oid}):
+        return jsonify({"error": "Report not found"}), 404
 
     return jsonify({"message": "Report deleted successfully"})
 
 
 # ------------------------------------------------
 # 3️⃣ DOWNLOAD PDF
+# (local disk or GridFS, with ETag / Range support)
 # ------------------------------------------------
 @admin_reports_bp.route("/download/<report_id>", methods=["GET"])
 def download_report(report_id):
@@ -78,7 +199,7 @@ def download_report(report_id):
     if not r:
         return jsonify({"error": "Report not found"}), 404
 
-    return send_file(r["file_path"], as_attachment=True)
+    return serve_pdf(r, as_attachment=True) or (jsonify({"error": "File missing"}), 404)
 
 
 # ------------------------------------------------
@@ -91,7 +212,7 @@ def view_report(report_id):
     if not r:
         return jsonify({"error": "Report not found"}), 404
 
-    return send_file(r["file_path"])
+    return serve_pdf(r) or (jsonify({"error": "File missing"}), 404)
 
 
 # ------------------------------------------------
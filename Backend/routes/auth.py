@@ -1,5 +1,8 @@
+from datetime import datetime
+
 from flask import Blueprint, request, jsonify
 from user_Db.mongo import create_user, find_user, create_profile, update_password
+from user_Db.stats import record_signup
 
 auth = Blueprint("auth", __name__)
 
@@ -13,7 +16,9 @@ def signup():
     if find_user(email):
         return jsonify({"error": "User already exists"}), 400
 
-    create_user({"name": name, "email": email, "password": password})
+    created_at = datetime.utcnow().isoformat()
+    create_user({"name": name, "email": email, "password": password, "created_at": created_at})
+    record_signup(created_at)
 
     create_profile({
         "name": name,
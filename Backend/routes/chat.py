@@ -1,21 +1,14 @@
-from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
-import os
-import numpy as np
-import pickle
-from groq import Groq
-from sentence_transformers import SentenceTransformer
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+import json
+import time
 
-chat_bp = Blueprint("chat", __name__)
-
-mongo = MongoClient("mongodb://localhost:27017/")
-db = mongo["LabInsight"]
-reports_col = db["reports"]
-
-EMBED_DIR = "Embeddings"
+from user_Db.mongo import reports as reports_col
+from ai_engine.report_cache import get_latest_report
+from ai_engine import answer_cache
+from ai_engine import rag
+from metrics import timed, observe_timings
 
-model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+chat_bp = Blueprint("chat", __name__)
 
 
 # -----------------------------------------------------------
@@ -42,16 +35,55 @@ def latest_report():
             "uploaded_at": report["uploaded_at"]
         },
         "embedding_path": report["embedding_path"],
-        "suggested_questions": [
-            "Summarize my latest lab report in simple words.",
-            "Is there anything urgent in my latest lab report?",
-            "Explain my latest hemoglobin result.",
-            "Are my cholesterol and glucose values okay?",
-            "What should I focus on improving based on my latest report?"
-        ]
+        "suggested_questions": rag.SUGGESTED_QUESTIONS,
     })
 
 
+# -----------------------------------------------------------
+# RETRIEVAL + PROMPT (shared by /ask and /ask/stream)
+# -----------------------------------------------------------
+def _prepare(question, email, scope=None, timings=None):
+    """
+    Returns (prompt, None, extra) when the LLM should be called, or
+    (None, answer, extra) when we can answer directly (cached answer,
+    no report, missing file...). For the latest-report scope extra
+    carries the report_id the answer is about. Stage seconds go into `timings`.
+    """
+    if timings is None:
+        timings = {}
+
+    # scope="all" → search every report of the user, not just the latest
+    if scope == "all":
+        return rag.all_reports_prompt(question, email, timings)
+
+    # 1️⃣ GET LATEST REPORT FROM MONGO (cached for a few seconds)
+    with timed(timings, "latest_report"):
+        latest = get_latest_report(email)
+
+    if not latest:
+        return None, "No reports uploaded yet.", {}
+
+    extra = {"report_id": latest["file_id"]}
+
+    # 2️⃣ SAME QUESTION ABOUT THE SAME REPORT → cached answer, no encode / Groq
+    with timed(timings, "answer_cache"):
+        cached = answer_cache.lookup(latest["file_id"], question)
+    if cached is not None:
+        return None, cached, {**extra, "cached": True}
+
+    # 3️⃣ RETRIEVE TOP CHUNKS + BUILD PROMPT
+    prompt, answer = rag.report_prompt(
+        question, latest["file_id"], latest.get("embedding_path"), timings
+    )
+    return prompt, answer, extra
+
+
+def _remember(question, extra, answer):
+    # only single-report answers are cached; "all" depends on every report
+    if "report_id" in extra and answer:
+        answer_cache.store(extra["report_id"], question, answer)
+
+
 # -----------------------------------------------------------
 # RAG CHAT ENDPOINT
 # -----------------------------------------------------------
@@ -64,65 +96,100 @@ def rag_chat():
     if not question or not email:
         return jsonify({"answer": "Error: question + email required"}), 400
 
-    # 1️⃣ GET LATEST REPORT FROM MONGO
-    latest = reports_col.find_one(
-        {"user_email": email},
-        sort=[("uploaded_at", -1)]
-    )
-
-    if not latest:
-        return jsonify({"answer": "No reports uploaded yet."})
-
-    pkl_path = latest.get("embedding_path")
+    timings = {}
+    prompt, answer, extra = _prepare(question, email, data.get("scope"), timings)
+    if prompt is None:
+        observe_timings("chat", timings)
+        return jsonify({"answer": answer, **extra})
 
-    if not pkl_path:
-        return jsonify({"answer": "No embeddings found for this report."})
-
-    if not os.path.exists(pkl_path):
-        return jsonify({"answer": "Embedding file missing on server."})
-
-    # 2️⃣ LOAD EMBEDDINGS (.pkl created by analyzer.py)
+    # 4️⃣ CALL GROQ
     try:
-        with open(pkl_path, "rb") as f:
-            emb = pickle.load(f)
-    except Exception as e:
-        return jsonify({"answer": f"Failed loading embeddings: {str(e)}"})
-
-    vectors = emb.get("vectors")     # numpy array
-    texts = emb.get("texts")         # list of chunks
-
-    # ---- FIX: avoid ambiguous truth-value error ----
-    if vectors is None or texts is None:
-        return jsonify({"answer": "Invalid embedding file format."})
+        with timed(timings, "llm_call"):
+            answer = rag.complete(prompt)
+        timings["prompt_chars"] = len(prompt)
+        timings["answer_chars"] = len(answer or "")
+        with timed(timings, "mongo_write"):
+            _remember(question, extra, answer)
+        return jsonify({"answer": answer, **extra})
 
-    # 3️⃣ ENCODE QUESTION
-    q_embed = model.encode(question)
-
-    # 4️⃣ RANK CHUNKS
-    sims = np.dot(vectors, q_embed)  # shape (N,)
-    top_idx = sims.argsort()[-3:][::-1]
-
-    context = "\n\n".join([texts[i] for i in top_idx])
+    except Exception as e:
+        return jsonify({"answer": f"Groq API error: {str(e)}"})
 
-    # 5️⃣ CALL GROQ
-    prompt = f"""
-Use ONLY the medical report info below to answer:
+    finally:
+        observe_timings("chat", timings)
 
-{context}
 
-Question: {question}
+# -----------------------------------------------------------
+# RAG CHAT, STREAMED AS SERVER-SENT EVENTS
+#   event: token → {"text": "..."}   (one per Groq delta)
+#   event: error → {"error": "..."}
+#   event: done  → {"ttft_ms", "total_ms", "model", "sources"?}
+# -----------------------------------------------------------
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
 
-Give a clear, simple explanation suitable for a patient.
-"""
 
-    try:
-        response = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-        )
+@chat_bp.route("/ask/stream", methods=["POST"])
+def rag_chat_stream():
+    data = request.json
+    question = data.get("question")
+    email = data.get("email")
 
-        answer = response.choices[0].message.content
-        return jsonify({"answer": answer})
+    if not question or not email:
+        return jsonify({"answer": "Error: question + email required"}), 400
 
-    except Exception as e:
-        return jsonify({"answer": f"Groq API error: {str(e)}"})
+    started = time.perf_counter()
+    timings = {}
+    prompt, answer, extra = _prepare(question, email, data.get("scope"), timings)
+
+    def elapsed_ms():
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    def generate():
+        if prompt is None:
+            observe_timings("chat_stream", timings)
+            yield _sse("token", {"text": answer})
+            yield _sse("done", {"ttft_ms": elapsed_ms(), "total_ms": elapsed_ms(), **extra})
+            return
+
+        ttft_ms = None
+        parts = []
+        llm_started = time.perf_counter()
+        try:
+            stream = rag.groq_client.chat.completions.create(
+                model=rag.CHAT_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                stream=True,
+            )
+            for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if not text:
+                    continue
+                if ttft_ms is None:
+                    ttft_ms = elapsed_ms()
+                parts.append(text)
+                yield _sse("token", {"text": text})
+
+            _remember(question, extra, "".join(parts))
+
+        except Exception as e:
+            yield _sse("error", {"error": f"Groq API error: {str(e)}"})
+
+        if ttft_ms is not None:
+            timings["ttft"] = round(ttft_ms / 1000, 4)
+        timings["llm_call"] = round(time.perf_counter() - llm_started, 4)
+        timings["answer_chars"] = sum(len(p) for p in parts)
+        observe_timings("chat_stream", timings)
+
+        yield _sse("done", {
+            "ttft_ms": ttft_ms,
+            "total_ms": elapsed_ms(),
+            "model": rag.CHAT_MODEL,
+            **extra,
+        })
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
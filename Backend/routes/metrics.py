@@ -0,0 +1,13 @@
+from flask import Blueprint, Response
+
+import metrics
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+# ------------------------------------------------
+# PROMETHEUS SCRAPE ENDPOINT (this worker's counters)
+# ------------------------------------------------
+@metrics_bp.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,35 @@
+from flask import Blueprint, request, jsonify
+
+from user_Db.lab_results import get_trends, get_test_names
+
+trends_bp = Blueprint("trends", __name__)
+
+
+# -----------------------------
+#  GET /trends?email=abc@gmail.com&test=HbA1c&test=LDL&since=2025-01-01
+#  → {"tests": {"hba1c": [{date, value, unit, status, report_id}, ...]}}
+#  Every test of the user when no test is given; oldest point first.
+# -----------------------------
+@trends_bp.route("/trends", methods=["GET"])
+def trends():
+    email = request.args.get("email")
+    if not email:
+        return jsonify({"error": "Email query param required"}), 400
+
+    tests = [t for t in request.args.getlist("test") if t.strip()]
+    series = get_trends(email, tests or None, request.args.get("since"))
+
+    return jsonify({"tests": series}), 200
+
+
+# -----------------------------
+#  GET /trends/tests?email=abc@gmail.com
+#  → normalized names of every test the user has results for
+# -----------------------------
+@trends_bp.route("/trends/tests", methods=["GET"])
+def trend_tests():
+    email = request.args.get("email")
+    if not email:
+        return jsonify({"error": "Email query param required"}), 400
+
+    return jsonify({"tests": get_test_names(email)}), 200
@@ -1,19 +1,47 @@
 # Backend/routes/upload.py
 
+import base64
+import binascii
+import json
 import os
 import uuid
-from datetime import datetime
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, url_for
 from werkzeug.utils import secure_filename
 
-from user_Db.mongo import reports
-from ai_engine.analyzer import analyze_report
+from user_Db.mongo import reports, reports_version
+from ai_engine.ingest import ingest_report, ingest_reports
+from ai_engine.reclaim import delete_reports
+from user_Db.storage import save_upload, UploadTooLargeError, MAX_BATCH_REQUEST_BYTES
+from ai_engine.jobs import submit_upload_job, get_job, QueueFullError
+from metrics import timed, observe_timings
+from http_cache import etag_for, not_modified, not_modified_response, conditional_json
 
 upload_bp = Blueprint("upload_bp", __name__)
 
-UPLOAD_FOLDER = "UploadedPdfs"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# default ingestion mode when the client doesn't send "async"
+ASYNC_UPLOADS = os.getenv("ASYNC_UPLOADS", "false").lower() == "true"
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+# ?fields=... names a listing accepts → projection paths
+LIST_FIELDS = {
+    "file_id": "file_id",
+    "file_name": "file_name",
+    "uploaded_at": "uploaded_at",
+    "severity": "ai_summary.severity",
+    "ai_summary": "ai_summary",
+    "testResults": "testResults",
+    "content_hash": "content_hash",
+}
+REPORTS_DEFAULT_FIELDS = ("file_id", "file_name", "uploaded_at", "severity")
+
+
+def _wants_async():
+    flag = request.form.get("async") or request.args.get("async")
+    if flag is None:
+        return ASYNC_UPLOADS
+    return flag.lower() in ("1", "true", "yes")
 
 
 # -----------------------------
@@ -30,44 +58,204 @@ def upload_report():
     if not user_email:
         return jsonify({"error": "Email missing"}), 400
 
-    # 1. Save PDF with SAME NAME in UploadedPdfs/
+    # 1. Save PDF as UploadedPdfs/<sha256>.pdf – the original name is only metadata,
+    #    so two users uploading "report.pdf" never overwrite each other
     original_name = secure_filename(file.filename)  # e.g. apc.pdf
     if not original_name:
         return jsonify({"error": "Invalid filename"}), 400
 
-    saved_path = os.path.join(UPLOAD_FOLDER, original_name)
-    file.save(saved_path)
+    timings = {}
+    try:
+        with timed(timings, "upload_save"):
+            content_hash, saved_path = save_upload(file)
+    except UploadTooLargeError as e:
+        return jsonify({"error": str(e)}), 413
 
-    # 2. Create a unique id for this report
-    file_id = str(uuid.uuid4())
+    # 2a. Async mode → queue the analysis and return a job id right away
+    if _wants_async():
+        try:
+            job_id, file_id = submit_upload_job(
+                saved_path, user_email, original_name, content_hash
+            )
+        except QueueFullError as e:
+            return jsonify({"error": str(e)}), 503
 
-    # 3. Run AI analysis (also creates <name>.pkl in Embeddings/)
-    ai_summary, test_results, embedding_path = analyze_report(saved_path)
-
-    # 4. Save in Mongo – THIS IS WHERE USER OWNERSHIP IS STORED
-    report_doc = {
-        "file_id": file_id,
-        "user_email": user_email,          # <-- so "abc@gmail.com" owns this
-        "file_name": original_name,
-        "file_path": saved_path,
-        "embedding_path": embedding_path,
-        "ai_summary": ai_summary,
-        "testResults": test_results,
-        "uploaded_at": datetime.utcnow().isoformat(),
-    }
+        return jsonify(
+            {
+                "message": "Upload queued",
+                "job_id": job_id,
+                "report_id": file_id,
+                "status_url": url_for("upload_bp.upload_status", job_id=job_id),
+            }
+        ), 202
 
-    reports.insert_one(report_doc)
+    # 2b. Sync mode → create a unique id and analyze inline
+    file_id = str(uuid.uuid4())
+    report_doc = ingest_report(saved_path, user_email, original_name, file_id, content_hash, timings)
+    observe_timings("upload", timings)
 
     return jsonify(
         {
             "message": "Upload Successful",
             "report_id": file_id,
-            "ai_summary": ai_summary,
-            "testResults": test_results,
+            "ai_summary": report_doc["ai_summary"],
+            "testResults": report_doc["testResults"],
         }
     ), 200
 
 
+# -----------------------------
+#  POST /upload-reports  (multipart, many "files" fields)
+#  → one result per file, in upload order; a bad PDF only fails itself
+# -----------------------------
+@upload_bp.route("/upload-reports", methods=["POST"])
+def upload_reports():
+    # the app-wide body limit is one upload; set before the form is parsed
+    request.max_content_length = MAX_BATCH_REQUEST_BYTES
+    files = request.files.getlist("files")
+    user_email = request.form.get("email")
+
+    if not files:
+        return jsonify({"error": "No files uploaded"}), 400
+    if not user_email:
+        return jsonify({"error": "Email missing"}), 400
+    if len(files) > MAX_BATCH_FILES:
+        return jsonify({"error": f"At most {MAX_BATCH_FILES} files per batch"}), 400
+
+    results = [None] * len(files)
+    uploads, positions = [], []
+    timings = {}
+
+    # 1. Save every PDF; files that can't be saved get their error right away
+    for i, file in enumerate(files):
+        original_name = secure_filename(file.filename)
+        if not original_name:
+            results[i] = {"file_name": file.filename, "status": "failed", "error": "Invalid filename"}
+            continue
+        try:
+            with timed(timings, "upload_save"):
+                content_hash, saved_path = save_upload(file)
+        except UploadTooLargeError as e:
+            results[i] = {"file_name": original_name, "status": "failed", "error": str(e)}
+            continue
+        uploads.append((saved_path, original_name, content_hash))
+        positions.append(i)
+
+    # 2. Analyze the rest together (shared encode batches, one insert_many)
+    if uploads:
+        outcomes = ingest_reports(uploads, user_email, timings)
+        observe_timings("upload_batch", timings)
+        for per_file in timings.get("files", []):
+            observe_timings("upload_batch_file", per_file)
+
+        for i, (_, original_name, _), outcome in zip(positions, uploads, outcomes):
+            if "error" in outcome:
+                results[i] = {"file_name": original_name, "status": "failed", "error": outcome["error"]}
+            else:
+                doc = outcome["report"]
+                results[i] = {
+                    "file_name": original_name,
+                    "status": "done",
+                    "report_id": doc["file_id"],
+                    "ai_summary": doc["ai_summary"],
+                    "testResults": doc["testResults"],
+                }
+
+    succeeded = sum(1 for r in results if r["status"] == "done")
+
+    return jsonify(
+        {
+            "message": f"{succeeded} of {len(files)} reports uploaded",
+            "results": results,
+        }
+    ), 200 if succeeded == len(files) else 207
+
+
+# -----------------------------
+#  GET /upload-status/<job_id>
+#  → queued / running / done / failed + stage timestamps
+# -----------------------------
+@upload_bp.route("/upload-status/<job_id>", methods=["GET"])
+def upload_status(job_id):
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+
+# -----------------------------
+#  Report listings: newest first, optional ?limit=&cursor= keyset pages
+#  and ?fields= projection. The ETag is the user's reports_version, so
+#  an unchanged list is answered with 304 after a single users lookup.
+# -----------------------------
+def _encode_cursor(doc):
+    raw = json.dumps([doc["uploaded_at"], doc["file_id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor):
+    uploaded_at, file_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return uploaded_at, file_id
+
+
+def _projection(default_fields):
+    """?fields=a,b → Mongo projection; default_fields=None means the whole document."""
+    requested = request.args.get("fields")
+    names = [f.strip() for f in requested.split(",") if f.strip()] if requested else default_fields
+    if names is None:
+        return {"_id": 0}
+
+    unknown = set(names) - set(LIST_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    if "ai_summary" in names:
+        names = [n for n in names if n != "severity"]  # already inside ai_summary
+
+    # the cursor is built from these two
+    projection = {"_id": 0, "file_id": 1, "uploaded_at": 1}
+    projection.update({LIST_FIELDS[n]: 1 for n in names})
+    return projection
+
+
+def _list_reports(email, default_fields):
+    try:
+        projection = _projection(default_fields)
+        limit = int(request.args["limit"]) if request.args.get("limit") else None
+        if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        cursor = _decode_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+    except (ValueError, TypeError, binascii.Error) as e:
+        return jsonify({"error": f"Invalid query parameters: {e}"}), 400
+
+    # users without a user document fall back to a body-hash ETag
+    version = reports_version(email)
+    etag = None
+    if version is not None:
+        etag = etag_for(request.path, email, version, sorted(request.args.items(multi=True)))
+        if not_modified(etag):
+            return not_modified_response(etag)
+
+    query = {"user_email": email}
+    if cursor:
+        uploaded_at, file_id = cursor
+        query["$or"] = [
+            {"uploaded_at": {"$lt": uploaded_at}},
+            {"uploaded_at": uploaded_at, "file_id": {"$lt": file_id}},
+        ]
+
+    found = reports.find(query, projection).sort([("uploaded_at", -1), ("file_id", -1)])
+    if limit:
+        found = found.limit(limit + 1)
+    docs = list(found)
+
+    next_cursor = None
+    if limit and len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = _encode_cursor(docs[-1])
+
+    return conditional_json({"reports": docs, "next_cursor": next_cursor}, etag)
+
+
 # -----------------------------
 #  GET /reports?email=abc@gmail.com
 #  → Used by ViewReports.tsx (per-user list)
@@ -78,45 +266,44 @@ def get_reports():
     if not email:
         return jsonify({"error": "Email query param required"}), 400
 
-    docs = list(
-        reports.find(
-            {"user_email": email},
-            {
-                "_id": 0,
-                "file_id": 1,
-                "file_name": 1,
-                "uploaded_at": 1,
-                "ai_summary.severity": 1,
-            },
-        )
-    )
-
-    return jsonify({"reports": docs}), 200
+    return _list_reports(email, REPORTS_DEFAULT_FIELDS)
 
 
 # -----------------------------
 #  GET /report/<report_id>
 #  → Used by ReportInsights.tsx
+#  Reports don't change after upload, so (file_id, uploaded_at,
+#  embedding_path) versions the document.
 # -----------------------------
 @upload_bp.route("/report/<report_id>", methods=["GET"])
 def get_single_report(report_id):
     doc = reports.find_one({"file_id": report_id}, {"_id": 0})
     if not doc:
         return jsonify({"error": "Report not found"}), 404
-    return jsonify(doc), 200
+
+    etag = etag_for(doc["file_id"], doc.get("uploaded_at"), doc.get("embedding_path"))
+    if not_modified(etag):
+        return not_modified_response(etag, doc.get("uploaded_at"))
+    return conditional_json(doc, etag, doc.get("uploaded_at"))
 
 @upload_bp.route("/delete-report/<file_id>", methods=["DELETE"])
 def delete_report(file_id):
-    deleted = reports.delete_one({"file_id": file_id})
-    if deleted.deleted_count == 0:
+    # PDF, vectors, cached answers and test rows go with it
+    if not delete_reports({"file_id": file_id}):
         return jsonify({"error": "Report not found"}), 404
 
     return jsonify({"message": "Report deleted successfully"}), 200
 
+# -----------------------------
+#  GET /all-reports?email=abc@gmail.com  (full documents unless ?fields=)
+#  → Used by Trends.tsx
+# -----------------------------
 @upload_bp.route("/all-reports", methods=["GET"])
 def get_all_reports():
     email = request.args.get("email")
-    docs = list(reports.find({"user_email": email}, {"_id": 0}))
-    return jsonify({"reports": docs})
+    if not email:
+        return jsonify({"error": "Email query param required"}), 400
+
+    return _list_reports(email, None)
 
 
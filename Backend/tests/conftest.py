@@ -0,0 +1,8 @@
+import os
+import sys
+
+# tests import the app's packages the way app.py does (from Backend/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# llm_extract / rag build their Groq clients at import; tests never call them
+os.environ.setdefault("GROQ_API_KEY", "test")
@@ -0,0 +1,73 @@
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+flask = pytest.importorskip("flask")
+pytest.importorskip("groq")
+
+from routes import admin_reports
+
+
+class FakeReports:
+    """Counts queries; mongomock can't run the listing's $lookup pipeline."""
+
+    name = "reports"
+
+    def __init__(self):
+        self.calls = []
+
+    def count_documents(self, query):
+        self.calls.append(("count", query))
+        return 3
+
+    def estimated_document_count(self):
+        self.calls.append(("estimated", None))
+        return 7
+
+    def aggregate(self, pipeline):
+        self.calls.append(("aggregate", pipeline[0]["$match"]))
+        return []
+
+
+@pytest.fixture
+def env(monkeypatch):
+    users = mongomock.MongoClient().db.users
+    users.insert_many([{"email": "ann@x", "name": "Ann Smith"}, {"email": "bob@x", "name": "Bob"}])
+    reports = FakeReports()
+    monkeypatch.setattr(admin_reports, "users_col", users)
+    monkeypatch.setattr(admin_reports, "reports_col", reports)
+
+    app = flask.Flask(__name__)
+    app.register_blueprint(admin_reports.admin_reports_bp, url_prefix="/admin")
+    return app.test_client(), reports
+
+
+def test_search_matches_user_names(env):
+    query = admin_reports._report_filters({"search": "smith"})
+    emails = [c["user_email"]["$in"] for c in query["$or"] if "$in" in c.get("user_email", {})]
+    assert emails == [["ann@x"]]
+
+
+def test_search_is_escaped(env):
+    query = admin_reports._report_filters({"search": "a.b("})
+    assert query["$or"][0]["file_name"]["$regex"] == r"a\.b\("
+
+
+def test_unfiltered_first_page_uses_estimated_count(env):
+    client, reports = env
+    assert client.get("/admin/reports").get_json()["total"] == 7
+    assert [c[0] for c in reports.calls] == ["estimated", "aggregate"]
+
+
+def test_filtered_first_page_counts_matches(env):
+    client, reports = env
+    body = client.get("/admin/reports?status=critical&search=ann").get_json()
+    assert body["total"] == 3
+    assert reports.calls[0][0] == "count"
+
+
+def test_later_pages_skip_the_count(env):
+    client, reports = env
+    cursor = admin_reports._encode_cursor("2025-01-01", "0" * 24)
+    body = client.get(f"/admin/reports?search=ann&cursor={cursor}").get_json()
+    assert body["total"] is None
+    assert [c[0] for c in reports.calls] == ["aggregate"]
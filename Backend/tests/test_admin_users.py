@@ -0,0 +1,52 @@
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+flask = pytest.importorskip("flask")
+pytest.importorskip("groq")
+
+from routes import admin
+
+
+@pytest.fixture
+def client(monkeypatch):
+    users = mongomock.MongoClient().db.users
+    users.insert_many([
+        {"email": "ann@x", "name": "Ann"},
+        {"email": "bob@x", "name": "Bob", "status": "suspended"},
+        {"email": "cat@x", "name": "Cat", "status": "pending"},
+        {"email": "dan@x", "name": "Dan", "status": "active"},
+        {"email": "eve@x", "name": "Annette", "status": "suspended"},
+    ])
+    monkeypatch.setattr(admin, "users_col", users)
+    # mongomock has no $lookup pipelines; the counters path reads users only
+    monkeypatch.setattr(admin, "USE_COUNTERS", True)
+
+    app = flask.Flask(__name__)
+    app.register_blueprint(admin.admin_bp, url_prefix="/admin")
+    return app.test_client()
+
+
+def test_first_page_has_total_and_status_counts(client):
+    body = client.get("/admin/users?limit=2").get_json()
+    assert body["total"] == 5
+    assert body["status_counts"] == {"active": 2, "suspended": 2, "pending": 1}
+    assert body["next_cursor"] == "bob@x"
+
+
+def test_later_pages_skip_counts(client):
+    body = client.get("/admin/users?limit=2&cursor=bob@x").get_json()
+    assert [u["email"] for u in body["users"]] == ["cat@x", "dan@x"]
+    assert body["total"] is None and body["status_counts"] is None
+
+
+def test_search_and_status_filter_on_the_server(client):
+    body = client.get("/admin/users?search=ann&status=suspended").get_json()
+    assert [u["email"] for u in body["users"]] == ["eve@x"]
+    assert body["total"] == 1
+
+    body = client.get("/admin/users?status=active").get_json()
+    assert [u["email"] for u in body["users"]] == ["ann@x", "dan@x"]
+
+
+def test_invalid_status_is_400(client):
+    assert client.get("/admin/users?status=deleted").status_code == 400
@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ai_engine.embedding_server import MicroBatcher
+
+
+class RecordingModel:
+    """Row i of a call = [len(text), position in that call]; remembers each call's texts."""
+
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        time.sleep(self.delay)
+        with self.lock:
+            self.calls.append(list(texts))
+        return np.array([[len(t), i] for i, t in enumerate(texts)], dtype=np.float32)
+
+
+def test_concurrent_requests_share_one_batch():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch=8, max_wait_ms=200)
+
+    futures = [batcher.submit([f"q{i}"]) for i in range(4)]
+    results = [f.result(timeout=2) for f in futures]
+
+    assert model.calls == [["q0", "q1", "q2", "q3"]]
+    # each caller gets its own rows back, in order
+    assert [r[:, 1].tolist() for r in results] == [[0.0], [1.0], [2.0], [3.0]]
+
+
+def test_flushes_at_max_batch_and_carries_the_overflow():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch=4, max_wait_ms=200)
+
+    first = batcher.submit(["a", "b"])
+    second = batcher.submit(["c", "d"])
+    third = batcher.submit(["e", "f", "g"])
+    for f in (first, second, third):
+        f.result(timeout=2)
+
+    assert model.calls == [["a", "b", "c", "d"], ["e", "f", "g"]]
+
+
+def test_lone_request_waits_at_most_max_wait():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch=64, max_wait_ms=50)
+
+    started = time.monotonic()
+    batcher.submit(["only"]).result(timeout=2)
+
+    assert time.monotonic() - started < 0.5
+    assert model.calls == [["only"]]
+
+
+def test_oversized_request_is_encoded_alone():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch=2, max_wait_ms=50)
+
+    vectors = batcher.submit(["a", "b", "c"]).result(timeout=2)
+
+    assert vectors.shape == (3, 2)
+    assert model.calls == [["a", "b", "c"]]
+
+
+def test_normalize_applies_per_request():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch=8, max_wait_ms=200)
+
+    plain = batcher.submit(["abc"])
+    normalized = batcher.submit(["abcd"], normalize=True)
+
+    assert plain.result(timeout=2).tolist() == [[3.0, 0.0]]
+    assert np.allclose(np.linalg.norm(normalized.result(timeout=2), axis=1), 1.0)
+
+
+def test_model_error_fails_every_request_in_the_batch():
+    class Broken:
+        def encode(self, texts, **kwargs):
+            raise RuntimeError("boom")
+
+    batcher = MicroBatcher(Broken(), max_batch=8, max_wait_ms=100)
+    futures = [batcher.submit(["x"]), batcher.submit(["y"])]
+
+    for f in futures:
+        with pytest.raises(RuntimeError, match="boom"):
+            f.result(timeout=2)
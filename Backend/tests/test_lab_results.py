@@ -0,0 +1,67 @@
+import glob
+import os
+import re
+import zipfile
+
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("dotenv")
+
+from ai_engine import rule_extract
+from user_Db.lab_results import _as_dict, normalize_test_name, parse_number
+
+FILES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Files")
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("7,900", 7900.0),
+    ("5.8%", 5.8),
+    ("1-2 /hpf", 2.0),
+    ("Negative", None),
+    ("120/80", None),
+    ("120 / 80 mmHg", None),
+    ("4.36 M/µL", 4.36),
+])
+def test_parse_number(value, expected):
+    assert parse_number(value) == expected
+
+
+@pytest.mark.parametrize("row, expected", [
+    ("Vitamin B-12: 300 pg/mL", {"name": "Vitamin B-12", "value": "300", "unit": "pg/mL"}),
+    ("Anti-HCV: Negative", {"name": "Anti-HCV", "value": "Negative", "unit": ""}),
+    ("HbA1c = 5.8 %", {"name": "HbA1c", "value": "5.8", "unit": "%"}),
+    ("Hemoglobin - 14.1 g/dL", {"name": "Hemoglobin", "value": "14.1", "unit": "g/dL"}),
+])
+def test_legacy_string_rows(row, expected):
+    assert _as_dict(row) == expected
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Serum Creatinine", "Creatinine"),
+    ("Alkaline Phosphatase", "ALP"),
+    ("Blood Urea Nitrogen (BUN)", "BUN"),
+    ("HDL (Good Cholesterol)", "HDL"),
+    ("Cholesterol/HDL Ratio", "Chol/HDL Ratio"),
+    ("Hb A1c", "HbA1c"),
+])
+def test_aliases(a, b):
+    assert normalize_test_name(a) == normalize_test_name(b)
+
+
+def _docx_text(path):
+    xml = zipfile.ZipFile(path).read("word/document.xml").decode("utf-8")
+    paragraphs = re.findall(r"<w:p[ >].*?</w:p>", xml, re.S)
+    return "\n".join("".join(re.findall(r"<w:t[^>]*>([^<]*)</w:t>", p)) for p in paragraphs)
+
+
+@pytest.mark.parametrize("patient", ["maya", "Ryan"])
+def test_bundled_samples_merge_into_one_series_per_test(patient):
+    names = []
+    for path in sorted(glob.glob(os.path.join(FILES, f"{patient}_*.docx"))):
+        parsed = rule_extract.extract(_docx_text(path))
+        assert parsed is not None, path
+        names.append({normalize_test_name(t["name"]) for t in parsed["tests"]})
+
+    assert len(names) == 2
+    assert names[0] == names[1]
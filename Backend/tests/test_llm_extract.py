@@ -0,0 +1,34 @@
+import logging
+
+import pytest
+
+pytest.importorskip("groq")
+pytest.importorskip("dotenv")
+
+from ai_engine import llm_extract
+
+TESTS = {"tests": [{"name": "LDL", "value": "142"}]}
+
+
+def _replies(monkeypatch, *replies):
+    calls = iter(replies)
+    monkeypatch.setattr(llm_extract, "complete", lambda prompt: next(calls))
+
+
+@pytest.mark.parametrize("first", ["not json", "[1, 2]", "42", "null"])
+def test_section_retries_non_object_reply(monkeypatch, first):
+    _replies(monkeypatch, first, '{"tests": [{"name": "LDL", "value": "142"}]}')
+    assert llm_extract._extract_section_tests("LDL 142") == TESTS["tests"]
+
+
+def test_section_gives_up_after_two_non_objects(monkeypatch, caplog):
+    _replies(monkeypatch, "[]", '"tests"')
+    with caplog.at_level(logging.WARNING, logger=llm_extract.logger.name):
+        assert llm_extract._extract_section_tests("LDL 142") == []
+    assert "no JSON object twice" in caplog.text
+
+
+def test_single_falls_back_on_non_object(monkeypatch):
+    _replies(monkeypatch, "[1, 2]")
+    result = llm_extract.extract_single("text", {})
+    assert result["tests"] == [] and result["severity"] == "low"
@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("dotenv")
+
+from ai_engine import report_cache
+
+
+class FakeReports:
+    def __init__(self):
+        self.queries = 0
+
+    def find_one(self, query, projection=None, sort=None):
+        self.queries += 1
+        return {"file_id": query["user_email"]}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    clock = Clock()
+    fake = FakeReports()
+    monkeypatch.setattr(report_cache, "reports", fake)
+    monkeypatch.setattr(report_cache.time, "monotonic", clock)
+    monkeypatch.setattr(report_cache, "_latest", report_cache.OrderedDict())
+    monkeypatch.setattr(report_cache, "LATEST_TTL_SECONDS", 30)
+    return clock, fake
+
+
+def test_latest_is_cached_until_ttl(cache):
+    clock, fake = cache
+    report_cache.get_latest_report("a@x")
+    report_cache.get_latest_report("a@x")
+    assert fake.queries == 1
+
+    clock.now += 31
+    report_cache.get_latest_report("a@x")
+    assert fake.queries == 2
+
+
+def test_expired_entries_dropped_on_write(cache):
+    clock, _ = cache
+    for i in range(5):
+        report_cache.get_latest_report(f"{i}@x")
+
+    clock.now += 31
+    report_cache.get_latest_report("new@x")
+    assert list(report_cache._latest) == ["new@x"]
+
+
+def test_latest_bounded_by_entries(cache, monkeypatch):
+    monkeypatch.setattr(report_cache, "LATEST_MAX_ENTRIES", 3)
+    clock, _ = cache
+    for i in range(5):
+        clock.now += 1
+        report_cache.get_latest_report(f"{i}@x")
+    assert list(report_cache._latest) == ["2@x", "3@x", "4@x"]
@@ -0,0 +1,73 @@
+import pytest
+
+from ai_engine.rule_extract import parse_cells, parse_range, parse_value, severity_of, status_from_text
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Pale yellow", ("normal", False)),
+    ("Pale yellow (normal)", ("normal", True)),
+    ("Normal, follow up in 6 months", ("normal", True)),
+    ("Low normal", ("normal", False)),
+    ("Non-reactive", ("normal", True)),
+    ("Abnormal", ("high", True)),
+    ("Borderline High", ("high", True)),
+    ("Iron deficiency", ("low", True)),
+    ("Below range, slightly elevated", ("high", False)),
+])
+def test_status_from_text_matches_whole_words(text, expected):
+    assert status_from_text(text) == expected
+
+
+def test_qualitative_row_with_normal_qualifier():
+    test, confident = parse_cells("Color", "Pale Yellow", "Pale Yellow", "Pale yellow (normal)")
+    assert test["status"] == "normal"
+    assert confident
+
+
+def test_ambiguous_interpretation_is_not_confident():
+    test, confident = parse_cells("Color", "Pale Yellow", "", "Pale yellow")
+    assert test["status"] == "normal"
+    assert not confident
+
+
+def test_numeric_row_uses_reference_range():
+    test, confident = parse_cells("Hemoglobin", "11.9 g/dL", "12.0–15.5 g/dL")
+    assert (test["value"], test["unit"], test["status"]) == ("11.9", "g/dL", "low")
+    assert confident
+
+
+def test_ranged_result_compared_by_upper_bound():
+    assert parse_value("1–2 /hpf") == (2.0, "/hpf")
+    test, _ = parse_cells("WBCs", "4–6 /hpf", "0–5 /hpf")
+    assert test["status"] == "high"
+
+
+def test_parse_range_forms():
+    assert parse_range("13.5 – 17.5 g/dL") == (13.5, 17.5, "g/dL")
+    assert parse_range("< 200 mg/dL") == (None, 200.0, "mg/dL")
+    assert parse_range("> 40") == (40.0, None, "")
+    assert parse_range("Negative") is None
+
+
+def _test(value, unit, reference, status):
+    return {"name": "x", "value": value, "unit": unit, "normalRange": reference, "status": status}
+
+
+def test_severity_low_when_nothing_flagged():
+    assert severity_of([_test("14.1", "g/dL", "13.5 – 17.5 g/dL", "normal")]) == "low"
+
+
+def test_many_mild_flags_stay_medium():
+    tests = [
+        _test("212", "mg/dL", "< 200 mg/dL", "high"),
+        _test("138", "mg/dL", "< 130 mg/dL", "high"),
+        _test("176", "mg/dL", "< 150 mg/dL", "high"),
+        _test("104", "mg/dL", "70–99 mg/dL", "high"),
+        _test("5.8", "%", "< 5.7%", "high"),
+    ]
+    assert severity_of(tests) == "medium"
+
+
+def test_far_out_of_range_is_high():
+    assert severity_of([_test("320", "mg/dL", "70–99 mg/dL", "high")]) == "high"
+    assert severity_of([_test("6.0", "g/dL", "12.0–15.5 g/dL", "low")]) == "high"
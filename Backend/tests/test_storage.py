@@ -0,0 +1,55 @@
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+pytest.importorskip("flask")
+
+from user_Db import storage
+
+
+class FakeFS:
+    def find(self, query):
+        return []
+
+
+@pytest.fixture
+def db(monkeypatch, tmp_path):
+    client = mongomock.MongoClient()
+    reports, jobs = client.db.reports, client.db.jobs
+    monkeypatch.setattr(storage, "reports", reports)
+    monkeypatch.setattr(storage, "jobs", jobs)
+    monkeypatch.setattr(storage, "get_fs", FakeFS)
+
+    pdf = tmp_path / "abc.pdf"
+    pdf.write_bytes(b"%PDF")
+    reports.insert_one({"_id": 1, "content_hash": "abc", "file_path": str(pdf)})
+    return reports, jobs, pdf
+
+
+def test_last_report_releases_pdf(db):
+    reports, _, pdf = db
+    assert storage.delete_pdf(reports.find_one({"_id": 1}))
+    assert not pdf.exists()
+
+
+def test_other_report_keeps_pdf(db):
+    reports, _, pdf = db
+    reports.insert_one({"_id": 2, "content_hash": "abc", "file_path": str(pdf)})
+    assert not storage.delete_pdf(reports.find_one({"_id": 1}))
+    assert pdf.exists()
+
+
+@pytest.mark.parametrize("status, kept", [("queued", True), ("running", True),
+                                          ("done", False), ("failed", False)])
+def test_pending_upload_keeps_pdf(db, status, kept):
+    reports, jobs, pdf = db
+    jobs.insert_one({"job_id": "j", "content_hash": "abc", "file_path": str(pdf), "status": status})
+    assert storage.delete_pdf(reports.find_one({"_id": 1})) is not kept
+    assert pdf.exists() is kept
+
+
+def test_content_in_use_by_path_without_hash(db):
+    _, jobs, _ = db
+    jobs.insert_one({"job_id": "j", "content_hash": None, "file_path": "UploadedPdfs/x.pdf",
+                     "status": "queued"})
+    assert storage.content_in_use(path="UploadedPdfs/x.pdf")
+    assert not storage.content_in_use(path="UploadedPdfs/y.pdf")
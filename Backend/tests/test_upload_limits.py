@@ -0,0 +1,59 @@
+import io
+import os
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("groq")
+mongomock = pytest.importorskip("mongomock")
+
+os.environ["ENSURE_INDEXES_ON_STARTUP"] = "false"
+
+from app import create_app
+from user_Db import mongo
+from user_Db.storage import MAX_UPLOAD_BYTES
+
+
+@pytest.fixture(scope="module")
+def client():
+    # the first request resumes pending upload jobs
+    mongo._client = mongomock.MongoClient()
+    yield create_app().test_client()
+    mongo._client = None
+
+
+def _pdf(size):
+    return io.BytesIO(b"%PDF" + b"\0" * (size - 4))
+
+
+def test_single_upload_over_limit_is_413(client):
+    response = client.post("/upload-report", data={
+        "email": "a@x", "file": (_pdf(MAX_UPLOAD_BYTES + 2 * 1024 * 1024), "big.pdf"),
+    }, content_type="multipart/form-data")
+    assert response.status_code == 413
+
+
+def test_body_over_limit_is_413_before_the_view(client):
+    # each file is under MAX_UPLOAD_BYTES, the request as a whole is not
+    response = client.post("/upload-report", data={
+        "email": "a@x",
+        "file": (_pdf(MAX_UPLOAD_BYTES - 1024 * 1024), "report.pdf"),
+        "extra": (_pdf(3 * 1024 * 1024), "extra.pdf"),
+    }, content_type="multipart/form-data")
+    assert response.status_code == 413
+
+
+def test_json_route_over_limit_is_413(client):
+    body = b"{" + b" " * (MAX_UPLOAD_BYTES + 2 * 1024 * 1024) + b"}"
+    response = client.post("/chat/ask", data=body, content_type="application/json")
+    assert response.status_code == 413
+
+
+def test_batch_route_allows_more_than_one_upload(client):
+    # over the app-wide limit, under the batch limit → reaches the view, which fails each file
+    response = client.post("/upload-reports", data={
+        "email": "a@x",
+        "files": [(_pdf(MAX_UPLOAD_BYTES + 1024), "big.pdf"), (_pdf(2 * 1024 * 1024), "..")],
+    }, content_type="multipart/form-data")
+    assert response.status_code == 207
+    assert [r["status"] for r in response.get_json()["results"]] == ["failed", "failed"]
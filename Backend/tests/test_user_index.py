@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("dotenv")
+faiss = pytest.importorskip("faiss")
+
+from ai_engine import user_index
+from ai_engine.user_index import UserIndex
+
+DIM = 16
+
+
+class FakeStore:
+    def __init__(self, vectors, name):
+        self.vectors = vectors
+        self.name = name
+
+    def texts(self, indices):
+        return [f"{self.name}:{i}" for i in indices]
+
+
+def _report(index, report_id, rng, rows=50):
+    vectors = rng.standard_normal((rows, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index.add_report({"file_id": report_id}, FakeStore(vectors, report_id))
+    return vectors
+
+
+@pytest.fixture
+def ann(monkeypatch):
+    monkeypatch.setattr(user_index, "ANN_MIN_ROWS", 1)
+    return UserIndex()
+
+
+def test_add_extends_graph_without_rebuild(ann):
+    rng = np.random.default_rng(0)
+    _report(ann, "a", rng)
+    ann.search(np.ones(DIM))
+    graph = ann._ann
+
+    vectors = _report(ann, "b", rng)
+    assert ann._ann is graph
+    assert graph.ntotal == 100
+
+    [hit] = ann.search(vectors[7], k=1)
+    assert (hit["report_id"], hit["text"]) == ("b", "b:7")
+
+
+def test_removed_rows_are_filtered_until_threshold(ann, monkeypatch):
+    monkeypatch.setattr(user_index, "ANN_MAX_DEAD_FRACTION", 0.5)
+    rng = np.random.default_rng(1)
+    a = _report(ann, "a", rng)
+    for name in "bcd":
+        _report(ann, name, rng)
+    ann.search(np.ones(DIM))
+    graph = ann._ann
+
+    ann.remove_report("a")
+    hits = ann.search(a[3], k=10)
+    assert ann._ann is graph
+    assert len(hits) == 10
+    assert all(hit["report_id"] != "a" for hit in hits)
+
+    ann.remove_report("b")
+    ann.remove_report("c")  # compaction moves rows → the graph is rebuilt
+    ann.search(np.ones(DIM))
+    assert ann._ann is not graph
+    assert ann._ann.ntotal == 50
+
+
+def test_rebuild_past_dead_fraction(ann, monkeypatch):
+    monkeypatch.setattr(user_index, "ANN_MAX_DEAD_FRACTION", 0.2)
+    rng = np.random.default_rng(2)
+    for name in "abcd":
+        _report(ann, name, rng)
+    ann.search(np.ones(DIM))
+    graph = ann._ann
+
+    ann.remove_report("a")  # 25% dead in the graph, 25% in the matrix
+    ann.search(np.ones(DIM))
+    assert ann._ann is not graph
+    assert ann._ann.ntotal == 150
+    assert ann._ann_dead == 0
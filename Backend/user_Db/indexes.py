@@ -0,0 +1,152 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from user_Db.mongo import db
+from ai_engine.analysis_cache import ANALYSIS_VERSION
+from ai_engine.answer_cache import PROMPT_VERSION
+
+# Every index the app relies on, per collection. ensure_indexes() is
+# idempotent: existing indexes are left alone, missing ones are built.
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        # /admin/users status counts and ?status= filter
+        IndexModel([("status", ASCENDING)], name="status"),
+    ],
+    "profiles": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "reports": [
+        IndexModel([("file_id", ASCENDING)], name="file_id_unique", unique=True),
+        # /reports and /all-reports keyset pages: (uploaded_at, file_id) tie-break;
+        # its (user_email, uploaded_at) prefix also serves the latest-report lookup
+        IndexModel([("user_email", ASCENDING), ("uploaded_at", DESCENDING), ("file_id", DESCENDING)],
+                   name="user_email_uploaded_at_file_id"),
+        IndexModel([("uploaded_at", DESCENDING)], name="uploaded_at"),
+        IndexModel([("file_path", ASCENDING)], name="file_path"),
+        IndexModel([("content_hash", ASCENDING)], name="content_hash"),
+        IndexModel([("embedding_path", ASCENDING)], name="embedding_path"),
+    ],
+    "jobs": [
+        IndexModel([("job_id", ASCENDING)], name="job_id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("stages.running", ASCENDING)], name="status_running"),
+    ],
+    "analysis_cache": [
+        IndexModel([("sha256", ASCENDING), ("version", ASCENDING)],
+                   name="sha256_version_unique", unique=True),
+    ],
+    "answer_cache": [
+        IndexModel([("report_id", ASCENDING), ("question", ASCENDING), ("version", ASCENDING)],
+                   name="report_question_version_unique", unique=True),
+        # TTL: Mongo deletes each answer once its expires_at has passed
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "test_results": [
+        # trailing fields make the /trends projection a covered (index-only) query
+        IndexModel([("user_email", ASCENDING), ("test_name", ASCENDING), ("date", ASCENDING),
+                    ("value", ASCENDING), ("unit", ASCENDING), ("status", ASCENDING),
+                    ("report_id", ASCENDING)],
+                   name="user_test_date"),
+        IndexModel([("report_id", ASCENDING)], name="report_id"),
+    ],
+    "dashboard_stats": [
+        IndexModel([("kind", ASCENDING), ("bucket", ASCENDING)],
+                   name="kind_bucket_unique", unique=True),
+    ],
+}
+
+# Superseded indexes, dropped by ensure_indexes() where they still exist
+OBSOLETE_INDEXES = {
+    # prefix of user_email_uploaded_at_file_id
+    "reports": ["user_email_uploaded_at"],
+}
+
+# Hot queries whose plans must stay index-backed:
+# (label, collection, filter, sort)
+HOT_QUERIES = [
+    ("find_user", "users", {"email": "x@example.com"}, None),
+    ("find_profile", "profiles", {"email": "x@example.com"}, None),
+    ("users_by_status", "users", {"status": "suspended"}, None),
+    ("latest_report", "reports", {"user_email": "x@example.com"}, [("uploaded_at", -1)]),
+    ("report_listing", "reports", {"user_email": "x@example.com"},
+     [("uploaded_at", -1), ("file_id", -1)]),
+    ("report_by_file_id", "reports", {"file_id": "x"}, None),
+    ("reports_by_path", "reports", {"file_path": "x"}, None),
+    ("reports_by_content_hash", "reports", {"content_hash": "x"}, None),
+    ("reports_by_embedding_path", "reports", {"embedding_path": "x"}, None),
+    ("recent_activity", "reports", {}, [("uploaded_at", -1)]),
+    ("job_by_id", "jobs", {"job_id": "x"}, None),
+    ("analysis_cache_lookup", "analysis_cache", {"sha256": "x", "version": ANALYSIS_VERSION}, None),
+    ("answer_cache_lookup", "answer_cache",
+     {"report_id": "x", "question": "x", "version": PROMPT_VERSION}, None),
+    ("trends", "test_results", {"user_email": "x@example.com", "test_name": "hba1c"},
+     [("test_name", 1), ("date", 1)]),
+    ("dashboard_counts", "dashboard_stats", {"kind": "uploads_per_day"}, None),
+]
+
+
+def ensure_indexes():
+    """
+    Create missing indexes and drop obsolete ones. Returns {collection:
+    [names]} for the ones that are in place, a "dropped" entry listing
+    removed indexes, plus an "errors" entry for indexes that could not
+    be built (e.g. duplicate emails blocking a unique index).
+    """
+    result = {"errors": [], "dropped": []}
+
+    for name, models in INDEXES.items():
+        col = db[name]
+        result[name] = []
+        for model in models:
+            try:
+                result[name] += col.create_indexes([model])
+            except OperationFailure as e:
+                result["errors"].append(f"{name}.{model.document['name']}: {e}")
+
+    for name, index_names in OBSOLETE_INDEXES.items():
+        col = db[name]
+        existing = col.index_information()
+        for index_name in index_names:
+            if index_name not in existing:
+                continue
+            try:
+                col.drop_index(index_name)
+                result["dropped"].append(f"{name}.{index_name}")
+            except OperationFailure as e:
+                result["errors"].append(f"{name}.{index_name}: {e}")
+
+    return result
+
+
+def _plan_stages(plan):
+    """Flatten the stage names of a (possibly nested) winning plan."""
+    if not isinstance(plan, dict):
+        return []
+    stages = [plan["stage"]] if "stage" in plan else []
+    for key in ("inputStage", "queryPlan"):
+        stages += _plan_stages(plan.get(key))
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+
+def explain_hot_queries():
+    """[{"query", "collection", "stages", "collscan", "sort"}] for every hot query."""
+    report = []
+
+    for label, name, query, sort in HOT_QUERIES:
+        cursor = db[name].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        stages = _plan_stages(plan)
+        report.append({
+            "query": label,
+            "collection": name,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+            # blocking in-memory sort: no index delivers the requested order
+            "sort": "SORT" in stages,
+        })
+
+    return report
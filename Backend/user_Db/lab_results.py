@@ -0,0 +1,180 @@
+import re
+from datetime import datetime
+
+from pymongo import DeleteMany, InsertOne
+
+from user_Db.mongo import db, reports
+
+# One row per extracted test, flattened out of reports.testResults so a
+# per-user trend ("my HbA1c over time") is a single index range scan:
+#   {user_email, test_name, date, value, unit, status, report_id, name, value_text}
+# test_name is normalized ("HbA1c" / "Hb A1c" → "hba1c"); value is the
+# number parsed from the result (None for "Negative" etc.). Rows are
+# written at upload time, removed with their report, and
+# backfill_test_results() rebuilds them from existing reports.
+test_results_col = db["test_results"]
+
+# the trend query's projection – every field is in the user_test_date index,
+# so the query is answered from the index alone
+TREND_FIELDS = ("test_name", "date", "value", "unit", "status", "report_id")
+
+# spellings of the same test that labs / the LLM use
+ALIASES = {
+    "hb a1c": "hba1c",
+    "glycated hemoglobin": "hba1c",
+    "glycated haemoglobin": "hba1c",
+    "haemoglobin": "hemoglobin",
+    "hb": "hemoglobin",
+    "ldl cholesterol": "ldl",
+    "hdl cholesterol": "hdl",
+    "fasting blood sugar": "fasting glucose",
+    "fbs": "fasting glucose",
+    "wbc": "wbc count",
+    "rbc": "rbc count",
+    "platelets": "platelet count",
+    "serum creatinine": "creatinine",
+    "alkaline phosphatase": "alp",
+    "blood urea nitrogen": "bun",
+    "chol hdl ratio": "cholesterol hdl ratio",
+    "sgot": "ast",
+    "sgpt": "alt",
+}
+
+NUMBER = r"-?\d[\d,]*(?:\.\d+)?|-?\.\d+"
+NUMBER_RE = re.compile(NUMBER)
+VALUE_UNIT_RE = re.compile(rf"^({NUMBER})\s*(.*)$")
+# "120/80" (blood pressure) – two numbers, not one
+RATIO_RE = re.compile(r"\d\s*/\s*\d")
+
+
+def _iso(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value or ""
+
+
+def normalize_test_name(name):
+    name = re.sub(r"\(.*?\)", " ", str(name or "").lower())
+    name = re.sub(r"[^a-z0-9%]+", " ", name).strip()
+    return ALIASES.get(name, name)
+
+
+def parse_number(value):
+    """'7,900' → 7900.0, '5.8%' → 5.8, '1–2' → 2.0 (upper bound), 'Negative' / '120/80' → None."""
+    text = str(value or "")
+    if RATIO_RE.search(text):
+        return None
+    # "1-2" is a range, not 1 and -2
+    text = re.sub(r"(\d)\s*-\s*(\d)", r"\1–\2", text)
+    numbers = NUMBER_RE.findall(text)
+    if not numbers:
+        return None
+    # a range result ("1–2 /hpf") is compared by its upper bound
+    return float(numbers[-1 if len(numbers) == 2 else 0].replace(",", ""))
+
+
+def _as_dict(test):
+    if isinstance(test, dict):
+        return test
+    # legacy rows stored as "Name: 5.8 %" strings; names may contain
+    # hyphens ("Vitamin B-12", "Anti-HCV"), so "-" only counts when spaced
+    m = re.match(r"^\s*([^:=]+?)\s*[:=]\s*(.+?)\s*$", str(test))
+    if not m:
+        m = re.match(r"^\s*(.+?)\s+-\s+(.+?)\s*$", str(test))
+    if not m:
+        return None
+    value, unit = m.group(2), ""
+    split = VALUE_UNIT_RE.match(value)
+    if split:
+        value, unit = split.groups()
+    return {"name": m.group(1), "value": value, "unit": unit}
+
+
+def rows_for_report(report):
+    rows = []
+    for test in report.get("testResults") or []:
+        test = _as_dict(test)
+        if not test or not test.get("name"):
+            continue
+        test_name = normalize_test_name(test["name"])
+        if not test_name:
+            continue
+        rows.append({
+            "user_email": report["user_email"],
+            "report_id": report["file_id"],
+            "date": _iso(report.get("uploaded_at")),
+            "test_name": test_name,
+            "name": str(test["name"]),
+            "value": parse_number(test.get("value")),
+            "value_text": str(test.get("value", "")),
+            "unit": test.get("unit") or "",
+            "status": test.get("status") or "",
+        })
+    return rows
+
+
+# ---------- INCREMENTAL UPDATES ----------
+def record_report_tests(report):
+    rows = rows_for_report(report)
+    if rows:
+        test_results_col.insert_many(rows, ordered=False)
+    return len(rows)
+
+def remove_report_tests(*report_ids):
+    ids = [r for r in report_ids if r]
+    if ids:
+        test_results_col.delete_many({"report_id": {"$in": ids}})
+
+def remove_user_tests(email):
+    return test_results_col.delete_many({"user_email": email})
+
+
+# ---------- READS ----------
+def get_test_names(email):
+    return sorted(test_results_col.distinct("test_name", {"user_email": email}))
+
+
+def get_trends(email, test_names=None, since=None):
+    """{test_name: [{date, value, unit, status, report_id}, ...] oldest first}."""
+    query = {"user_email": email}
+    if test_names:
+        query["test_name"] = {"$in": [normalize_test_name(n) for n in test_names]}
+    if since:
+        query["date"] = {"$gte": since}
+
+    series = {}
+    for row in test_results_col.find(
+        query, {"_id": 0, **{f: 1 for f in TREND_FIELDS}}
+    ).sort([("test_name", 1), ("date", 1)]):
+        name = row.pop("test_name")
+        series.setdefault(name, []).append(row)
+    return series
+
+
+# ---------- FULL REBUILD ----------
+def backfill_test_results(batch_size=200):
+    """Rewrite the rows of every report (idempotent). Returns (reports, rows)."""
+    n_reports = n_rows = 0
+    ops = []
+
+    cursor = reports.find(
+        {}, {"_id": 0, "file_id": 1, "user_email": 1, "uploaded_at": 1, "testResults": 1}
+    ).batch_size(batch_size)
+
+    for report in cursor:
+        if not report.get("file_id") or not report.get("user_email"):
+            continue
+        rows = rows_for_report(report)
+        ops.append(DeleteMany({"report_id": report["file_id"]}))
+        ops += [InsertOne(row) for row in rows]
+        n_reports += 1
+        n_rows += len(rows)
+
+        if len(ops) >= batch_size * 10:
+            test_results_col.bulk_write(ops, ordered=True)
+            ops = []
+
+    if ops:
+        test_results_col.bulk_write(ops, ordered=True)
+
+    return n_reports, n_rows
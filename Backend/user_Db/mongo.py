@@ -1,12 +1,107 @@
-from pymongo import MongoClient
+import os
+import threading
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, ReadPreference, WriteConcern
 import gridfs
 
-client = MongoClient("mongodb://localhost:27017/")
-db = client["LabInsight"]
+load_dotenv()
+
+# ---------- SHARED CONNECTION POOL ----------
+# One MongoClient per process, shared by every blueprint. It is created
+# on first use (not at import) and dropped in forked children, so a
+# gunicorn master never hands its pool / monitor threads to the workers.
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+MONGO_DB = os.getenv("MONGO_DB", "LabInsight")
+
+# env var → MongoClient option (only the ones that are set are passed)
+POOL_OPTIONS = {
+    "MONGO_MAX_POOL_SIZE": ("maxPoolSize", int),
+    "MONGO_MIN_POOL_SIZE": ("minPoolSize", int),
+    "MONGO_MAX_IDLE_TIME_MS": ("maxIdleTimeMS", int),
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": ("waitQueueTimeoutMS", int),
+    "MONGO_CONNECT_TIMEOUT_MS": ("connectTimeoutMS", int),
+    "MONGO_SOCKET_TIMEOUT_MS": ("socketTimeoutMS", int),
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": ("serverSelectionTimeoutMS", int),
+    "MONGO_APP_NAME": ("appname", str),
+}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _client_options():
+    options = {}
+    for env, (option, cast) in POOL_OPTIONS.items():
+        value = os.getenv(env)
+        if value:
+            options[option] = cast(value)
+    return options
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(MONGO_URI, **_client_options())
+    return _client
+
+
+def get_db():
+    database = get_client()[MONGO_DB]
+
+    read_preference = os.getenv("MONGO_READ_PREFERENCE")  # e.g. secondaryPreferred
+    w = os.getenv("MONGO_WRITE_CONCERN")                  # e.g. majority / 1
+    if read_preference or w:
+        database = database.with_options(
+            read_preference=getattr(ReadPreference, _snake_upper(read_preference)) if read_preference else None,
+            write_concern=WriteConcern(w=int(w) if w.isdigit() else w) if w else None,
+        )
+    return database
+
+
+def _snake_upper(name):
+    # "secondaryPreferred" → "SECONDARY_PREFERRED"
+    return "".join("_" + c if c.isupper() else c for c in name).upper()
+
+
+def _reset_after_fork():
+    # the parent's sockets / monitor threads are unusable in the child
+    global _client, _client_lock
+    _client = None
+    _client_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class _LazyCollection:
+    """Module-level collection handle that resolves against the per-process client."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(get_db()[self._name], attr)
+
+
+class _LazyDatabase:
+    def __getitem__(self, name):
+        return _LazyCollection(name)
+
+    def __getattr__(self, attr):
+        return getattr(get_db(), attr)
+
+
+db = _LazyDatabase()
 
 users_col = db["users"]
 profiles_col = db["profiles"]
 reports = db["reports"]
+jobs = db["jobs"]
+analysis_cache = db["analysis_cache"]
+answer_cache = db["answer_cache"]
 
 
 # ---------- USER FUNCTIONS ----------
@@ -17,6 +112,51 @@ def find_user(email):
     return users_col.find_one({"email": email})
 
 
+# ---------- DENORMALIZED PER-USER REPORT COUNTERS ----------
+# users.reports_count / users.last_upload_at, kept in step with uploads
+# and deletes so /admin/users can skip the reports collection entirely.
+# users.reports_version changes with every add / remove; the report
+# listings use it as their ETag so an unchanged list costs one find_one.
+def record_report_added(email, uploaded_at):
+    return users_col.update_one(
+        {"email": email},
+        {"$inc": {"reports_count": 1, "reports_version": 1}, "$max": {"last_upload_at": uploaded_at}}
+    )
+
+def record_reports_removed(email, count=1):
+    latest = reports.find_one(
+        {"user_email": email}, {"_id": 0, "uploaded_at": 1}, sort=[("uploaded_at", -1)]
+    )
+    return users_col.update_one(
+        {"email": email},
+        {
+            "$inc": {"reports_count": -count, "reports_version": 1},
+            "$set": {"last_upload_at": latest["uploaded_at"] if latest else None},
+        }
+    )
+
+def reports_version(email):
+    user = users_col.find_one({"email": email}, {"_id": 0, "reports_version": 1})
+    return user.get("reports_version", 0) if user else None
+
+def touch_reports(query=None):
+    """Invalidate the listing ETags after reports were rewritten in place."""
+    return users_col.update_many(query or {}, {"$inc": {"reports_version": 1}})
+
+def rebuild_report_counters():
+    users_col.update_many({}, {"$set": {"reports_count": 0, "last_upload_at": None}})
+    updated = 0
+    for row in reports.aggregate([
+        {"$group": {"_id": "$user_email", "count": {"$sum": 1}, "last": {"$max": "$uploaded_at"}}}
+    ]):
+        users_col.update_one(
+            {"email": row["_id"]},
+            {"$set": {"reports_count": row["count"], "last_upload_at": row["last"]}}
+        )
+        updated += 1
+    return updated
+
+
 # ---------- PROFILE FUNCTIONS ----------
 def create_profile(profile):
     return profiles_col.insert_one(profile)
@@ -39,12 +179,7 @@ def update_password(email, new_password):
         {"email": email},
         {"$set": {"password": new_password}}
     )
-fs = gridfs.GridFS(db)
-
-def save_pdf(file, filename, email):
-    pdf_id = fs.put(file, filename=filename, user=email)
-    return str(pdf_id)
+def get_fs():
+    return gridfs.GridFS(get_db())
 
-def get_user_reports(email):
-    return list(db.fs.files.find({"user": email}))
 
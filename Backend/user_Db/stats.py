@@ -0,0 +1,106 @@
+from datetime import datetime
+
+from pymongo import DeleteMany, UpdateOne
+
+from user_Db.mongo import db, users_col, reports
+
+# Pre-aggregated dashboard counters, one document per (kind, bucket):
+#   users_per_month       bucket "2025-03"
+#   reports_per_severity  bucket "low" / "medium" / "high"
+#   uploads_per_day       bucket "2025-03-19"
+# Updated incrementally on signup / upload / delete; rebuild_stats()
+# recomputes everything from the source collections.
+stats_col = db["dashboard_stats"]
+
+USERS_PER_MONTH = "users_per_month"
+REPORTS_PER_SEVERITY = "reports_per_severity"
+UPLOADS_PER_DAY = "uploads_per_day"
+
+
+def _iso(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value or ""
+
+
+def bump(kind, bucket, delta=1):
+    if not bucket:
+        return
+    stats_col.update_one(
+        {"kind": kind, "bucket": bucket},
+        {"$inc": {"count": delta}},
+        upsert=True
+    )
+
+
+# ---------- INCREMENTAL UPDATES ----------
+def record_signup(created_at, delta=1):
+    bump(USERS_PER_MONTH, _iso(created_at)[:7], delta)
+
+def record_report(uploaded_at, severity, delta=1):
+    bump(REPORTS_PER_SEVERITY, severity or "low", delta)
+    bump(UPLOADS_PER_DAY, _iso(uploaded_at)[:10], delta)
+
+
+# ---------- READS: O(number of buckets) ----------
+def get_counts(kind):
+    return {
+        d["bucket"]: d["count"]
+        for d in stats_col.find({"kind": kind, "count": {"$gt": 0}}, {"_id": 0})
+    }
+
+
+# ---------- FULL REBUILD ----------
+def _date_string(field, length):
+    # created_at / uploaded_at may be ISO strings, datetimes or missing
+    # (old users have no created_at → fall back to the ObjectId timestamp)
+    return {"$substrCP": [
+        {"$cond": [
+            {"$eq": [{"$type": f"${field}"}, "string"]},
+            f"${field}",
+            {"$dateToString": {
+                "format": "%Y-%m-%dT%H:%M:%S",
+                "date": {"$ifNull": [f"${field}", {"$toDate": "$_id"}]},
+            }},
+        ]},
+        0, length,
+    ]}
+
+
+def rebuild_stats():
+    """
+    Recompute every counter from the source collections. Buckets are
+    overwritten in place ($set + upsert) rather than deleted and
+    re-inserted, so dashboards never see an empty collection.
+    Run it while signups / uploads / deletes are quiet: a bump() landing
+    between the aggregation and the write is overwritten (or its bucket
+    dropped) and stays off until the next rebuild.
+    """
+    counts = {USERS_PER_MONTH: {}, REPORTS_PER_SEVERITY: {}, UPLOADS_PER_DAY: {}}
+
+    for row in users_col.aggregate([
+        {"$group": {"_id": _date_string("created_at", 7), "count": {"$sum": 1}}}
+    ]):
+        counts[USERS_PER_MONTH][row["_id"]] = row["count"]
+
+    for row in reports.aggregate([
+        {"$group": {"_id": {"$ifNull": ["$ai_summary.severity", "low"]}, "count": {"$sum": 1}}}
+    ]):
+        counts[REPORTS_PER_SEVERITY][row["_id"]] = row["count"]
+
+    for row in reports.aggregate([
+        {"$group": {"_id": _date_string("uploaded_at", 10), "count": {"$sum": 1}}}
+    ]):
+        counts[UPLOADS_PER_DAY][row["_id"]] = row["count"]
+
+    ops = []
+    for kind, buckets in counts.items():
+        ops += [
+            UpdateOne({"kind": kind, "bucket": bucket}, {"$set": {"count": count}}, upsert=True)
+            for bucket, count in buckets.items()
+        ]
+        # buckets whose source rows are all gone
+        ops.append(DeleteMany({"kind": kind, "bucket": {"$nin": list(buckets)}}))
+    stats_col.bulk_write(ops, ordered=False)
+
+    return sum(len(buckets) for buckets in counts.values())
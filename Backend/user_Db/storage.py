@@ -0,0 +1,198 @@
+import hashlib
+import os
+import uuid
+
+from flask import Response, request, send_file
+from werkzeug.wsgi import wrap_file
+
+from user_Db.mongo import get_fs, reports, jobs
+
+# PDF storage backend: "local" (UploadedPdfs/ only) or "gridfs".
+# Either way the upload is streamed in chunks to UploadedPdfs/<sha256>.pdf
+# while it is hashed and size-checked; with gridfs that file is then
+# pushed to GridFS and the local copy is only a cache for analysis, so
+# any app node can serve or re-analyze the report.
+STORAGE_BACKEND = os.getenv("PDF_STORAGE", "local")
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "20")) * 1024 * 1024
+# whole-request cap for /upload-reports (each file is still held to MAX_UPLOAD_BYTES)
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_UPLOAD_MB", "200")) * 1024 * 1024
+# request body limits (form fields get some slack): every route is held to a
+# single upload, /upload-reports raises its own limit to the batch size
+FORM_SLACK_BYTES = 1024 * 1024
+MAX_REQUEST_BYTES = MAX_UPLOAD_BYTES + FORM_SLACK_BYTES
+MAX_BATCH_REQUEST_BYTES = max(MAX_UPLOAD_BYTES, MAX_BATCH_BYTES) + FORM_SLACK_BYTES
+
+UPLOAD_FOLDER = "UploadedPdfs"
+CHUNK_SIZE = 1024 * 1024
+
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+
+class UploadTooLargeError(Exception):
+    pass
+
+
+def local_path(sha: str) -> str:
+    return os.path.join(UPLOAD_FOLDER, f"{sha}.pdf")
+
+
+def _gridfs_name(sha: str) -> str:
+    return f"{sha}.pdf"
+
+
+# ---------- UPLOAD ----------
+def save_upload(file):
+    """
+    Stream a werkzeug FileStorage to storage while hashing it.
+    Returns (sha256, local_path). Raises UploadTooLargeError past MAX_UPLOAD_BYTES.
+    """
+    h = hashlib.sha256()
+    size = 0
+    tmp_path = os.path.join(UPLOAD_FOLDER, f".upload-{uuid.uuid4().hex}.tmp")
+
+    try:
+        with open(tmp_path, "wb") as out:
+            for block in iter(lambda: file.stream.read(CHUNK_SIZE), b""):
+                size += len(block)
+                if size > MAX_UPLOAD_BYTES:
+                    raise UploadTooLargeError(
+                        f"File exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit"
+                    )
+                h.update(block)
+                out.write(block)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    sha = h.hexdigest()
+    saved_path = local_path(sha)
+
+    # identical content is already on disk → keep the existing copy
+    # (touched, so the orphan GC sees it as recently used)
+    if os.path.exists(saved_path):
+        os.remove(tmp_path)
+        os.utime(saved_path)
+    else:
+        os.replace(tmp_path, saved_path)
+
+    if STORAGE_BACKEND == "gridfs":
+        fs = get_fs()
+        if not fs.exists(filename=_gridfs_name(sha)):
+            with open(saved_path, "rb") as f:
+                fs.put(f, filename=_gridfs_name(sha), contentType="application/pdf",
+                       metadata={"sha256": sha}, chunkSize=255 * 1024)
+
+    return sha, saved_path
+
+
+def ensure_local_copy(path: str, sha: str) -> str:
+    """Make sure the PDF is on this node's disk (pulled from GridFS if needed)."""
+    if os.path.exists(path) or not sha:
+        return path
+
+    grid_out = get_fs().find_one({"filename": _gridfs_name(sha)})
+    if grid_out is None:
+        return path
+
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as out:
+        for block in iter(lambda: grid_out.read(CHUNK_SIZE), b""):
+            out.write(block)
+    os.replace(tmp_path, path)
+    return path
+
+
+# ---------- DOWNLOAD ----------
+def serve_pdf(report, as_attachment=False):
+    """
+    Send a report's PDF with ETag / If-None-Match (304) and Range (206)
+    support. The content hash is a strong ETag since files never change.
+    Returns None when the file exists in neither backend.
+    """
+    sha = report.get("content_hash")
+    path = report.get("file_path")
+    name = report.get("file_name") or os.path.basename(path or "report.pdf")
+
+    if path and os.path.exists(path):
+        return send_file(
+            path,
+            mimetype="application/pdf",
+            as_attachment=as_attachment,
+            download_name=name,
+            conditional=True,
+            etag=sha or True,
+        )
+
+    if not sha:
+        return None
+
+    grid_out = get_fs().find_one({"filename": _gridfs_name(sha)})
+    if grid_out is None:
+        return None
+
+    disposition = "attachment" if as_attachment else "inline"
+    rv = Response(
+        wrap_file(request.environ, grid_out, buffer_size=CHUNK_SIZE),
+        mimetype="application/pdf",
+        direct_passthrough=True,
+        headers={"Content-Disposition": f'{disposition}; filename="{name}"'},
+    )
+    rv.content_length = grid_out.length
+    rv.set_etag(sha)
+    rv.last_modified = grid_out.upload_date
+    return rv.make_conditional(request.environ, accept_ranges=True,
+                               complete_length=grid_out.length)
+
+
+# ---------- DELETE ----------
+# an upload job in one of these states still needs its PDF and cached analysis
+PENDING_JOB_STATUSES = ["queued", "running"]
+
+
+def content_in_use(sha=None, path=None, exclude_id=None):
+    """
+    True while a report (other than `exclude_id`) or a pending upload job
+    references this content hash – or, for reports without one, this path.
+    Shared by the cascading delete and the orphan GC.
+    """
+    query = {"content_hash": sha} if sha else {"file_path": path}
+    others = dict(query, _id={"$ne": exclude_id}) if exclude_id is not None else query
+    if reports.count_documents(others, limit=1):
+        return True
+    return bool(jobs.count_documents(dict(query, status={"$in": PENDING_JOB_STATUSES}), limit=1))
+
+
+def gridfs_orphans(hashes, uploaded_before):
+    """(id, sha) of GridFS PDFs whose content hash is not in `hashes`."""
+    for grid_out in get_fs().find({"uploadDate": {"$lt": uploaded_before}}):
+        sha = (grid_out.filename or "")[:-len(".pdf")]
+        if sha not in hashes:
+            yield grid_out._id, sha
+
+
+def delete_gridfs_file(grid_id, sha):
+    """Delete one GridFS PDF unless a report or upload has started using its content again."""
+    if content_in_use(sha):
+        return False
+    get_fs().delete(grid_id)
+    return True
+
+
+def delete_pdf(report):
+    """Remove a report's PDF unless another report or a pending upload still needs the same content."""
+    sha = report.get("content_hash")
+    path = report.get("file_path")
+
+    if content_in_use(sha, path, exclude_id=report["_id"]):
+        return False
+
+    if path and os.path.exists(path):
+        os.remove(path)
+
+    # also covers files pushed to GridFS before switching back to "local"
+    if sha:
+        fs = get_fs()
+        for grid_out in fs.find({"filename": _gridfs_name(sha)}):
+            fs.delete(grid_out._id)
+
+    return True
@@ -87,7 +87,7 @@ export default function Trends() {
       return;
     }
 
-    fetch(`http://127.0.0.1:5000/all-reports?email=${encodeURIComponent(email)}`)
+    fetch(`http://127.0.0.1:5000/all-reports?email=${encodeURIComponent(email)}&fields=file_id,uploaded_at,testResults`)
       .then((res) => res.json())
       .then((data) => {
         const reports: BackendReport[] = data.reports || [];
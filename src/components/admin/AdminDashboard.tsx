@@ -49,11 +49,11 @@ export default function AdminDashboard({ onLogout }: any) {
 
     fetch("http://127.0.0.1:5000/admin/users")
       .then(res => res.json())
-      .then(data => setTotalUsers(data.users.length));
+      .then(data => setTotalUsers(data.total ?? data.users.length));
 
     fetch("http://127.0.0.1:5000/admin/reports")
       .then(res => res.json())
-      .then(data => setTotalReports(data.reports.length));
+      .then(data => setTotalReports(data.total ?? data.reports.length));
 
   }, []);
 
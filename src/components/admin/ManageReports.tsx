@@ -10,7 +10,7 @@ import {
   CheckCircle
 } from 'lucide-react';
 
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 
 interface Report {
   _id: string;
@@ -27,24 +27,56 @@ interface Report {
 
 export default function ManageReports() {
   const [reports, setReports] = useState<Report[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [searchQuery, setSearchQuery] = useState('');
   const [filterStatus, setFilterStatus] = useState<string>('all');
+  const [total, setTotal] = useState<number | null>(null);
+  const [statusCounts, setStatusCounts] = useState({ normal: 0, abnormal: 0, critical: 0 });
+  const latestRequest = useRef(0);
 
   // --------------------------------
   // FETCH REPORTS FROM BACKEND
+  // (search / status are applied by the API, so every page and the total match them)
   // --------------------------------
-  const loadReports = async () => {
+  const loadReports = async (cursor?: string) => {
+    const params = new URLSearchParams();
+    if (searchQuery.trim()) params.set("search", searchQuery.trim());
+    if (filterStatus !== "all") params.set("status", filterStatus);
+    if (cursor) params.set("cursor", cursor);
+
+    const requestId = ++latestRequest.current;
     try {
-      const res = await fetch("http://127.0.0.1:5000/admin/reports");
+      const res = await fetch(`http://127.0.0.1:5000/admin/reports?${params}`);
       const data = await res.json();
-      setReports(data.reports || []);
+      // a newer search / filter has been sent in the meantime
+      if (requestId !== latestRequest.current) return;
+      setReports((prev) => (cursor ? [...prev, ...(data.reports || [])] : data.reports || []));
+      setNextCursor(data.next_cursor || null);
+      // only the first page carries the total
+      if (!cursor) setTotal(data.total ?? null);
     } catch (err) {
       console.error("Error loading reports:", err);
     }
   };
 
+  // back to the first page whenever the filters change (typing is debounced)
   useEffect(() => {
-    loadReports();
+    const timer = setTimeout(() => loadReports(), 300);
+    return () => clearTimeout(timer);
+  }, [searchQuery, filterStatus]);
+
+  // overall counts come from the pre-aggregated dashboard counters
+  const loadStatusCounts = async () => {
+    try {
+      const res = await fetch("http://127.0.0.1:5000/admin/dashboard/report-status");
+      setStatusCounts(await res.json());
+    } catch (err) {
+      console.error("Error loading report counts:", err);
+    }
+  };
+
+  useEffect(() => {
+    loadStatusCounts();
   }, []);
 
   // --------------------------------
@@ -59,6 +91,8 @@ export default function ManageReports() {
       });
 
       setReports((prev) => prev.filter((r) => r._id !== reportId));
+      setTotal((prev) => (prev === null ? prev : prev - 1));
+      loadStatusCounts();
     } catch (err) {
       console.error("Failed to delete report:", err);
     }
@@ -78,28 +112,9 @@ export default function ManageReports() {
     window.open(`http://127.0.0.1:5000/admin/download/${id}`, "_blank");
   };
 
-  // --------------------------------
-  // FILTER LOGIC
-  // --------------------------------
-  const filteredReports = reports.filter((report) => {
-    const search = searchQuery.toLowerCase();
-
-    const matchesSearch =
-      report.userName.toLowerCase().includes(search) ||
-      report.reportName.toLowerCase().includes(search) ||
-      report.userEmail.toLowerCase().includes(search);
-
-    const matchesFilter =
-      filterStatus === "all" || report.status === filterStatus;
-
-    return matchesSearch && matchesFilter;
-  });
-
   const stats = {
-    total: reports.length,
-    normal: reports.filter((r) => r.status === "normal").length,
-    abnormal: reports.filter((r) => r.status === "abnormal").length,
-    critical: reports.filter((r) => r.status === "critical").length,
+    total: statusCounts.normal + statusCounts.abnormal + statusCounts.critical,
+    ...statusCounts,
   };
 
   const getStatusColor = (status: string) => {
@@ -207,7 +222,7 @@ export default function ManageReports() {
               </thead>
 
               <tbody>
-                {filteredReports.map((report) => (
+                {reports.map((report) => (
                   <tr key={report._id} className="hover:bg-gray-50">
                     <td className="px-8 py-6">
                       <div className="flex items-center gap-4">
@@ -276,6 +291,23 @@ export default function ManageReports() {
               </tbody>
 
             </table>
+
+            {total !== null && (
+              <div className="px-8 pt-6 text-sm text-gray-600">
+                Showing {reports.length} of {total} reports
+              </div>
+            )}
+
+            {nextCursor && (
+              <div className="p-6 text-center">
+                <button
+                  onClick={() => loadReports(nextCursor)}
+                  className="px-6 py-2 text-blue-600 hover:bg-blue-50 rounded-lg"
+                >
+                  Load more
+                </button>
+              </div>
+            )}
           </div>
         </div>
 
@@ -2,7 +2,7 @@ import AdminNavbar from './AdminNavbar';
 import {
   Edit2, Trash2, Ban, CheckCircle, XCircle, Clock, Mail,
 } from 'lucide-react';
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 
 interface User {
   name: string;
@@ -19,25 +19,46 @@ interface ManageUsersProps {
 
 export default function ManageUsers({ onLogout }: ManageUsersProps) {
   const [users, setUsers] = useState<User[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [searchQuery, setSearchQuery] = useState('');
   const [filterStatus, setFilterStatus] = useState<string>('all');
+  const [total, setTotal] = useState<number | null>(null);
+  const [statusCounts, setStatusCounts] = useState({ active: 0, suspended: 0, pending: 0 });
+  const latestRequest = useRef(0);
 
   // -------------------------------
   // Load users from backend
+  // (search / status are applied by the API, so every page and the total match them)
   // -------------------------------
-  const loadUsers = async () => {
+  const loadUsers = async (cursor?: string) => {
+    const params = new URLSearchParams();
+    if (searchQuery.trim()) params.set("search", searchQuery.trim());
+    if (filterStatus !== "all") params.set("status", filterStatus);
+    if (cursor) params.set("cursor", cursor);
+
+    const requestId = ++latestRequest.current;
     try {
-      const res = await fetch("http://127.0.0.1:5000/admin/users");
+      const res = await fetch(`http://127.0.0.1:5000/admin/users?${params}`);
       const data = await res.json();
-      setUsers(data.users);
+      // a newer search / filter has been sent in the meantime
+      if (requestId !== latestRequest.current) return;
+      setUsers((prev) => (cursor ? [...prev, ...data.users] : data.users));
+      setNextCursor(data.next_cursor || null);
+      // only the first page carries the total and the per-status counts
+      if (!cursor) {
+        setTotal(data.total ?? null);
+        if (data.status_counts) setStatusCounts(data.status_counts);
+      }
     } catch (err) {
       console.error("Failed to load users", err);
     }
   };
 
+  // back to the first page whenever the filters change (typing is debounced)
   useEffect(() => {
-    loadUsers();
-  }, []);
+    const timer = setTimeout(() => loadUsers(), 300);
+    return () => clearTimeout(timer);
+  }, [searchQuery, filterStatus]);
 
   // -------------------------------
   // EDIT USER
@@ -97,26 +118,10 @@ export default function ManageUsers({ onLogout }: ManageUsersProps) {
   };
 
 
-  // -------------------------------
-  // Filters
-  // -------------------------------
-  const filteredUsers = users.filter((user) => {
-    const matchesSearch =
-      user.name.toLowerCase().includes(searchQuery.toLowerCase()) ||
-      user.email.toLowerCase().includes(searchQuery.toLowerCase());
-
-    const matchesFilter =
-      filterStatus === "all" || user.status === filterStatus;
-
-    return matchesSearch && matchesFilter;
-  });
-
-  // Stats
+  // Stats (all users, from the first page of the listing)
   const stats = {
-    total: users.length,
-    active: users.filter((u) => u.status === "active").length,
-    suspended: users.filter((u) => u.status === "suspended").length,
-    pending: users.filter((u) => u.status === "pending").length,
+    total: statusCounts.active + statusCounts.suspended + statusCounts.pending,
+    ...statusCounts,
   };
 
   const getStatusColor = (status: string) => {
@@ -189,7 +194,7 @@ export default function ManageUsers({ onLogout }: ManageUsersProps) {
           </thead>
 
           <tbody>
-            {filteredUsers.map((u) => (
+            {users.map((u) => (
               <tr key={u.email} className="border-t">
                 <td className="p-4">
                   <b>{u.name}</b>
@@ -236,6 +241,23 @@ export default function ManageUsers({ onLogout }: ManageUsersProps) {
           </tbody>
 
         </table>
+
+        {total !== null && (
+          <div className="pt-6 text-sm text-gray-600">
+            Showing {users.length} of {total} users
+          </div>
+        )}
+
+        {nextCursor && (
+          <div className="p-6 text-center">
+            <button
+              onClick={() => loadUsers(nextCursor)}
+              className="px-6 py-2 text-blue-600 hover:bg-blue-50 rounded-lg"
+            >
+              Load more
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );